@@ -1,8 +1,22 @@
 import os
+import io
+import csv
 import json
+import sqlite3
 import datetime
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify
-from predict import classify_resume, MODEL_DIR
+import hmac
+import threading
+import time
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, Response, stream_with_context, g
+import metrics
+from user_store import UserStore, HISTORY_FIELDS
+from job_queue import QueueFullError, job_queue_from_env
+from near_duplicates import NearDuplicateIndex
+from gemini_client import ResilientGeminiClient
+import predict
+from predict import (
+    classify_resume, classify_resume_stream, classify_resumes, rank_roles, BATCH_MAX_ITEMS, BEST_FIT_TOP_K, MODEL_DIR, model_registry, genai_cache
+)
 
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
 
@@ -18,55 +32,49 @@ login_manager.login_view = 'login' # Redirect here if @login_required fails
 login_manager.login_message_category = 'info' # Category for the "Please log in" message
 
 
-# --- File path for user data ---
+# --- File paths for user data ---
+# users.json is the legacy format; it is only read once to seed the database.
 USER_DATA_FILE = 'users.json'
+USER_DB_FILE = os.environ.get('USER_DB_FILE', 'users.db')
 
+user_store = UserStore(USER_DB_FILE)
+
+
+# --- User Data Loading ---
+# Accounts are read from the database on every lookup rather than kept in a
+# module-level dict, so any number of worker processes see the same users.
+DEFAULT_ADMIN = {'email': 'admin@example.com', 'password': 'password', 'name': 'Admin User'}
 
-# --- User Data Loading/Saving Functions (unchanged) ---
 def load_users():
-    # ...(logic remains the same)...
-    default_users = {'1': {'email': 'admin@example.com', 'password_hash': 'password', 'name': 'Admin User', 'history': [] }}
-    default_next_id = 2
-    if not os.path.exists(USER_DATA_FILE):
-        print(f"'{USER_DATA_FILE}' not found. Creating it...")
-        try:
-            save_users(default_users, default_next_id)
-            print(f"Successfully created '{USER_DATA_FILE}'.")
-            return default_users, default_next_id
-        except Exception as e:
-            print(f"Error creating '{USER_DATA_FILE}': {e}.")
-            return default_users, default_next_id
+    """
+    Prepares the user database and returns the number of accounts.
+
+    On first start the database is empty: it is migrated from USER_DATA_FILE
+    when that exists, otherwise seeded with the default admin account.
+    """
     try:
-        with open(USER_DATA_FILE, 'r') as f:
-            data = json.load(f)
-            users_dict = data.get('users', {})
-            for user_id in users_dict:
-                if 'history' not in users_dict[user_id]:
-                    users_dict[user_id]['history'] = []
-            max_id = 0
-            if users_dict:
-                 numeric_ids = [int(k) for k in users_dict.keys() if k.isdigit()]
-                 if numeric_ids: max_id = max(numeric_ids)
-            next_id = data.get('next_user_id', max_id + 1)
-            if not users_dict:
-                 print(f"'{USER_DATA_FILE}' was empty. Initializing...")
-                 save_users(default_users, default_next_id)
-                 return default_users, default_next_id
-            return users_dict, next_id
-    except (json.JSONDecodeError, IOError) as e:
-        print(f"Error loading user data: {e}.")
-        return default_users, default_next_id
-
-def save_users(users_dict, next_id):
-    # ...(logic remains the same)...
-     try:
-        with open(USER_DATA_FILE, 'w') as f:
-            json.dump({'users': users_dict, 'next_user_id': next_id}, f, indent=4)
-     except IOError as e:
-        print(f"Error saving user data: {e}")
-
-users, next_user_id = load_users()
-print(f"Loaded {len(users)} users. Next ID: {next_user_id}")
+        outcome, count = user_store.seed_if_empty(USER_DATA_FILE, DEFAULT_ADMIN)
+    except sqlite3.Error as e:
+        print(f"Error preparing user database '{USER_DB_FILE}': {e}.")
+        outcome, count = None, 0
+    if outcome == 'migrated':
+        print(f"Migrated {count} users from '{USER_DATA_FILE}' into '{USER_DB_FILE}'.")
+    elif outcome == 'seeded':
+        print(f"No users found. Created default admin in '{USER_DB_FILE}'.")
+    return user_store.count_users()
+
+def normalize_email(email):
+    """Key used by the email index: trimmed and lower-cased."""
+    return (email or '').strip().lower()
+
+def find_user_by_email(email):
+    """Returns (user_id, account) for an email, or (None, None)."""
+    return user_store.find_user_by_email(normalize_email(email))
+
+def user_exists(user_id):
+    return user_id is not None and user_store.get_user(user_id) is not None
+
+print(f"Loaded {load_users()} users. Next ID: {user_store.get_next_user_id()}")
 
 # --- User Class & Loader (unchanged) ---
 class User(UserMixin):
@@ -79,7 +87,7 @@ class User(UserMixin):
 @login_manager.user_loader
 def load_user(user_id):
     # ...(unchanged)...
-    user_data = users.get(user_id)
+    user_data = user_store.get_user(user_id)
     if user_data:
         return User(id=user_id, email=user_data['email'], name=user_data['name'])
     return None
@@ -132,16 +140,12 @@ def login():
         password = request.form.get('password')
         remember = True if request.form.get('remember') else False
 
-        # Find user by email (in our simple dictionary)
+        # Find user by email (O(1) via the email index)
         user_instance = None
-        user_id_found = None
-        for uid, user_data in users.items():
-            if user_data['email'] == email:
-                 # !!! SECURITY WARNING: Check HASHED password here in a real app !!!
-                if user_data['password'] == password:
-                    user_instance = User(id=uid, email=user_data['email'], name=user_data['name'])
-                    user_id_found = uid
-                    break # Found the user
+        uid, user_data = find_user_by_email(email)
+        # !!! SECURITY WARNING: Check HASHED password here in a real app !!!
+        if user_data and user_data['password'] == password:
+            user_instance = User(id=uid, email=user_data['email'], name=user_data['name'])
 
         if user_instance:
             login_user(user_instance, remember=remember)
@@ -157,7 +161,6 @@ def login():
 
 @app.route('/signup', methods=['GET', 'POST'])
 def signup():
-    global next_user_id # To modify the global counter
     if current_user.is_authenticated:
         return redirect(url_for('index')) # Don't allow signup if logged in
 
@@ -167,8 +170,8 @@ def signup():
         password = request.form.get('password') # Assume signup.html has a password field
 
         # Check if email already exists
-        email_exists = any(ud['email'] == email for ud in users.values())
-        if email_exists:
+        existing_id, _ = find_user_by_email(email)
+        if existing_id is not None:
             flash('Email address already registered.', 'warning')
             return redirect(url_for('signup'))
 
@@ -177,15 +180,14 @@ def signup():
             flash('Password must be at least 6 characters.', 'warning')
             return redirect(url_for('signup'))
 
-        # Create new user
-        user_id = str(next_user_id)
+        # Create new user (the store allocates the id; None if the email was taken meanwhile)
         # !!! SECURITY WARNING: HASH the password before storing in a real app !!!
         # from werkzeug.security import generate_password_hash
         # hashed_password = generate_password_hash(password, method='pbkdf2:sha256')
-        users[user_id] = {'email': email, 'password': password, 'name': name}
-        next_user_id += 1
-
-        save_users(users_dict=users,next_id=next_user_id)
+        user_id = user_store.create_user(email, password, name)
+        if user_id is None:
+            flash('Email address already registered.', 'warning')
+            return redirect(url_for('signup'))
 
         flash('Account created successfully! Please log in.', 'success')
         return redirect(url_for('login'))
@@ -200,14 +202,72 @@ def logout():
     flash('You have been logged out.', 'info')
     return redirect(url_for('login'))
 
+# --- History (cursor-paginated, newest first) ---
+# Pages carry summary fields only; each entry's Gemini texts are fetched on demand.
+HISTORY_PAGE_SIZE = int(os.environ.get('HISTORY_PAGE_SIZE', '20'))
+HISTORY_EXPORT_BATCH = 500
+
+def _history_page():
+    # ?cursor=<id from next_cursor> and ?limit=1..100; returns (entries, next_cursor, cursor, limit)
+    cursor = request.args.get('cursor', type=int)
+    limit = min(max(request.args.get('limit', HISTORY_PAGE_SIZE, type=int), 1), 100)
+    user_id = current_user.get_id()
+    if not user_exists(user_id):
+        return [], None, cursor, limit
+    entries, next_cursor = user_store.get_history_page(user_id, cursor, limit)
+    return entries, next_cursor, cursor, limit
+
 @app.route('/history')
 @login_required
 def history():
-    # ...(logic remains the same)...
+    entries, next_cursor, cursor, limit = _history_page()
+    return render_template('history.html', history=entries, next_cursor=next_cursor,
+                           is_first_page=cursor is None, limit=limit, active_page='history')
+
+@app.route('/history/entries', methods=['GET'])
+@login_required
+def history_entries():
+    entries, next_cursor, cursor, limit = _history_page()
+    next_url = url_for('history_entries', cursor=next_cursor, limit=limit) if next_cursor is not None else None
+    return jsonify({"entries": entries, "next_cursor": next_cursor, "next_url": next_url}), 200
+
+@app.route('/history/entries/<int:entry_id>', methods=['GET'])
+@login_required
+def history_entry(entry_id):
+    # Full entry, including the Gemini assessment, JD comparison and suggestions
+    entry = user_store.get_history_entry(current_user.get_id(), entry_id)
+    if entry is None:
+        return jsonify({"error": "History entry not found"}), 404
+    return jsonify(entry), 200
+
+def _export_history(user_id, as_csv):
+    # Streams the history oldest first, a batch of rows per chunk, without holding it all in memory
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if as_csv else None
+    if as_csv:
+        writer.writerow(('id',) + HISTORY_FIELDS)
+    for count, entry in enumerate(user_store.iter_history(user_id, HISTORY_EXPORT_BATCH), start=1):
+        if as_csv:
+            writer.writerow([entry['id']] + [entry[field] for field in HISTORY_FIELDS])
+        else:
+            buffer.write(json.dumps(entry) + "\n")
+        if count % HISTORY_EXPORT_BATCH == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+@app.route('/history/export', methods=['GET'])
+@login_required
+def history_export():
+    # ?format=csv (default) or jsonl
+    export_format = request.args.get('format', 'csv')
+    if export_format not in ('csv', 'jsonl'):
+        return jsonify({"error": "format must be 'csv' or 'jsonl'"}), 400
     user_id = current_user.get_id()
-    user_data = users.get(user_id)
-    user_history = user_data.get('history', []) if user_data else []
-    return render_template('history.html', history=user_history, active_page='history')
+    mimetype = 'text/csv' if export_format == 'csv' else 'application/x-ndjson'
+    return Response(_export_history(user_id, export_format == 'csv'), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename=history.{export_format}'})
 
 
 @app.route('/testing', methods=['GET'])
@@ -216,6 +276,37 @@ def upload():
     # Now only logged-in users can see this
     return render_template('upload.html', active_page='testing')
 
+def build_history_entry(resume_text, job_role, job_description, result):
+    """Summarizes one classification result for a user's history."""
+    return {
+        'timestamp': datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        'job_role': job_role,
+        'job_description_snippet': (job_description[:150] + "...") if job_description else "N/A", # --- NEW ---
+        'resume_snippet': resume_text[:200] + "...",
+        'ml_prediction': result.get('ml_prediction'),
+        'ml_confidence': result.get('ml_confidence'),
+        'gen_ai_assessment': result.get('gen_ai_assessment'),
+        'resume_jd_comparison': result.get('resume_jd_comparison'), # --- NEW ---
+        'improvement_suggestions': result.get('improvement_suggestions')
+    }
+
+def _top_k(data):
+    # Clamp the requested number of best-fit roles to something sensible
+    try:
+        return min(max(int(data.get('top_k', BEST_FIT_TOP_K)), 1), 100)
+    except (TypeError, ValueError):
+        return BEST_FIT_TOP_K
+
+def _resolve_best_fit(data, resume_text, job_role):
+    # Best-fit mode ranks every role; with no job_role the top-ranked one is classified.
+    # Returns (job_role, ranked roles or None when best-fit was not requested).
+    if job_role and not data.get('best_fit', False):
+        return job_role, None
+    best_fit_roles = rank_roles(resume_text, _top_k(data))
+    if best_fit_roles and not job_role:
+        job_role = best_fit_roles[0]['role']
+    return job_role, best_fit_roles
+
 # --- MODIFIED /classify Route ---
 @app.route('/classify', methods=['POST'])
 @login_required
@@ -228,30 +319,25 @@ def classify_resume_route():
     job_description = data.get('job_description') # --- NEW: Get job description ---
 
     # Basic validation
-    if not resume_text or not job_role:
-        return jsonify({"error": "Missing 'resume_text' or 'job_role'"}), 400
+    if not resume_text:
+        return jsonify({"error": "Missing 'resume_text'"}), 400
+
+    job_role, best_fit_roles = _resolve_best_fit(data, resume_text, job_role)
+    if best_fit_roles == []:
+        return jsonify({"error": "No ML models available to rank roles."}), 404
 
     # Call prediction function, passing job_description
-    result = classify_resume(resume_text, job_role, job_description) # --- MODIFIED CALL ---
+    with metrics.span("classify"):
+        result = classify_resume(resume_text, job_role, job_description) # --- MODIFIED CALL ---
+    if best_fit_roles is not None:
+        result['best_fit_roles'] = best_fit_roles
 
     # Save result to user history (including new fields)
     if "error" not in result.get("error", ""): # Check more robustly for errors
         user_id = current_user.get_id()
-        if user_id in users:
-            history_entry = {
-                'timestamp': datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                'job_role': job_role,
-                'job_description_snippet': (job_description[:150] + "...") if job_description else "N/A", # --- NEW ---
-                'resume_snippet': resume_text[:200] + "...",
-                'ml_prediction': result.get('ml_prediction'),
-                'ml_confidence': result.get('ml_confidence'),
-                'gen_ai_assessment': result.get('gen_ai_assessment'),
-                'resume_jd_comparison': result.get('resume_jd_comparison'), # --- NEW ---
-                'improvement_suggestions': result.get('improvement_suggestions')
-            }
-            if 'history' not in users[user_id]: users[user_id]['history'] = []
-            users[user_id]['history'].append(history_entry)
-            save_users(users, next_user_id)
+        if user_exists(user_id):
+            history_entry = build_history_entry(resume_text, job_role, job_description, result)
+            user_store.add_history(user_id, history_entry)
         else:
             print(f"Warning: Could not find user {user_id} to save history.")
 
@@ -262,6 +348,372 @@ def classify_resume_route():
     return jsonify(result), 200
 
 
+def _stream_frame(event, payload, as_json_lines):
+    # One Server-Sent Events frame, or one JSON line for ?format=jsonl
+    if as_json_lines:
+        return json.dumps({"event": event, **payload}) + "\n"
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+@app.route('/classify_stream', methods=['POST'])
+@login_required
+def classify_stream_route():
+    # Same input as /classify; results are streamed as each part becomes ready
+    data = request.get_json()
+    if not data: return jsonify({"error": "No JSON data provided"}), 400
+
+    resume_text = data.get('resume_text')
+    job_role = data.get('job_role')
+    job_description = data.get('job_description')
+    if not resume_text:
+        return jsonify({"error": "Missing 'resume_text'"}), 400
+
+    job_role, best_fit_roles = _resolve_best_fit(data, resume_text, job_role)
+    if best_fit_roles == []:
+        return jsonify({"error": "No ML models available to rank roles."}), 404
+
+    as_json_lines = request.args.get('format') == 'jsonl'
+    user_id = current_user.get_id()
+
+    def generate():
+        if best_fit_roles is not None:
+            yield _stream_frame('best_fit_roles', {"best_fit_roles": best_fit_roles}, as_json_lines)
+        for event, payload in classify_resume_stream(resume_text, job_role, job_description):
+            if event == 'done':
+                if best_fit_roles is not None:
+                    payload['best_fit_roles'] = best_fit_roles
+                # Save the finished result to history before the last frame goes out
+                if "error" not in payload and user_exists(user_id):
+                    user_store.add_history(user_id, build_history_entry(resume_text, job_role, job_description, payload))
+            yield _stream_frame(event, payload, as_json_lines)
+
+    mimetype = 'application/x-ndjson' if as_json_lines else 'text/event-stream'
+    return Response(stream_with_context(generate()), mimetype=mimetype,
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+# --- Background Classification Jobs ---
+def _run_classification_job(payload):
+    # Runs on a job worker; same steps as /classify
+    job_role, best_fit_roles = _resolve_best_fit(payload, payload['resume_text'], payload.get('job_role'))
+    if not job_role:
+        raise RuntimeError("No ML models available to rank roles.")
+    result = classify_resume(payload['resume_text'], job_role, payload.get('job_description'))
+    if best_fit_roles is not None:
+        result['best_fit_roles'] = best_fit_roles
+    return result
+
+def _save_job_history(job):
+    # Completed jobs land in the submitting user's history, like a synchronous /classify
+    result, payload = job['result'], job['payload']
+    if "error" in result:
+        return
+    if user_exists(job['user_id']):
+        user_store.add_history(job['user_id'], build_history_entry(
+            payload['resume_text'], result.get('role'), payload.get('job_description'), result
+        ))
+    else:
+        print(f"Warning: Could not find user {job['user_id']} to save history.")
+
+job_queue = job_queue_from_env(_run_classification_job, on_complete=_save_job_history)
+
+@app.route('/classify_async', methods=['POST'])
+@login_required
+def classify_async_route():
+    # Queues a classification and returns immediately; poll the status URL for the result
+    data = request.get_json()
+    if not data: return jsonify({"error": "No JSON data provided"}), 400
+    if not data.get('resume_text'):
+        return jsonify({"error": "Missing 'resume_text'"}), 400
+
+    payload = {key: data.get(key) for key in ('resume_text', 'job_role', 'job_description', 'best_fit', 'top_k')}
+    try:
+        job_id = job_queue.submit(current_user.get_id(), payload)
+    except QueueFullError as e:
+        return jsonify({"error": f"Classification queue is full ({e}); try again shortly."}), 503, {'Retry-After': '5'}
+    return jsonify({"job_id": job_id, "status": "queued", "status_url": url_for('job_status', job_id=job_id)}), 202
+
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+@login_required
+def job_status(job_id):
+    job = job_queue.get(job_id)
+    if job is None or job['user_id'] != current_user.get_id():
+        return jsonify({"error": "Job not found"}), 404
+    response = {key: job[key] for key in ('status', 'submitted_at', 'started_at', 'finished_at')}
+    response['job_id'] = job_id
+    if job['status'] == 'done':
+        response['result'] = job['result']
+    elif job['status'] == 'failed':
+        response['error'] = job['error']
+    return jsonify(response), 200
+
+
+@app.route('/job_stats', methods=['GET'])
+@login_required
+def job_stats():
+    # Queue depth, throughput and wait/run time percentiles of the job workers
+    return jsonify(job_queue.stats()), 200
+
+
+@app.route('/best_fit_roles', methods=['POST'])
+@login_required
+def best_fit_roles_route():
+    # ML-only ranking of every role for one resume (no Gemini calls, no history)
+    data = request.get_json()
+    if not data: return jsonify({"error": "No JSON data provided"}), 400
+    resume_text = data.get('resume_text')
+    if not resume_text:
+        return jsonify({"error": "Missing 'resume_text'"}), 400
+    ranked = rank_roles(resume_text, _top_k(data))
+    if not ranked:
+        return jsonify({"error": "No ML models available to rank roles."}), 404
+    return jsonify({"best_fit_roles": ranked}), 200
+
+
+@app.route('/classify_batch', methods=['POST'])
+@login_required
+def classify_batch_route():
+    data = request.get_json()
+    if not data: return jsonify({"error": "No JSON data provided"}), 400
+
+    items = data.get('items')
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "Missing 'items' list"}), 400
+    if len(items) > BATCH_MAX_ITEMS:
+        return jsonify({"error": f"Batch too large ({len(items)} items, max {BATCH_MAX_ITEMS})"}), 413
+    if not all(isinstance(item, dict) for item in items):
+        return jsonify({"error": "Each item must be an object with 'resume_text' and 'job_role'"}), 400
+
+    include_genai = bool(data.get('include_genai', False))
+    results = classify_resumes(items, include_genai=include_genai)
+
+    # Save every successful result to the user's history in one transaction
+    user_id = current_user.get_id()
+    if user_exists(user_id):
+        user_store.add_history_many(user_id, [
+            build_history_entry(item['resume_text'], item['job_role'], item.get('job_description'), result)
+            for item, result in zip(items, results) if "error" not in result
+        ])
+    else:
+        print(f"Warning: Could not find user {user_id} to save history.")
+
+    return jsonify({"results": results}), 200
+
+
+# --- Recruiter Feedback ---
+# A recruiter's final Select/Reject on a resume. It is only stored here; the
+# online learner (ONLINE_LEARNING, see online_learning.py) reads new feedback
+# in the background and updates that role's online model in micro-batches.
+FEEDBACK_DECISIONS = {'select': True, 'reject': False}
+
+@app.route('/feedback', methods=['POST'])
+@login_required
+def feedback_route():
+    data = request.get_json()
+    if not data: return jsonify({"error": "No JSON data provided"}), 400
+    resume_text = data.get('resume_text')
+    job_role = data.get('job_role')
+    decision = str(data.get('decision', '')).strip().lower()
+    if not resume_text or not job_role:
+        return jsonify({"error": "Missing 'resume_text' or 'job_role'"}), 400
+    if decision not in FEEDBACK_DECISIONS:
+        return jsonify({"error": "'decision' must be 'Select' or 'Reject'"}), 400
+
+    user_id = current_user.get_id()
+    history_id = data.get('history_id')
+    if history_id is not None:
+        # Optional link to the classification being confirmed; it must be one of the user's own
+        try:
+            history_id = int(history_id)
+        except (TypeError, ValueError):
+            return jsonify({"error": "'history_id' must be an integer"}), 400
+        if user_store.get_history_entry(user_id, history_id) is None:
+            return jsonify({"error": "History entry not found"}), 404
+    timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    feedback_id = user_store.add_feedback(user_id, job_role, resume_text, FEEDBACK_DECISIONS[decision], history_id, timestamp)
+    metrics.FEEDBACK.inc(decision.capitalize())
+    return jsonify({"feedback_id": feedback_id, "online_learning": predict.ONLINE_LEARNING}), 202
+
+
+@app.route('/online_learning_stats', methods=['GET'])
+@login_required
+def online_learning_stats():
+    # Examples learned, progressive accuracy per role and checkpoint state of the online models
+    if predict.online_learner is None:
+        return jsonify({"error": "Online learning is off (ONLINE_LEARNING=off)",
+                        "feedback_stored": user_store.count_feedback()}), 404
+    return jsonify({"mode": predict.ONLINE_LEARNING, "feedback_stored": user_store.count_feedback(),
+                    **predict.online_learner.stats()}), 200
+
+
+@app.route('/model_stats', methods=['GET'])
+@login_required
+def model_stats():
+    # Load counts and hit rate of the in-memory model registry
+    return jsonify(model_registry.stats()), 200
+
+
+@app.route('/genai_cache_stats', methods=['GET'])
+@login_required
+def genai_cache_stats():
+    # Hit/miss counters of the Gemini response cache
+    return jsonify(genai_cache.stats()), 200
+
+
+@app.route('/near_duplicate_stats', methods=['GET'])
+@login_required
+def near_duplicate_stats():
+    # Size, lookups and matches of the near-duplicate resume index
+    index = predict.get_near_duplicate_index()
+    if index is None:
+        return jsonify({"error": "Near-duplicate detection is off (NEAR_DUP_MODE=off)"}), 404
+    return jsonify({"mode": predict.NEAR_DUP_MODE, **index.stats()}), 200
+
+
+@app.route('/prompt_compaction_stats', methods=['GET'])
+@login_required
+def prompt_compaction_stats():
+    # Token budgets and estimated prompt tokens saved by compaction
+    return jsonify(predict.prompt_compactor.stats()), 200
+
+
+@app.route('/genai_client_stats', methods=['GET'])
+@login_required
+def genai_client_stats():
+    # Rate limiter, retry and circuit breaker counters of the Gemini client; reading them does not create it
+    client = predict.client
+    if not isinstance(client, ResilientGeminiClient):
+        return jsonify({"error": "No Gemini client configured or created yet"}), 404
+    return jsonify(client.stats()), 200
+
+
+# --- Metrics ---
+# Every request is timed per endpoint; the stages it ran (model load, cleaning,
+# vectorizing, Gemini waits, history write, ...) are also returned to the
+# caller in a Server-Timing header.
+@app.before_request
+def _start_request_timer():
+    g.request_started = time.perf_counter()
+    metrics.begin_trace()
+
+@app.after_request
+def _record_request_time(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        elapsed = time.perf_counter() - started
+        metrics.HTTP_REQUEST_SECONDS.observe(elapsed, request.endpoint or 'unmatched', request.method, str(response.status_code))
+        spans = metrics.current_trace()
+        if spans:
+            response.headers['Server-Timing'] = metrics.server_timing(spans + [('total', elapsed)])
+    return response
+
+@app.teardown_request
+def _end_request_trace(exc):
+    metrics.end_trace()
+
+def _collect_component_metrics():
+    # Counters the registry, Gemini cache/client and job queue already keep, read at scrape time
+    registry = model_registry.stats()
+    cache = genai_cache.stats()
+    queue_stats = job_queue.stats()
+    families = [
+        ("resume_model_registry_events_total", "counter", "Model registry lookups and joblib loads.",
+         [({"event": event}, registry[event]) for event in ("hits", "misses", "loads", "reloads", "evictions")]),
+        ("resume_model_registry_cached_roles", "gauge", "Roles currently held in the model registry.",
+         [({}, registry["cached_roles"])]),
+        ("resume_genai_cache_events_total", "counter", "Gemini response cache hits by tier, misses and writes.",
+         [({"event": event}, cache[event]) for event in ("memory_hits", "disk_hits", "misses", "writes")]),
+        ("resume_genai_cache_entries", "gauge", "Gemini responses held by the cache.",
+         [({"tier": "memory"}, cache["memory_entries"]), ({"tier": "disk"}, cache["disk_entries"])]),
+        ("resume_jobs_total", "counter", "Background classification jobs by outcome.",
+         [({"outcome": outcome}, queue_stats[outcome]) for outcome in ("submitted", "rejected", "completed", "failed")]),
+        ("resume_job_queue_depth", "gauge", "Background jobs waiting or running.",
+         [({"status": "queued"}, queue_stats["queue_depth"]), ({"status": "running"}, queue_stats["running"])]),
+    ]
+    index = predict.near_duplicate_index  # only once something has created it
+    if isinstance(index, NearDuplicateIndex):
+        index_stats = index.stats()
+        families.append(("resume_near_duplicate_index_entries", "gauge", "Resume fingerprints held by the near-duplicate index.",
+                         [({}, index_stats["entries"])]))
+        families.append(("resume_near_duplicate_index_bytes", "gauge", "Memory allocated by the near-duplicate index.",
+                         [({}, index_stats["memory_bytes"])]))
+    client = predict.client  # only once a classification has created it; a scrape must not
+    if isinstance(client, ResilientGeminiClient):
+        client_stats = client.stats()
+        families.append(("resume_genai_client_events_total", "counter", "Gemini client calls, retries, failures, rejections and expired deadlines.",
+                         [({"event": event}, client_stats[event])
+                          for event in ("calls", "retries", "failures", "rejected_open", "throttled", "expired")]))
+        families.append(("resume_genai_breaker_open", "gauge", "1 while the Gemini circuit breaker is open.",
+                         [({}, int(client_stats["breaker_state"] == "open"))]))
+        families.append(("resume_genai_in_flight", "gauge", "Gemini calls queued or running on the worker pool.",
+                         [({}, predict.genai_in_flight())]))
+    learner = predict.online_learner
+    if learner is not None:
+        learner_stats = learner.stats()
+        families.append(("resume_online_learning_events_total", "counter", "Online model micro-batches, examples learned and checkpoints.",
+                         [({"event": event}, learner_stats[event]) for event in ("batches", "examples_applied", "checkpoints")]))
+        families.append(("resume_online_learning_cursor", "gauge", "Id of the last recruiter feedback row the online models learned from.",
+                         [({}, learner_stats["feedback_cursor"])]))
+    return families
+
+metrics.register_collector(_collect_component_metrics)
+
+# Set METRICS_TOKEN to require "Authorization: Bearer <token>" on /metrics.
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+@app.route('/metrics', methods=['GET'])
+def metrics_route():
+    # Prometheus text exposition of stage/request latencies and component counters
+    if METRICS_TOKEN and not hmac.compare_digest(request.headers.get('Authorization', ''), f"Bearer {METRICS_TOKEN}"):
+        return Response("Unauthorized\n", status=401, mimetype='text/plain')
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+
+# --- Warm-up ---
+# scikit-learn, scipy, google.genai and the models are loaded on first use so
+# the app imports quickly. APP_WARMUP front-loads them: 'background' (default)
+# in a thread right after startup, 'sync' before the module finishes importing
+# (e.g. in a pre-fork master), 'off' leaves it all to the first request.
+APP_WARMUP = os.environ.get('APP_WARMUP', 'background').lower()
+
+def warm_up():
+    try:
+        predict.warm_up()
+    except Exception as e:
+        print(f"Warm-up failed: {e}")
+
+
+# --- Pre-fork Serving ---
+# With APP_PREFORK=1 (set by serve.py) this module is imported once in a master
+# process that then forks the workers. The warm-up runs synchronously so the
+# models are loaded before the fork and shared copy-on-write, and nothing that
+# must not cross a fork (threads, Gemini connections) is started until each
+# worker calls init_worker(). Under gunicorn --preload, call it from post_fork.
+APP_PREFORK = os.environ.get('APP_PREFORK', '').lower() in ('1', 'on', 'true', 'yes')
+
+def start_online_learning():
+    # One trainer across all processes sharing ONLINE_MODEL_DIR; the rest reload its checkpoints
+    if predict.online_learner is not None:
+        predict.online_learner.start(user_store.get_feedback_since)
+
+def init_worker():
+    """Per-worker setup after the fork: a fresh Gemini client, this worker's job threads and online learner."""
+    predict.after_fork()
+    job_queue.start()
+    start_online_learning()
+
+if APP_PREFORK:
+    if APP_WARMUP != 'off':
+        warm_up()
+else:
+    job_queue.start()
+    start_online_learning()
+    if APP_WARMUP == 'sync':
+        warm_up()
+    elif APP_WARMUP == 'background':
+        threading.Thread(target=warm_up, name='warm-up', daemon=True).start()
+
+
 if __name__ == '__main__':
     # Check if the model directory exists (optional, but good practice)
     if not os.path.exists(MODEL_DIR):
@@ -0,0 +1,108 @@
+"""
+Text cleaning / feature extraction throughput: features.py versus the
+per-call regex helpers it replaced in main.py and predict.py.
+
+Checks that both produce identical cleaned text and flags on a synthetic
+corpus, then times single-document and batch extraction.
+
+    python benchmarks/bench_features.py [--docs 5000]
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from features import CUSTOM_STOP_WORDS, extract_features, extract_features_batch
+
+
+# --- Legacy implementations (as they were in main.py / predict.py) ---
+def legacy_clean_text_aggressively(text, name_words):
+    if not isinstance(text, str): return ""
+    text = text.lower()
+    for name_word in name_words:
+        text = re.sub(r'\b' + re.escape(name_word) + r'\b', '', text)
+    text = re.sub(r'[^a-z\s]', '', text)
+    words = text.split()
+    cleaned_words = [word for word in words if word not in CUSTOM_STOP_WORDS and len(word) > 2]
+    return " ".join(cleaned_words)
+
+def legacy_has_portfolio_link(text):
+    if not isinstance(text, str): return 0
+    return 1 if re.search(r'(https?://|www\.)', text, re.IGNORECASE) else 0
+
+def legacy_has_honors_or_certs(text):
+    if not isinstance(text, str): return 0
+    return 1 if re.search(r'\b(award|honor|certification|certificate|publication|patent|distinction|fellowship)\b', text, re.IGNORECASE) else 0
+
+
+# --- Synthetic corpus ---
+_VOCAB = (
+    "python java sql aws docker kubernetes react led team of engineers built pipelines "
+    "Experience Education Skills Jan 2021 - Present Summary Objective GPA: 3.8 University "
+    "award-winning Certified certification Patent fellowship https://github.com/jdoe www.jdoe.dev "
+    "increased revenue by 35% reduced latency (p99) mentored interns; e-mail: jdoe@example.com"
+).split()
+_FIRST = ["john", "maria", "li", "o'neil", "ann", "anna", "Jean-Luc", "priya"]
+_LAST = ["smith", "garcia", "wei", "doe", "patel", "müller"]
+
+
+def make_corpus(count, seed=0):
+    rng = random.Random(seed)
+    docs, names = [], []
+    for _ in range(count):
+        name = f"{rng.choice(_FIRST)} {rng.choice(_LAST)}"
+        words = [rng.choice(_VOCAB) for _ in range(rng.randint(150, 600))]
+        words.insert(0, name.title())
+        docs.append(" ".join(words))
+        names.append(set(name.lower().split()))
+    return docs, names
+
+
+def legacy_extract(text, name_words):
+    return (legacy_clean_text_aggressively(text, name_words),
+            legacy_has_portfolio_link(text), legacy_has_honors_or_certs(text))
+
+
+def run(docs_count=5000):
+    docs, names = make_corpus(docs_count)
+
+    # Parity first: the saved models depend on these exact features
+    for text, name_words in zip(docs, names):
+        assert extract_features(text, name_words) == legacy_extract(text, name_words), text[:80]
+    cleaned, flags = extract_features_batch(docs, names)
+    for row, (text, name_words) in enumerate(zip(docs, names)):
+        legacy = legacy_extract(text, name_words)
+        assert cleaned[row] == legacy[0] and tuple(flags[row]) == legacy[1:]
+
+    timings = {}
+    started = time.perf_counter()
+    for text, name_words in zip(docs, names):
+        legacy_extract(text, name_words)
+    timings['legacy_per_doc_us'] = (time.perf_counter() - started) / docs_count * 1e6
+
+    started = time.perf_counter()
+    for text, name_words in zip(docs, names):
+        extract_features(text, name_words)
+    timings['features_per_doc_us'] = (time.perf_counter() - started) / docs_count * 1e6
+
+    started = time.perf_counter()
+    extract_features_batch(docs, names)
+    timings['features_batch_per_doc_us'] = (time.perf_counter() - started) / docs_count * 1e6
+
+    timings['speedup'] = timings['legacy_per_doc_us'] / timings['features_batch_per_doc_us']
+    print(f"{docs_count} docs, outputs identical")
+    print(f"legacy helpers : {timings['legacy_per_doc_us']:8.1f} us/doc")
+    print(f"extract_features: {timings['features_per_doc_us']:8.1f} us/doc")
+    print(f"batch mode     : {timings['features_batch_per_doc_us']:8.1f} us/doc  ({timings['speedup']:.2f}x)")
+    return timings
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--docs', type=int, default=5000)
+    args = parser.parse_args()
+    run(args.docs)
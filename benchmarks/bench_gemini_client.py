@@ -0,0 +1,155 @@
+"""
+Exercises gemini_client.ResilientGeminiClient against the local fake client:
+retry/backoff on retryable errors, no retry on client errors, the circuit
+breaker's open -> half-open -> closed cycle, the token-bucket rate limit and
+concurrency cap, and classify_resume's ML-only answer while the breaker is
+open. Asserts each behaviour and prints timings.
+
+    python benchmarks/bench_gemini_client.py
+"""
+import contextlib
+import io
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('GENAI_CACHE_PATH', 'off')
+
+from fake_gemini import FakeAPIError, FakeGeminiClient
+from gemini_client import CircuitBreaker, CircuitOpenError, ResilientGeminiClient
+
+
+class FakeClock:
+    """Manual clock; sleep() just advances it and records the delay."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def _wrap(fake, clock, **kwargs):
+    kwargs.setdefault('breaker', CircuitBreaker(failure_threshold=3, reset_timeout=30.0, clock=clock))
+    return ResilientGeminiClient(fake, clock=clock, sleep=clock.sleep, **kwargs)
+
+
+def check_retry():
+    clock = FakeClock()
+    fake = FakeGeminiClient(failures=[503, 429])
+    client = _wrap(fake, clock, max_retries=3, backoff_base=0.5)
+    with contextlib.redirect_stdout(io.StringIO()):
+        response = client.models.generate_content(model="m", contents="assess")
+    assert response.text == FakeGeminiClient.ASSESSMENT and fake.calls == 3
+    assert client.stats()['retries'] == 2 and len(clock.sleeps) == 2
+    assert 0.25 <= clock.sleeps[0] <= 0.5 and 0.5 <= clock.sleeps[1] <= 1.0, clock.sleeps
+    print(f"retry: 2 transient errors then success; backoff {[round(s, 2) for s in clock.sleeps]}s")
+
+
+def check_no_retry_on_client_error():
+    clock = FakeClock()
+    fake = FakeGeminiClient(failures=[400])
+    client = _wrap(fake, clock)
+    try:
+        client.models.generate_content(model="m", contents="assess")
+        raise AssertionError("400 should propagate")
+    except FakeAPIError as e:
+        assert e.code == 400
+    assert fake.calls == 1 and client.breaker.state == 'closed'
+    print("client error: 400 raised after 1 call, breaker still closed")
+
+
+def check_breaker():
+    clock = FakeClock()
+    fake = FakeGeminiClient(fail_always=503)
+    client = _wrap(fake, clock, max_retries=1)
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(3):
+            try:
+                client.models.generate_content(model="m", contents="assess")
+            except FakeAPIError:
+                pass
+    assert client.breaker.state == 'open' and client.is_open()
+    calls_when_opened = fake.calls
+    try:
+        client.models.generate_content(model="m", contents="assess")
+        raise AssertionError("open breaker should reject")
+    except CircuitOpenError:
+        pass
+    assert fake.calls == calls_when_opened, "open breaker must not reach the client"
+
+    clock.now += 30.0
+    assert client.breaker.state == 'half_open' and not client.is_open()
+    fake.fail_always = None
+    client.models.generate_content(model="m", contents="assess")
+    assert client.breaker.state == 'closed'
+    print(f"breaker: opened after 3 failed calls ({calls_when_opened} attempts), rejected while open, "
+          f"closed after a successful half-open trial")
+
+
+def check_rate_limit_and_concurrency(calls=30, rate=20.0, burst=5, max_concurrency=2):
+    fake = FakeGeminiClient(latency=0.02)
+    client = ResilientGeminiClient(fake, rate_per_second=rate, burst=burst, max_concurrency=max_concurrency)
+    in_flight, peak, lock = [0], [0], threading.Lock()
+    original = fake._respond
+
+    def tracked(prompt):
+        with lock:
+            in_flight[0] += 1
+            peak[0] = max(peak[0], in_flight[0])
+        try:
+            return original(prompt)
+        finally:
+            with lock:
+                in_flight[0] -= 1
+
+    fake._respond = tracked
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda _: client.models.generate_content(model="m", contents="assess"), range(calls)))
+    elapsed = time.perf_counter() - started
+    floor = (calls - burst) / rate
+    assert elapsed >= floor * 0.9, f"{calls} calls finished in {elapsed:.2f}s, faster than the {rate}/s limit"
+    assert peak[0] <= max_concurrency, f"{peak[0]} concurrent calls exceeded the cap of {max_concurrency}"
+    print(f"rate limit: {calls} calls in {elapsed:.2f}s (floor {floor:.2f}s at {rate:g}/s, burst {burst}); "
+          f"peak concurrency {peak[0]}/{max_concurrency}")
+
+
+def check_ml_only_when_open():
+    with contextlib.redirect_stdout(io.StringIO()):
+        import predict
+    clock = FakeClock()
+    fake = FakeGeminiClient(latency=0.2)
+    saved_client = predict.client
+    predict.client = _wrap(fake, clock)
+    try:
+        for _ in range(3):
+            predict.client.breaker.record_failure()
+        resume = "Python developer with Django, REST APIs, PostgreSQL and AWS experience."
+        with contextlib.redirect_stdout(io.StringIO()):
+            predict.classify_resume(resume, "Software Engineer")  # warm the model
+            started = time.perf_counter()
+            result = predict.classify_resume(resume, "Software Engineer", "Python, AWS")
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        assert fake.calls == 0, "no Gemini call may be made while the breaker is open"
+        assert result['ml_prediction'] in ('Select', 'Reject') and 'ML-only' in result['gen_ai_assessment']
+        print(f"breaker open: classify_resume returned the ML-only result in {elapsed_ms:.1f} ms")
+    finally:
+        predict.client = saved_client
+
+
+if __name__ == '__main__':
+    check_retry()
+    check_no_retry_on_client_error()
+    check_breaker()
+    check_rate_limit_and_concurrency()
+    check_ml_only_when_open()
@@ -0,0 +1,102 @@
+"""
+Login lookup latency versus number of accounts.
+
+Times the indexed user-database lookup used by /login and /signup against
+a linear scan over an in-memory dict of every account, from 10 to 1,000,000
+synthetic accounts, and times a full POST /login through the Flask test
+client at each size.
+
+    python benchmarks/bench_login.py [--max-users 1000000]
+"""
+import argparse
+import contextlib
+import gc
+import io
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('USER_DB_FILE', os.path.join(tempfile.mkdtemp(), 'bench_users.db'))
+
+with contextlib.redirect_stdout(io.StringIO()):
+    import app as app_module
+from user_store import UserStore
+
+
+def _make_users(count):
+    return {
+        str(i): {'email': f"user{i}@example.com", 'password': 'secret123', 'name': f"User {i}"}
+        for i in range(1, count + 1)
+    }
+
+
+def _make_store(users):
+    store = UserStore(os.path.join(tempfile.mkdtemp(), 'bench_login.db'))
+    with sqlite3.connect(store.db_path) as conn:
+        conn.executemany("INSERT INTO users (id, email, password, name) VALUES (?, ?, ?, ?)",
+                         [(uid, data['email'], data['password'], data['name']) for uid, data in users.items()])
+    return store
+
+
+def _linear_scan(users, email):
+    for uid, user_data in users.items():
+        if user_data['email'] == email:
+            return uid
+    return None
+
+
+def _time_per_call(fn, emails):
+    started = time.perf_counter()
+    for email in emails:
+        fn(email)
+    return (time.perf_counter() - started) / len(emails)
+
+
+def run(max_users=1_000_000, lookups=2000, requests=200):
+    results = []
+    size = 10
+    while size <= max_users:
+        users = _make_users(size)
+        app_module.user_store = _make_store(users)
+        # Move the synthetic accounts (kept for the scan) out of the cyclic GC's view;
+        # otherwise full collections triggered by request allocations scan every account dict.
+        gc.collect()
+        gc.freeze()
+        rng = random.Random(size)
+        emails = [f"USER{rng.randint(1, size)}@Example.com " for _ in range(lookups)]
+
+        indexed = _time_per_call(app_module.find_user_by_email, emails)
+        # The scan is O(n); cap its sample so the 10^6 row finishes in seconds
+        scan_emails = [email.strip().lower() for email in emails[:max(5, lookups * 1000 // size)]]
+        scan = _time_per_call(lambda email: _linear_scan(users, email), scan_emails)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            for email in emails[:requests]:
+                # Fresh client per login so flashed messages don't pile up in the session cookie
+                app_module.app.test_client().post('/login', data={'email': email, 'password': 'secret123'})
+            login_request = (time.perf_counter() - started) / requests
+
+        results.append({
+            'users': size,
+            'index_lookup_us': indexed * 1e6,
+            'linear_scan_us': scan * 1e6,
+            'login_roundtrip_ms': login_request * 1e3,
+        })
+        print(f"{size:>9} users | index {indexed * 1e6:8.2f} us | scan {scan * 1e6:12.2f} us "
+              f"| POST /login {login_request * 1e3:7.3f} ms")
+        gc.unfreeze()
+        size *= 10
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--max-users', type=int, default=1_000_000)
+    parser.add_argument('--lookups', type=int, default=2000)
+    args = parser.parse_args()
+    run(args.max_users, args.lookups)
@@ -0,0 +1,200 @@
+"""
+Near-duplicate resume detection (near_duplicates.py): lookup latency and
+memory with a large index, recall on lightly edited resubmissions, false
+matches between unrelated resumes, and Gemini calls saved end to end.
+
+The index is filled with synthetic signatures built from a shared pool of
+bullet points (a resume's MinHash is the position-wise minimum of its
+bullets'), then real generated resumes are inserted and queried with edited
+copies (bullets reordered, dates changed, a few words replaced) and with
+unrelated resumes. Finally classify_resume runs against the fake Gemini
+client to count the calls an edited resubmission makes in the default 'flag'
+mode and in the opt-in 'reuse' mode. Match thresholds are checked by
+tests/test_near_duplicates.py.
+
+    python benchmarks/bench_near_duplicates.py [--entries 200000] [--queries 1000] [--similarity 0.8]
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('GENAI_CACHE_PATH', 'off')
+
+from fake_gemini import FakeGeminiClient
+from features import clean_text_aggressively
+from gemini_client import ResilientGeminiClient
+from genai_cache import text_digest
+from near_duplicates import NUM_HASHES, NearDuplicateIndex, minhash, scope_hash
+
+with contextlib.redirect_stdout(io.StringIO()):
+    import predict
+
+ROLES = ["Software Engineer", "Data Scientist", "UI Designer", "Product Manager",
+         "DevOps Engineer", "Data Engineer", "QA Engineer", "Cloud Architect"]
+_MONTHS = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+
+
+class ResumeGenerator:
+    """Bulleted resumes over a Zipf-weighted vocabulary of made-up words."""
+
+    def __init__(self, seed=0, vocabulary=8000):
+        self.rng = random.Random(seed)
+        letters = "abcdefghijklmnopqrstuvwxyz"
+        self.vocabulary = ["".join(self.rng.choice(letters) for _ in range(self.rng.randint(4, 9)))
+                           for _ in range(vocabulary)]
+        self.weights = [1.0 / (rank + 1) for rank in range(vocabulary)]
+
+    def bullet(self):
+        return " ".join(self.rng.choices(self.vocabulary, self.weights, k=self.rng.randint(8, 20)))
+
+    def _date(self):
+        return f"{self.rng.choice(_MONTHS)} {self.rng.randint(2008, 2024)}"
+
+    def resume(self):
+        return [f"{self.bullet()} ({self._date()} - {self._date()})" for _ in range(self.rng.randint(15, 35))]
+
+    def edit(self, bullets, replaced_words=2):
+        """Reordered bullets, new dates and a few words replaced."""
+        edited = [bullet.split(" (")[0] + f" ({self._date()} - {self._date()})" for bullet in bullets]
+        self.rng.shuffle(edited)
+        for _ in range(replaced_words):
+            line = self.rng.randrange(len(edited))
+            words = edited[line].split(" ")
+            words[self.rng.randrange(len(words) - 4)] = self.rng.choice(self.vocabulary)
+            edited[line] = " ".join(words)
+        return edited
+
+
+def as_text(bullets):
+    return "Experience\n" + "\n".join(f"- {bullet}" for bullet in bullets)
+
+
+def _signature(text):
+    return minhash(clean_text_aggressively(text))
+
+
+def fill(index, generator, entries, scopes, pool_size=20000, batch=10000):
+    """Adds `entries` synthetic signatures, each the minimum over ~25 bullets drawn from a shared pool."""
+    pool = np.stack([minhash(clean_text_aggressively(generator.bullet())) for _ in range(pool_size)])
+    rng = np.random.default_rng(1)
+    started = time.perf_counter()
+    for offset in range(0, entries, batch):
+        size = min(batch, entries - offset)
+        picks = rng.integers(0, pool_size, size=(size, 25))
+        signatures = pool[picks].min(axis=1)
+        for row in range(size):
+            index.add(signatures[row], scopes[(offset + row) % len(scopes)], os.urandom(32).hex())
+    return time.perf_counter() - started
+
+
+def check_index(entries=200000, queries=1000, min_similarity=0.8):
+    generator = ResumeGenerator(seed=3)
+    scopes = [scope_hash(role) for role in ROLES]
+    index = NearDuplicateIndex(max_entries=entries, min_similarity=min_similarity)
+    fill_seconds = fill(index, generator, entries - queries, scopes)
+
+    originals = []
+    for i in range(queries):
+        bullets = generator.resume()
+        text = as_text(bullets)
+        scope = scopes[i % len(scopes)]
+        index.add(_signature(text), scope, text_digest(text))
+        originals.append((bullets, scope, text_digest(text)))
+
+    found, latencies_us, fingerprint_us = 0, [], []
+    for bullets, scope, digest in originals:
+        text = as_text(generator.edit(bullets))
+        started = time.perf_counter()
+        signature = _signature(text)
+        fingerprinted = time.perf_counter()
+        match = index.query(signature, scope)
+        latencies_us.append((time.perf_counter() - fingerprinted) * 1e6)
+        fingerprint_us.append((fingerprinted - started) * 1e6)
+        found += match is not None and match[0] == digest
+    false_matches = sum(
+        index.query(_signature(as_text(generator.resume())), scopes[i % len(scopes)]) is not None
+        for i in range(queries)
+    )
+    latencies_us.sort()
+    fingerprint_us.sort()
+    stats = index.stats()
+    return {
+        'entries': stats['entries'],
+        'bands': stats['bands'],
+        'rows_per_band': stats['rows_per_band'],
+        'fill_seconds': fill_seconds,
+        'memory_mb': stats['memory_bytes'] / 2**20,
+        'bytes_per_entry': stats['memory_bytes'] / entries,
+        'lookup_p50_us': latencies_us[len(latencies_us) // 2],
+        'lookup_p99_us': latencies_us[int(len(latencies_us) * 0.99)],
+        'minhash_p50_us': fingerprint_us[len(fingerprint_us) // 2],
+        'avg_candidates': stats['avg_candidates'],
+        'recall_edited': found / queries,
+        'false_match_rate': false_matches / queries,
+    }
+
+
+def check_reuse(mode='reuse'):
+    """Gemini calls for an original resume and then for an edited copy, with and without a JD."""
+    generator = ResumeGenerator(seed=5)
+    fake = FakeGeminiClient()
+    predict.client = ResilientGeminiClient(fake, rate_per_second=1e6, burst=10**6, max_concurrency=8)
+    predict.genai_cache.clear()
+    saved = predict.near_duplicate_index, predict.NEAR_DUP_MODE
+    predict.near_duplicate_index, predict.NEAR_DUP_MODE = NearDuplicateIndex(max_entries=1000), mode
+    try:
+        return _classify_pairs(generator, fake, mode)
+    finally:
+        predict.near_duplicate_index, predict.NEAR_DUP_MODE = saved
+
+
+def _classify_pairs(generator, fake, mode):
+    calls = {}
+    for job_description in (None, "Python services on AWS"):
+        bullets = generator.resume()
+        with contextlib.redirect_stdout(io.StringIO()):
+            before = fake.calls
+            predict.classify_resume(as_text(bullets), "Software Engineer", job_description)
+            original_calls = fake.calls - before
+            before = fake.calls
+            second = predict.classify_resume(as_text(generator.edit(bullets)), "Software Engineer", job_description)
+        label = 'with_jd' if job_description else 'without_jd'
+        calls[label] = {'original_calls': original_calls, 'edited_copy_calls': fake.calls - before,
+                        'near_duplicate': second.get('near_duplicate')}
+    return calls
+
+
+def run(entries=200000, queries=1000, min_similarity=0.8):
+    results = {'index': check_index(entries, queries, min_similarity)}
+    index = results['index']
+    print(f"{index['entries']} entries, {index['bands']} bands x {index['rows_per_band']} rows of {NUM_HASHES} hashes: "
+          f"{index['memory_mb']:.1f} MiB ({index['bytes_per_entry']:.0f} B/entry), filled in {index['fill_seconds']:.1f}s")
+    print(f"lookup p50 {index['lookup_p50_us']:.0f} us, p99 {index['lookup_p99_us']:.0f} us "
+          f"({index['avg_candidates']:.1f} candidates); MinHash p50 {index['minhash_p50_us']:.0f} us")
+    print(f"recall on edited copies {index['recall_edited']:.1%}, false matches on unrelated resumes "
+          f"{index['false_match_rate']:.2%} (similarity >= {min_similarity:g})")
+    for mode in ('flag', 'reuse'):
+        results[mode] = check_reuse(mode)
+        for label, numbers in results[mode].items():
+            match = numbers['near_duplicate']
+            similarity = f"similarity {match['similarity']:.2f}" if match else "not matched"
+            print(f"{mode:>5} {label:>10}: original {numbers['original_calls']} Gemini calls, edited copy "
+                  f"{numbers['edited_copy_calls']} ({similarity})")
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--entries', type=int, default=200000)
+    parser.add_argument('--queries', type=int, default=1000)
+    parser.add_argument('--similarity', type=float, default=0.8)
+    args = parser.parse_args()
+    run(args.entries, args.queries, args.similarity)
@@ -0,0 +1,187 @@
+"""
+Online model updates from recruiter feedback (online_learning.py) against
+full retraining, on a holdout set.
+
+A role model is trained on 400 labeled resumes, then 1,600 feedback
+decisions arrive in micro-batches. At 0, 400, 800 and 1,600 feedback items
+the holdout accuracy of three models is compared: the original batch model
+left frozen, a full main.py-style retrain (TF-IDF + LogisticRegression) on
+everything seen so far, and the online hashing + SGD model updated in place
+by OnlineLearner. Two scenarios: 'stationary' (feedback follows the training
+data) and 'drift' (recruiters now select for a different skill set, and the
+holdout follows the feedback). Also times a micro-batch update against a full
+retrain, a checkpoint write and reload, and POST /feedback. Exits non-zero
+when the online model ends more than --tolerance below the full retrain.
+
+    python benchmarks/bench_online_learning.py [--feedback 1600] [--tolerance 0.03]
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('USER_DB_FILE', os.path.join(tempfile.mkdtemp(), 'bench_online.db'))
+os.environ.setdefault('GENAI_CACHE_PATH', 'off')
+
+from synthetic_data import GENERIC_WORDS
+from online_learning import OnlineLearner, bootstrap_role, checkpoint_path, hashing_features
+
+ROLE = 'Software Engineer'
+# Skills recruiters select for before ('A') and after ('B') the drift
+SKILLS = {
+    'A': "python java golang microservices kubernetes docker testing algorithms".split(),
+    'B': "rust wasm graphql typescript serverless observability terraform react".split(),
+}
+
+
+def make_feedback(count, phase, seed, words=150):
+    """(resume text, 1 = Select / 0 = Reject) pairs; selected resumes lean on the phase's skills."""
+    rng = random.Random(seed)
+    wanted = SKILLS[phase]
+    other = SKILLS['B' if phase == 'A' else 'A']
+    rows = []
+    for _ in range(count):
+        selected = rng.random() < 0.45
+        # Rejected resumes mention skills from both sets, so only the wanted set is informative
+        pool = wanted if selected else wanted + other
+        share = 0.12 if selected else 0.10
+        body = [rng.choice(pool) if rng.random() < share else rng.choice(GENERIC_WORDS) for _ in range(words)]
+        extras = []
+        if rng.random() < (0.6 if selected else 0.2): extras.append("Portfolio: https://example.dev/me")
+        if rng.random() < (0.5 if selected else 0.15): extras.append("Received an award.")
+        rows.append(("Experience: " + " ".join(body) + " " + " ".join(extras), int(selected)))
+    return rows
+
+
+def full_retrain(rows):
+    """main.py's vectorizer and model fitted on every row; returns a predict(texts) function."""
+    from scipy.sparse import hstack
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression
+    from features import extract_features_batch
+    from main import MODEL_PARAMS, TFIDF_PARAMS
+
+    cleaned, flags = extract_features_batch([text for text, _ in rows])
+    vectorizer = TfidfVectorizer(**TFIDF_PARAMS)
+    model = LogisticRegression(**MODEL_PARAMS).fit(hstack([vectorizer.fit_transform(cleaned), flags]),
+                                                   [label for _, label in rows])
+
+    def predict(texts):
+        cleaned, flags = extract_features_batch(texts)
+        return model.predict(hstack([vectorizer.transform(cleaned), flags]))
+    return predict
+
+
+def _accuracy(predicted, holdout):
+    return float(np.mean(np.asarray(predicted) == np.array([label for _, label in holdout])))
+
+
+def scenario(name, feedback_count=1600, batch_size=32, checkpoints=(400, 800, 1600)):
+    phase = 'A' if name == 'stationary' else 'B'
+    initial = make_feedback(400, 'A', seed=1)
+    feedback = make_feedback(feedback_count, phase, seed=2)
+    holdout = make_feedback(600, phase, seed=3)
+    holdout_texts = [text for text, _ in holdout]
+    checkpoints = [count for count in checkpoints if count <= feedback_count]
+
+    frozen = full_retrain(initial)
+    directory = tempfile.mkdtemp(prefix='bench_online_')
+    learner = OnlineLearner(directory, batch_size=batch_size, checkpoint_seconds=float('inf'))
+    learner.add_role(bootstrap_role(ROLE, [text for text, _ in initial], [label for _, label in initial]))
+    rows = [{'id': i, 'job_role': ROLE, 'resume_text': text, 'decision': label}
+            for i, (text, label) in enumerate(feedback, start=1)]
+    source = lambda after_id, limit: rows[after_id:after_id + limit]  # ids are 1-based positions
+
+    online_scores = lambda: _accuracy(learner.select_probabilities(ROLE, holdout_texts) > 0.5, holdout)
+    result = {'scenario': name, 'feedback': [0], 'frozen': [_accuracy(frozen(holdout_texts), holdout)],
+              'full_retrain': [_accuracy(frozen(holdout_texts), holdout)], 'online': [online_scores()]}
+    retrain_seconds = []
+    for count in checkpoints:
+        while learner.stats()['feedback_cursor'] < count:
+            learner.step(lambda after_id, limit: source(after_id, min(limit, count - after_id)))
+        started = time.perf_counter()
+        retrained = full_retrain(initial + feedback[:count])
+        retrain_seconds.append(time.perf_counter() - started)
+        result['feedback'].append(count)
+        result['frozen'].append(result['frozen'][0])
+        result['full_retrain'].append(_accuracy(retrained(holdout_texts), holdout))
+        result['online'].append(online_scores())
+    stats = learner.stats()
+    result['online_update_ms'] = stats['avg_batch_ms']
+    result['full_retrain_seconds'] = retrain_seconds[-1]
+    result['progressive_accuracy'] = stats['roles'][ROLE]['progressive_accuracy']
+
+    # Checkpoint round trip: a second learner (another process) must score identically
+    started = time.perf_counter()
+    learner.checkpoint()
+    result['checkpoint_ms'] = (time.perf_counter() - started) * 1e3
+    result['checkpoint_bytes'] = os.path.getsize(checkpoint_path(directory, ROLE))
+    reader = OnlineLearner(directory)
+    started = time.perf_counter()
+    reader.load()
+    result['reload_ms'] = (time.perf_counter() - started) * 1e3
+    result['reload_matches'] = bool(np.allclose(reader.select_probabilities(ROLE, holdout_texts[:50]),
+                                                learner.select_probabilities(ROLE, holdout_texts[:50])))
+    return result
+
+
+def feedback_endpoint_latency(requests=200):
+    """Mean POST /feedback round trip (stores the decision; learning happens off the request path)."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        import app as app_module
+    email = f"recruiter{random.randrange(10**9)}@example.com"
+    app_module.user_store.create_user(email, 'secret123', 'Recruiter')
+    client = app_module.app.test_client()
+    resumes = make_feedback(requests, 'A', seed=4)
+    with contextlib.redirect_stdout(io.StringIO()):
+        client.post('/login', data={'email': email, 'password': 'secret123'})
+        started = time.perf_counter()
+        statuses = [client.post('/feedback', json={'resume_text': text, 'job_role': ROLE,
+                                                    'decision': 'Select' if label else 'Reject'}).status_code
+                    for text, label in resumes]
+        elapsed = time.perf_counter() - started
+    return {'feedback_post_ms': elapsed / requests * 1e3, 'accepted': statuses.count(202), 'requests': requests}
+
+
+def run(feedback_count=1600, tolerance=0.03, endpoint_requests=200):
+    hashing_features(["warm-up"])  # import sklearn/scipy outside the timings
+    report = {'tolerance': tolerance, 'scenarios': []}
+    for name in ('stationary', 'drift'):
+        result = scenario(name, feedback_count)
+        report['scenarios'].append(result)
+        print(f"{name}: holdout accuracy after {result['feedback']} feedback items")
+        for model in ('frozen', 'full_retrain', 'online'):
+            print(f"   {model:<13}" + " ".join(f"{score:6.3f}" for score in result[model]))
+        print(f"   update {result['online_update_ms']:.1f} ms per micro-batch vs full retrain "
+              f"{result['full_retrain_seconds'] * 1e3:.0f} ms; checkpoint {result['checkpoint_bytes'] / 1024:.0f} KiB "
+              f"in {result['checkpoint_ms']:.0f} ms, reload {result['reload_ms']:.0f} ms "
+              f"({'matches' if result['reload_matches'] else 'DIFFERS'}); "
+              f"progressive accuracy {result['progressive_accuracy']:.3f}")
+    report['endpoint'] = feedback_endpoint_latency(endpoint_requests)
+    print(f"POST /feedback: {report['endpoint']['feedback_post_ms']:.2f} ms "
+          f"({report['endpoint']['accepted']}/{report['endpoint']['requests']} accepted)")
+    report['keeps_pace'] = all(
+        result['online'][-1] >= result['full_retrain'][-1] - tolerance and result['reload_matches']
+        for result in report['scenarios']
+    ) and report['endpoint']['accepted'] == endpoint_requests
+    return report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--feedback', type=int, default=1600, help="Feedback decisions per scenario")
+    parser.add_argument('--tolerance', type=float, default=0.03,
+                        help="Allowed final accuracy gap to the full retrain (default: %(default)s)")
+    args = parser.parse_args()
+    report = run(args.feedback, args.tolerance)
+    if not report['keeps_pace']:
+        print("FAIL: the online model fell behind full retraining")
+        sys.exit(1)
@@ -0,0 +1,221 @@
+"""
+Pre-fork serving (serve.py) under load: throughput with 1 and N worker
+processes, memory shared between workers, and whether any signup or history
+write is lost or duplicated when several processes write at once.
+
+For each worker count a fresh server is started on temporary databases.
+Client processes sign up and log in one account each, then POST /classify
+(ML-only: no API_KEY is passed) as fast as they can; meanwhile another group
+signs up the same email at the same instant. Afterwards the user database
+must hold exactly one account per client plus one for the contested email,
+with unique ids, and one history row per 200 response. Exits non-zero
+otherwise. Client processes share the machine's cores with the server, so
+scaling is bounded by cores / (server + clients).
+
+    python benchmarks/bench_prefork.py [--workers 1,4] [--clients 8] [--requests 50] [--racers 8]
+"""
+import argparse
+import http.cookiejar
+import json
+import multiprocessing
+import os
+import re
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_features import make_corpus
+
+_READY_RE = re.compile(r'on (http://[\d.]+:\d+)')
+PASSWORD = 'bench-password'
+
+
+# --- Server ---
+def start_server(workers, directory):
+    env = dict(os.environ)
+    env.pop('API_KEY', None)
+    env.update({
+        'USER_DB_FILE': os.path.join(directory, 'users.db'),
+        'JOB_QUEUE_PATH': os.path.join(directory, 'jobs.sqlite3'),
+        'GENAI_CACHE_PATH': 'off',
+        'NEAR_DUP_MODE': 'off',
+        'PYTHONUNBUFFERED': '1',
+    })
+    process = subprocess.Popen([sys.executable, 'serve.py', '--port', '0', '--workers', str(workers)], cwd=ROOT,
+                               env=env, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    for line in process.stdout:
+        match = _READY_RE.search(line)
+        if match:
+            # Keep reading so the workers' request logging never fills the pipe and blocks them
+            threading.Thread(target=process.stdout.read, daemon=True).start()
+            return process, match.group(1)
+    raise RuntimeError(f"serve.py exited with {process.wait()} before it was ready")
+
+
+def _worker_pids(master_pid):
+    try:
+        with open(f"/proc/{master_pid}/task/{master_pid}/children") as f:
+            return [int(pid) for pid in f.read().split()]
+    except OSError:
+        return []
+
+
+def memory_report(master_pid):
+    """Average RSS and private (unshared) memory per worker in MiB, from /proc (Linux only)."""
+    rss, private = [], []
+    for pid in _worker_pids(master_pid):
+        try:
+            with open(f"/proc/{pid}/smaps_rollup") as f:
+                fields = dict(line.split(':', 1) for line in f if ':' in line and not line.startswith(' '))
+        except OSError:
+            continue
+        kib = lambda name: int(fields.get(name, '0 kB').split()[0])
+        rss.append(kib('Rss') / 1024)
+        private.append((kib('Private_Dirty') + kib('Private_Clean')) / 1024)
+    if not rss:
+        return None
+    return {'worker_rss_mb': sum(rss) / len(rss), 'worker_private_mb': sum(private) / len(private)}
+
+
+# --- Clients ---
+def _session(base_url):
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+
+    def post(path, form=None, payload=None):
+        if payload is not None:
+            request = urllib.request.Request(base_url + path, data=json.dumps(payload).encode(),
+                                             headers={'Content-Type': 'application/json'})
+        else:
+            request = urllib.request.Request(base_url + path, data=urllib.parse.urlencode(form).encode())
+        try:
+            with opener.open(request, timeout=60) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            return e.code
+    return post
+
+
+def _classifying_client(base_url, index, docs, barrier, results):
+    post = _session(base_url)
+    email = f"client{index}@example.com"
+    post('/signup', form={'name': f"Client {index}", 'email': email, 'password': PASSWORD})
+    post('/login', form={'email': email, 'password': PASSWORD})
+    barrier.wait()
+    started = time.perf_counter()
+    statuses = [post('/classify', payload={'resume_text': doc, 'job_role': 'Software Engineer'}) for doc in docs]
+    results.put({'email': email, 'ok': statuses.count(200), 'failed': len(statuses) - statuses.count(200),
+                 'seconds': time.perf_counter() - started})
+
+
+def _racing_client(base_url, index, barrier, results):
+    post = _session(base_url)
+    barrier.wait()
+    post('/signup', form={'name': f"Racer {index}", 'email': 'contested@example.com', 'password': PASSWORD})
+    results.put(None)
+
+
+def load(base_url, clients, requests_per_client, racers):
+    docs, _ = make_corpus(clients * requests_per_client, seed=41)
+    context = multiprocessing.get_context('fork')
+    barrier = context.Barrier(clients + racers + 1)
+    results = context.Queue()
+    processes = [context.Process(target=_classifying_client, args=(
+        base_url, i, docs[i * requests_per_client:(i + 1) * requests_per_client], barrier, results))
+        for i in range(clients)]
+    processes += [context.Process(target=_racing_client, args=(base_url, i, barrier, results)) for i in range(racers)]
+    for process in processes:
+        process.start()
+    barrier.wait()
+    started = time.perf_counter()
+    finished = [results.get() for _ in processes]
+    elapsed = time.perf_counter() - started
+    for process in processes:
+        process.join()
+    return [result for result in finished if result is not None], elapsed
+
+
+# --- Consistency ---
+def check_database(db_path, client_results):
+    conn = sqlite3.connect(db_path)
+    emails = [row[0] for row in conn.execute("SELECT lower(trim(email)) FROM users")]
+    ids = [int(row[0]) for row in conn.execute("SELECT id FROM users")]
+    next_id = int(conn.execute("SELECT value FROM meta WHERE key = 'next_user_id'").fetchone()[0])
+    lost_history = 0
+    for result in client_results:
+        row = conn.execute("SELECT COUNT(*) FROM history h JOIN users u ON u.id = h.user_id "
+                           "WHERE lower(u.email) = ?", (result['email'],)).fetchone()
+        lost_history += result['ok'] - row[0]
+    conn.close()
+    expected = {result['email'] for result in client_results} | {'contested@example.com', 'admin@example.com'}
+    return {
+        'accounts': len(emails),
+        'missing_signups': len(expected - set(emails)),
+        'duplicate_emails': len(emails) - len(set(emails)),
+        'contested_accounts': emails.count('contested@example.com'),
+        'ids_unique_and_next_id_ahead': len(set(ids)) == len(ids) and next_id > max(ids),
+        'lost_history_writes': lost_history,
+    }
+
+
+def run(worker_counts=(1, 4), clients=8, requests_per_client=50, racers=8):
+    report = {'cpu_count': os.cpu_count(), 'clients': clients, 'requests_per_client': requests_per_client, 'runs': []}
+    for workers in worker_counts:
+        directory = tempfile.mkdtemp(prefix='bench_prefork_')
+        process, base_url = start_server(workers, directory)
+        try:
+            client_results, elapsed = load(base_url, clients, requests_per_client, racers)
+            memory = memory_report(process.pid)
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+        ok = sum(result['ok'] for result in client_results)
+        row = {
+            'workers': workers,
+            'classify_ok': ok,
+            'classify_failed': sum(result['failed'] for result in client_results),
+            'requests_per_second': ok / elapsed,
+            **(memory or {}),
+            **check_database(os.path.join(directory, 'users.db'), client_results),
+        }
+        report['runs'].append(row)
+        print(f"{workers} worker(s): {row['requests_per_second']:.0f} classify/s ({ok} ok, {row['classify_failed']} failed)"
+              + (f"; per worker {row['worker_rss_mb']:.0f} MiB RSS, {row['worker_private_mb']:.0f} MiB private"
+                 if memory else ""))
+        print(f"   {row['accounts']} accounts, missing signups {row['missing_signups']}, duplicate emails "
+              f"{row['duplicate_emails']}, contested email registered {row['contested_accounts']}x, "
+              f"lost history writes {row['lost_history_writes']}")
+    base = report['runs'][0]['requests_per_second']
+    for row in report['runs']:
+        row['speedup'] = row['requests_per_second'] / base if base else 0.0
+    print(f"speedup vs {report['runs'][0]['workers']} worker(s): "
+          + ", ".join(f"{row['workers']} -> {row['speedup']:.2f}x" for row in report['runs'])
+          + f" on {report['cpu_count']} CPU(s)")
+    report['consistent'] = all(
+        row['missing_signups'] == 0 and row['duplicate_emails'] == 0 and row['contested_accounts'] == 1
+        and row['ids_unique_and_next_id_ahead'] and row['lost_history_writes'] == 0 and row['classify_failed'] == 0
+        for row in report['runs']
+    )
+    return report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', default=f"1,{max(2, os.cpu_count() or 1)}", help="Comma-separated worker counts")
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=50, help="/classify requests per client")
+    parser.add_argument('--racers', type=int, default=8, help="Clients signing up the same email at once")
+    args = parser.parse_args()
+    report = run([int(count) for count in args.workers.split(',')], args.clients, args.requests, args.racers)
+    if not report['consistent']:
+        print("FAIL: lost, duplicated or failed writes")
+        sys.exit(1)
@@ -0,0 +1,246 @@
+"""
+Prompt compaction (prompt_compaction.py): input tokens saved, and whether
+the assessments on a sample set stay the same.
+
+For each sample resume (and job description) the Gen AI assessment is
+requested with compaction off and then on, and the match ratings
+(Strong/Good/Weak/Poor) are compared. Offline, two local stand-ins rate the
+resume text in the prompt: 'skill_keywords' by how many of the role's key
+skills it names (the same kind of signal the compactor keeps, so it rarely
+disagrees) and 'tenure' by the years covered by its date ranges (which the
+compactor does not look at). Only --live (with API_KEY set), which asks the
+real Gemini model, says whether compaction is safe to turn on. The ML
+prediction on the compacted resume is compared as well.
+
+The sample set is generated (long, boilerplate-heavy resumes and job
+descriptions for eight roles) unless --sample points at a CSV with
+'Resume', 'Role' and optionally 'Job Description' columns. Exits non-zero
+when any assessor's rating agreement is below --min-agreement.
+
+    python benchmarks/bench_prompt_compaction.py [--resumes 80] [--sample data.csv] [--live] [--min-agreement 1.0]
+"""
+import argparse
+import contextlib
+import csv
+import io
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('GENAI_CACHE_PATH', 'off')
+os.environ.setdefault('NEAR_DUP_MODE', 'off')
+
+from fake_gemini import FakeGeminiClient
+from gemini_client import ResilientGeminiClient
+from synthetic_data import ROLE_SKILLS
+
+with contextlib.redirect_stdout(io.StringIO()):
+    import predict
+
+_RATING_RE = re.compile(r'\b(Strong|Good|Weak|Poor)\b', re.IGNORECASE)
+_FILLER = (
+    "Highly motivated and results-oriented professional with a passion for excellence and a proven track record. "
+    "Team player with strong communication and interpersonal skills, able to work under pressure and meet deadlines. "
+)
+_JD_BOILERPLATE = (
+    "About us: we are a fast-growing, award-winning company on a mission to delight customers around the world. "
+    "Our culture values ownership, curiosity and kindness, and we celebrate wins together.\n"
+    "Benefits: competitive salary, equity, health, dental and vision insurance, 401(k) matching, "
+    "flexible hours, remote-friendly offices, learning budget and generous parental leave.\n"
+    "We are an equal opportunity employer. All qualified applicants will receive consideration for employment "
+    "without regard to race, color, religion, sex, sexual orientation, gender identity, national origin, "
+    "disability or protected veteran status. If you need an accommodation during the application process, "
+    "please let us know.\n"
+)
+
+
+# --- Sample set ---
+def make_sample(count, seed=17):
+    """[(role, resume, job description)] with contact blocks, filler, personal details and boilerplate."""
+    rng = random.Random(seed)
+    roles = list(ROLE_SKILLS)
+    samples = []
+    for i in range(count):
+        role = roles[i % len(roles)]
+        skills = ROLE_SKILLS[role].split()
+        known = rng.sample(skills, rng.randint(1, len(skills)))
+        lines = ["ALEX   MORGAN", "Phone: +1 (555) 010-2030  |  Email: alex.morgan@example.com  |  linkedin.com/in/amorgan", "",
+                 "OBJECTIVE", _FILLER * rng.randint(1, 4), "", "EXPERIENCE"]
+        for job in range(rng.randint(2, 5)):
+            lines.append(f"{role}, Company {job}          Jan {2012 + job} - Dec {2013 + job}")
+            for _ in range(rng.randint(3, 7)):
+                used = ", ".join(rng.sample(known, min(len(known), rng.randint(1, 3))))
+                lines.append(f"  - Delivered projects using {used}; improved throughput by {rng.randint(5, 60)}% for {rng.randint(2, 40)} teams.")
+                if rng.random() < 0.5:
+                    lines.append("  - Attended weekly meetings and prepared status reports for stakeholders.")
+        lines += ["", "EDUCATION", "B.Sc., State University, 2011", "", "PERSONAL DETAILS",
+                  "Date of birth: 01/02/1990", "Nationality: -", "Marital status: -", "",
+                  "HOBBIES", "Reading, travelling, cooking.", "", "REFERENCES", "Available upon request.", "",
+                  "DECLARATION", "I hereby declare that the above information is true to the best of my knowledge and belief."]
+        resume = "\n".join(lines)
+        job_description = None
+        if rng.random() < 0.6:
+            job_description = (f"We are hiring a {role}.\nResponsibilities: build and improve our products using "
+                               f"{', '.join(rng.sample(skills, 4))}.\nRequirements: experience with {', '.join(rng.sample(skills, 3))}.\n"
+                               + _JD_BOILERPLATE * rng.randint(1, 3))
+        samples.append((role, resume, job_description))
+    return samples
+
+
+def load_sample(path, limit):
+    samples = []
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            if row.get('Resume') and row.get('Role'):
+                samples.append((row['Role'], row['Resume'], row.get('Job Description') or None))
+            if len(samples) >= limit:
+                break
+    return samples
+
+
+# --- Offline assessor ---
+class SkillAssessor(FakeGeminiClient):
+    """Rates the resume in an assessment prompt by how many of the role's key skills it names."""
+
+    def _respond(self, prompt):
+        reply = super()._respond(prompt)
+        if reply is not self.ASSESSMENT:
+            return reply
+        role = re.search(r"job role of '([^']*)'", prompt).group(1)
+        resume = prompt.split("---")[1].lower()
+        skills = set(ROLE_SKILLS.get(role, "").split())
+        found = sum(1 for skill in skills if re.search(rf"\b{re.escape(skill)}\b", resume))
+        rating = "Strong" if found >= 7 else "Good" if found >= 5 else "Weak" if found >= 3 else "Poor"
+        return f"This candidate appears to be a {rating} match. The resume names {found} of the role's key skills."
+
+
+_TENURE_RE = re.compile(r'\b((?:19|20)\d\d)\s*[-\u2013]\s*(?:[A-Za-z]+\.?\s+)?((?:19|20)\d\d|present)\b', re.IGNORECASE)
+
+
+class TenureAssessor(FakeGeminiClient):
+    """Rates the resume in an assessment prompt by the years its date ranges cover, ignoring skills."""
+
+    def _respond(self, prompt):
+        reply = super()._respond(prompt)
+        if reply is not self.ASSESSMENT:
+            return reply
+        years = sum((2025 if end.lower() == 'present' else int(end)) - int(start)
+                    for start, end in _TENURE_RE.findall(prompt.split("---")[1]))
+        rating = "Strong" if years >= 5 else "Good" if years >= 4 else "Weak" if years >= 3 else "Poor"
+        return f"This candidate appears to be a {rating} match. The resume covers {years} years of experience."
+
+
+# --- Comparison ---
+def _assess(samples, compaction):
+    """(assessment ratings, ML labels on the resume text the prompts carry) with compaction on or off."""
+    predict.prompt_compactor.enabled = compaction
+    predict._compacted.cache_clear()
+    predict.genai_cache.clear()
+    ratings, labels = [], []
+    for role, resume, job_description in samples:
+        with contextlib.redirect_stdout(io.StringIO()):
+            assessment = predict.get_gen_ai_assessment(resume, role)
+            predict.get_resume_jd_comparison(resume, job_description, role)
+            predict.get_resume_improvement_suggestions(resume, role)
+            _, label, _ = predict._ml_step(predict._prompt_resume(resume, role), role)
+        match = _RATING_RE.search(assessment.get("gen_ai_assessment", ""))
+        ratings.append(match.group(1).title() if match else assessment.get("gen_ai_sentiment"))
+        labels.append(label)
+    return ratings, labels
+
+
+def _compare(samples, assessor):
+    """Ratings and ML labels with compaction off and on, through one assessor (None: the real Gemini client)."""
+    if assessor is not None:
+        predict.client = ResilientGeminiClient(assessor, rate_per_second=1e6, burst=10**6, max_concurrency=8)
+    results = {}
+    for compaction in (False, True):
+        chars_before = assessor.prompt_chars if assessor else 0
+        started = time.perf_counter()
+        ratings, labels = _assess(samples, compaction)
+        results['on' if compaction else 'off'] = {
+            'ratings': ratings, 'labels': labels, 'seconds': time.perf_counter() - started,
+            'prompt_tokens': ((assessor.prompt_chars - chars_before) // 4) if assessor else None,
+        }
+    off, on = results['off'], results['on']
+    return {
+        'rating_agreement': sum(a == b for a, b in zip(off['ratings'], on['ratings'])) / len(samples),
+        'ml_label_agreement': sum(a == b for a, b in zip(off['labels'], on['labels'])) / len(samples),
+        'prompt_tokens_off': off['prompt_tokens'],
+        'prompt_tokens_on': on['prompt_tokens'],
+        'rating_changes': [(off_rating, on_rating) for off_rating, on_rating in zip(off['ratings'], on['ratings'])
+                           if off_rating != on_rating],
+    }
+
+
+def run(resume_count=80, sample_path=None, live=False):
+    samples = load_sample(sample_path, resume_count) if sample_path else make_sample(resume_count)
+    if live:
+        predict.client = predict._CLIENT_UNSET
+        if predict.get_client() is None:
+            raise SystemExit("--live needs API_KEY for the Gemini client")
+        assessors = {'gemini': None}
+    else:
+        assessors = {'skill_keywords': SkillAssessor(), 'tenure': TenureAssessor()}
+
+    configured = predict.prompt_compactor.enabled
+    comparisons = {name: _compare(samples, assessor) for name, assessor in assessors.items()}
+    predict.prompt_compactor.enabled = True
+
+    predict._compacted.cache_clear()
+    resume_before = resume_after = jd_before = jd_after = 0
+    started = time.perf_counter()
+    for role, resume, job_description in samples:
+        compacted = predict._compacted(resume, role, 'resume')
+        resume_before += compacted.tokens_before
+        resume_after += compacted.tokens_after
+        if job_description:
+            compacted = predict._compacted(job_description, role, 'jd')
+            jd_before += compacted.tokens_before
+            jd_after += compacted.tokens_after
+    compaction_ms = (time.perf_counter() - started) * 1e3 / len(samples)
+    predict.prompt_compactor.enabled = configured
+
+    first = next(iter(comparisons.values()))
+    report = {
+        'samples': len(samples),
+        'resume_tokens_before': resume_before / len(samples),
+        'resume_tokens_after': resume_after / len(samples),
+        'jd_tokens_before': jd_before / len(samples),
+        'jd_tokens_after': jd_after / len(samples),
+        'prompt_tokens_off': first['prompt_tokens_off'],
+        'prompt_tokens_on': first['prompt_tokens_on'],
+        'compaction_ms': compaction_ms,
+        'assessors': comparisons,
+        'rating_agreement': min(comparison['rating_agreement'] for comparison in comparisons.values()),
+    }
+    print(f"{len(samples)} samples, budgets "
+          f"{predict.prompt_compactor.resume_budget}/{predict.prompt_compactor.job_description_budget} tokens (resume/JD)")
+    print(f"resume ~{report['resume_tokens_before']:.0f} -> ~{report['resume_tokens_after']:.0f} tokens, "
+          f"JD ~{report['jd_tokens_before']:.0f} -> ~{report['jd_tokens_after']:.0f} tokens per sample; "
+          f"{report['compaction_ms']:.2f} ms to compact")
+    if report['prompt_tokens_off']:
+        print(f"prompt tokens sent: ~{report['prompt_tokens_off']} -> ~{report['prompt_tokens_on']} "
+              f"({1 - report['prompt_tokens_on'] / report['prompt_tokens_off']:.0%} fewer)")
+    for name, comparison in comparisons.items():
+        print(f"{name:>14}: assessment rating unchanged for {comparison['rating_agreement']:.0%} of samples, "
+              f"ML label for {comparison['ml_label_agreement']:.0%}"
+              + (f"; {len(comparison['rating_changes'])} changed" if comparison['rating_changes'] else ""))
+    return report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--resumes', type=int, default=80)
+    parser.add_argument('--sample', help="CSV with Resume, Role and optional 'Job Description' columns")
+    parser.add_argument('--live', action='store_true', help="Ask Gemini (needs API_KEY) instead of the offline assessor")
+    parser.add_argument('--min-agreement', type=float, default=1.0)
+    args = parser.parse_args()
+    report = run(args.resumes, args.sample, args.live)
+    if report['rating_agreement'] < args.min_agreement:
+        print(f"FAIL: lowest rating agreement {report['rating_agreement']:.0%} is below {args.min_agreement:.0%}")
+        sys.exit(1)
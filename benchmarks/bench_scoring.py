@@ -0,0 +1,80 @@
+"""
+Single-resume ML scoring: the old sklearn path (transform + hstack +
+predict + predict_proba) versus the compiled RoleScorer built from the
+joblib artifacts and from the memory-mapped bundle.
+
+Also times best-fit ranking (every role in one stacked product) against
+scoring each role in turn. That the paths agree is checked by
+tests/test_scoring.py.
+
+    python benchmarks/bench_scoring.py [--docs 300]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_features import make_corpus
+from model_bundle import BundleLoader
+from model_registry import ModelRegistry
+from features import clean_text_aggressively, has_honors_or_certs, has_portfolio_link
+from scipy.sparse import hstack
+
+
+def sklearn_select_probability(model, vectorizer, resume_text):
+    """classify_resume's ML step before the fast path (kept here as the reference)."""
+    cleaned_resume = clean_text_aggressively(resume_text, set())
+    engineered_features = np.array([[has_portfolio_link(resume_text), has_honors_or_certs(resume_text)]])
+    features_combined = hstack([vectorizer.transform([cleaned_resume]), engineered_features])
+    model.predict(features_combined)
+    return model.predict_proba(features_combined)[0][1]
+
+
+def _per_call_us(fn, docs):
+    started = time.perf_counter()
+    for doc in docs:
+        fn(doc)
+    return (time.perf_counter() - started) / len(docs) * 1e6
+
+
+def run(docs_count=300, model_dir=os.path.join(ROOT, "saved_models"), timing_role='software_engineer'):
+    docs, _ = make_corpus(docs_count, seed=7)
+    docs += ["", "a b", "Portfolio at www.example.dev", "Patent holder"]
+    registry = ModelRegistry(model_dir)
+    with contextlib.redirect_stdout(io.StringIO()):
+        bundle = BundleLoader(model_dir).get()
+
+    # --- Timing ---
+    model, vectorizer = registry.get(timing_role)
+    scorer = registry.get_scorer(timing_role)
+    timings = {
+        'sklearn_us': _per_call_us(lambda doc: sklearn_select_probability(model, vectorizer, doc), docs),
+        'compiled_us': _per_call_us(scorer.select_probability, docs),
+    }
+    if bundle is not None and bundle.has_role(timing_role):
+        bundle_scorer = bundle.role_scorer(timing_role)
+        timings['bundle_compiled_us'] = _per_call_us(bundle_scorer.select_probability, docs)
+    timings['speedup'] = timings['sklearn_us'] / timings['compiled_us']
+    if bundle is not None:
+        timings['rank_all_roles_us'] = _per_call_us(lambda doc: bundle.predict_proba_all_roles([doc]), docs)
+        timings['loop_all_roles_us'] = _per_call_us(
+            lambda doc: [bundle.role_scorer(role).select_probability(doc) for role in bundle.roles], docs
+        )
+    for name, value in timings.items():
+        print(f"{name:>20}: {value:9.1f}" + ("x" if name == 'speedup' else " us/resume"))
+    return timings
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--docs', type=int, default=300)
+    args = parser.parse_args()
+    run(args.docs)
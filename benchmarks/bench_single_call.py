@@ -0,0 +1,102 @@
+"""
+Three separate Gemini prompts versus the single structured-JSON call
+(GENAI_SINGLE_CALL), against the local fake client.
+
+Checks that a valid JSON reply fills all three sections with the model's
+own confidence, and that an unparseable reply falls back to the three
+calls. Then compares calls and prompt size per classification, and wall
+time for a burst of concurrent classifications under the client's
+concurrency cap.
+
+    python benchmarks/bench_single_call.py [--resumes 24] [--latency 0.2] [--concurrency 4]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('GENAI_CACHE_PATH', 'off')
+
+from bench_features import make_corpus
+from fake_gemini import FakeGeminiClient
+from gemini_client import ResilientGeminiClient
+
+with contextlib.redirect_stdout(io.StringIO()):
+    import predict
+
+JOB_DESCRIPTION = (
+    "We are hiring a software engineer to build and operate Python services on AWS. "
+    "You will design REST APIs, write automated tests, and work with PostgreSQL and Docker."
+)
+
+
+def _use_fake(latency=0.0, concurrency=8):
+    fake = FakeGeminiClient(latency=latency)
+    predict.client = ResilientGeminiClient(fake, rate_per_second=1e6, burst=10**6, max_concurrency=concurrency)
+    predict.genai_cache.clear()
+    return fake
+
+
+def check_parsing():
+    fake = _use_fake()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = predict.classify_resume("Python developer, AWS, Docker", "Software Engineer", JOB_DESCRIPTION, single_call=True)
+    assert fake.calls == 1, fake.calls
+    assert result['gen_ai_assessment'] == FakeGeminiClient.ASSESSMENT
+    assert result['resume_jd_comparison'] == FakeGeminiClient.COMPARISON
+    assert result['improvement_suggestions'] == FakeGeminiClient.SUGGESTIONS
+    sections = predict.parse_combined_response(FakeGeminiClient.COMBINED, True)
+    assert sections[0]['gen_ai_sentiment'] == 'Positive' and sections[0]['gen_ai_confidence'] == 0.8
+
+    fake = _use_fake()
+    fake.combined_reply = "Sure! Here is my review: the candidate is strong."
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = predict.classify_resume("Python developer, AWS, Docker", "Software Engineer", JOB_DESCRIPTION, single_call=True)
+    assert fake.calls == 4, fake.calls
+    assert result['gen_ai_assessment'] == FakeGeminiClient.ASSESSMENT
+    print("parsing: valid JSON fills all sections in 1 call; an invalid reply falls back to 3 calls")
+
+
+def _run(resumes, single_call, latency, concurrency):
+    fake = _use_fake(latency, concurrency)
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()), ThreadPoolExecutor(max_workers=len(resumes)) as pool:
+        list(pool.map(
+            lambda resume: predict.classify_resume(resume, "Software Engineer", JOB_DESCRIPTION, single_call=single_call),
+            resumes
+        ))
+    elapsed = time.perf_counter() - started
+    return {
+        'calls_per_classification': fake.calls / len(resumes),
+        'prompt_tokens_per_classification': fake.prompt_chars / 4 / len(resumes),  # ~4 characters per token
+        'burst_seconds': elapsed,
+    }
+
+
+def run(resume_count=24, latency=0.2, concurrency=4):
+    check_parsing()
+    resumes, _ = make_corpus(resume_count, seed=11)
+    results = {
+        'three_calls': _run(resumes, False, latency, concurrency),
+        'single_call': _run(resumes, True, latency, concurrency),
+    }
+    print(f"{resume_count} concurrent classifications, {latency:g}s per Gemini call, {concurrency} calls in flight max")
+    for mode, numbers in results.items():
+        print(f"{mode:>12}: {numbers['calls_per_classification']:.1f} calls, "
+              f"~{numbers['prompt_tokens_per_classification']:.0f} prompt tokens, "
+              f"{numbers['burst_seconds']:.2f}s for the burst")
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--resumes', type=int, default=24)
+    parser.add_argument('--latency', type=float, default=0.2)
+    parser.add_argument('--concurrency', type=int, default=4)
+    args = parser.parse_args()
+    run(args.resumes, args.latency, args.concurrency)
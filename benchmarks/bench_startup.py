@@ -0,0 +1,117 @@
+"""
+Startup report: what `import app` costs and how long until the first
+request is answered, in fresh interpreters.
+
+Runs `python -X importtime -c "import app"` and lists the slowest modules
+pulled in at import, then times import + first /classify and /history for
+APP_WARMUP=off (everything loads on the first request) and APP_WARMUP=sync
+(warm-up before serving). No API_KEY is passed, so classifications are ML-only
+and nothing talks to Gemini. Exits non-zero when the import exceeds --budget-ms.
+
+    python benchmarks/bench_startup.py [--repeats 3] [--top 12] [--budget-ms 1000]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in the child interpreter; prints one JSON line of timings.
+_FIRST_REQUEST = r"""
+import contextlib, io, json, time
+started = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+    import app
+imported = time.perf_counter()
+client = app.app.test_client()
+with contextlib.redirect_stdout(io.StringIO()):
+    client.post('/login', data={'email': 'admin@example.com', 'password': 'password'})
+    before = time.perf_counter()
+    response = client.post('/classify', json={'resume_text': 'Python developer with AWS and Docker.', 'job_role': 'Software Engineer'})
+    classified = time.perf_counter()
+    assert response.status_code == 200, response.status_code
+    client.get('/history')
+done = time.perf_counter()
+app.job_queue.stop(timeout=1)
+print(json.dumps({
+    'import_ms': (imported - started) * 1e3,
+    'first_classify_ms': (classified - before) * 1e3,
+    'first_history_ms': (done - classified) * 1e3,
+    'time_to_first_classify_ms': (classified - started) * 1e3,
+}))
+"""
+
+
+def _env(warmup):
+    env = dict(os.environ)
+    env.pop('API_KEY', None)
+    env.update({
+        'APP_WARMUP': warmup,
+        'GENAI_CACHE_PATH': 'off',
+        'USER_DB_FILE': os.path.join(tempfile.mkdtemp(prefix='bench_startup_'), 'users.db'),
+        'PYTHONDONTWRITEBYTECODE': '1',
+    })
+    return env
+
+
+def import_profile(top=12):
+    """(total `import app` ms, [(module, cumulative ms, self ms)] slowest first) from -X importtime."""
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import app'],
+        cwd=ROOT, env=_env('off'), capture_output=True, text=True, check=True
+    )
+    modules = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2  # one separator space, then two per nesting level
+        modules.append((name.strip(), int(cumulative_us) / 1e3, int(self_us) / 1e3, depth))
+    total = next(cumulative for name, cumulative, _, depth in modules if name == 'app' and depth == 0)
+    # Direct imports of app and of its imports are the useful level of detail
+    shallow = sorted((m for m in modules if 1 <= m[3] <= 2), key=lambda m: -m[1])
+    return total, [(name, cumulative, self_ms) for name, cumulative, self_ms, _ in shallow[:top]]
+
+
+def first_request(warmup):
+    completed = subprocess.run(
+        [sys.executable, '-c', _FIRST_REQUEST], cwd=ROOT, env=_env(warmup), capture_output=True, text=True
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"first-request probe failed:\n{completed.stderr[-2000:]}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def run(repeats=3, top=12):
+    totals = []
+    for _ in range(repeats):
+        total, slowest = import_profile(top)
+        totals.append(total)
+    results = {'import_app_ms': min(totals), 'slowest_imports': [
+        {'module': name, 'cumulative_ms': cumulative, 'self_ms': self_ms} for name, cumulative, self_ms in slowest
+    ]}
+    print(f"import app: {results['import_app_ms']:.0f} ms (best of {repeats}); slowest imports:")
+    for name, cumulative, self_ms in slowest:
+        print(f"  {cumulative:8.1f} ms cumulative {self_ms:7.1f} ms self  {name}")
+    for warmup in ('off', 'sync'):
+        runs = [first_request(warmup) for _ in range(repeats)]
+        best = {key: min(run[key] for run in runs) for key in runs[0]}
+        results[f'warmup_{warmup}'] = best
+        print(f"APP_WARMUP={warmup:<4}: import {best['import_ms']:.0f} ms, first /classify {best['first_classify_ms']:.0f} ms, "
+              f"first /history {best['first_history_ms']:.0f} ms, ready to first classify {best['time_to_first_classify_ms']:.0f} ms")
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--top', type=int, default=12)
+    parser.add_argument('--budget-ms', type=float, help="Fail when `import app` takes longer than this")
+    args = parser.parse_args()
+    results = run(args.repeats, args.top)
+    if args.budget_ms is not None and results['import_app_ms'] > args.budget_ms:
+        print(f"FAIL: import app took {results['import_app_ms']:.0f} ms, budget {args.budget_ms:g} ms")
+        sys.exit(1)
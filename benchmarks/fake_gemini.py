@@ -0,0 +1,82 @@
+"""
+Local stand-in for google.genai.Client: same models.generate_content /
+generate_content_stream surface, canned replies, configurable latency and
+scripted failures. Used by the benchmarks so nothing talks to Gemini.
+"""
+import json
+import threading
+import time
+
+
+class FakeAPIError(Exception):
+    """Carries an HTTP-style `code` like google.genai.errors.APIError."""
+
+    def __init__(self, code, message="fake upstream error"):
+        super().__init__(f"{code} {message}")
+        self.code = code
+
+
+class FakeResponse:
+    prompt_feedback = None
+
+    def __init__(self, text):
+        self.text = text
+
+
+class _FakeModels:
+    def __init__(self, owner):
+        self._owner = owner
+
+    def generate_content(self, model, contents, config=None):
+        return FakeResponse(self._owner._respond(contents))
+
+    def generate_content_stream(self, model, contents, config=None):
+        text = self._owner._respond(contents)
+        words = text.split(" ")
+        for i, word in enumerate(words):
+            yield FakeResponse(word + (" " if i < len(words) - 1 else ""))
+
+
+class FakeGeminiClient:
+    """
+    `latency` seconds per call; `failures` is a list of error codes (or
+    None for success) consumed one per call, after which every call succeeds.
+    Set `fail_always` to an error code to make every call fail, and
+    `combined_reply` to change what the single-call JSON prompt gets back.
+    Prompt sizes are summed in `prompt_chars`.
+    """
+
+    ASSESSMENT = "This candidate appears to be a Good match. The resume lists the core skills for the role."
+    COMPARISON = "The resume covers most listed requirements; cloud experience is thin."
+    SUGGESTIONS = "- Quantify project impact\n- Add the role's key tools to the skills section"
+    COMBINED = json.dumps({
+        "match": "Good", "confidence": 0.8, "assessment": ASSESSMENT,
+        "jd_comparison": COMPARISON, "suggestions": SUGGESTIONS,
+    })
+
+    def __init__(self, latency=0.0, failures=None, fail_always=None):
+        self.latency = latency
+        self.failures = list(failures or [])
+        self.fail_always = fail_always
+        self.combined_reply = self.COMBINED
+        self.calls = 0
+        self.prompt_chars = 0
+        self._lock = threading.Lock()
+        self.models = _FakeModels(self)
+
+    def _respond(self, prompt):
+        with self._lock:
+            self.calls += 1
+            self.prompt_chars += len(prompt)
+            failure = self.failures.pop(0) if self.failures else self.fail_always
+        if self.latency:
+            time.sleep(self.latency)
+        if failure is not None:
+            raise FakeAPIError(failure)
+        if "single JSON object" in prompt:
+            return self.combined_reply
+        if "expert HR analyst" in prompt:
+            return self.COMPARISON
+        if "career coach" in prompt:
+            return self.SUGGESTIONS
+        return self.ASSESSMENT
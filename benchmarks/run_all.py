@@ -0,0 +1,453 @@
+"""
+Offline benchmark suite for the classification and persistence hot paths.
+
+Suites (all run without network access; Gemini is the local fake client):
+  classify     classify_resume end to end, three-call and single-call modes
+  features     text cleaning / feature extraction throughput (bench_features)
+  scoring      single-resume and all-roles ML scoring (bench_scoring)
+  model_load   joblib registry and memory-mapped bundle cold-start times
+  persistence  signup, account lookup, history writes and history pages at
+               10^2..10^5 entries, against the old whole-file users.json save/load
+  training     main.py on a synthetic dataset, full and incremental
+  flask        concurrent test-client load on /classify and /history
+  metrics      cost of a timing span, a counter increment and a /metrics scrape
+  startup      `import app` and time to first request in fresh interpreters (bench_startup)
+  bulk         bulk_score.py over a synthetic CSV, serial and with a process pool
+  near_dup     near-duplicate index latency, memory, recall and Gemini calls saved (bench_near_duplicates)
+  compaction   prompt tokens saved by compaction and assessment agreement (bench_prompt_compaction)
+  prefork      serve.py load test at 1 and N workers: throughput, shared memory, no lost writes (bench_prefork)
+  online       online model from recruiter feedback vs full retraining on a holdout (bench_online_learning)
+
+Results are written as JSON (with the git commit) so runs can be compared:
+
+    python benchmarks/run_all.py [--quick] [--only classify,flask] [--out results.json]
+    python benchmarks/run_all.py --compare benchmarks/results/OLD.json
+"""
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.chdir(ROOT)
+
+# Everything the app writes goes to a scratch directory; Gemini is never contacted.
+SCRATCH = tempfile.mkdtemp(prefix='bench_')
+os.environ['USER_DB_FILE'] = os.path.join(SCRATCH, 'users.db')
+os.environ['GENAI_CACHE_PATH'] = 'off'
+os.environ.pop('API_KEY', None)
+os.environ['APP_WARMUP'] = 'off'  # suites decide what is warm
+
+with contextlib.redirect_stdout(io.StringIO()):
+    import app as app_module
+    import predict
+    import main as training
+    import bulk_score
+
+import bench_features
+import bench_near_duplicates
+import bench_prefork
+import bench_online_learning
+import bench_prompt_compaction
+import metrics
+import bench_scoring
+import bench_startup
+from bench_features import make_corpus
+from fake_gemini import FakeGeminiClient
+from gemini_client import ResilientGeminiClient
+from model_bundle import BundleLoader
+from model_registry import ModelRegistry
+from synthetic_data import write_csv
+from user_store import UserStore
+
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+
+
+def _quiet(fn, *args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fn(*args, **kwargs)
+
+
+def _percentiles(samples_ms):
+    ordered = sorted(samples_ms)
+    return {
+        'mean_ms': statistics.fmean(ordered),
+        'p50_ms': ordered[len(ordered) // 2],
+        'p95_ms': ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+    }
+
+
+def _use_fake_gemini(latency=0.0):
+    fake = FakeGeminiClient(latency=latency)
+    predict.client = ResilientGeminiClient(fake, rate_per_second=1e6, burst=10**6, max_concurrency=64)
+    predict.genai_cache.clear()
+    return fake
+
+
+# --- Suites ---
+def bench_classify(quick):
+    count = 50 if quick else 300
+    docs, _ = make_corpus(count, seed=21)
+    _quiet(predict.classify_resume, docs[0], "Software Engineer")  # warm the model
+    results = {}
+    for mode, single_call in (('three_calls', False), ('single_call', True)):
+        fake = _use_fake_gemini()
+        samples = []
+        for doc in docs:
+            started = time.perf_counter()
+            _quiet(predict.classify_resume, doc, "Software Engineer", "Python and AWS", single_call=single_call)
+            samples.append((time.perf_counter() - started) * 1e3)
+        assert fake.calls == count * (1 if single_call else 3), "Gemini sections did not go through the fake client"
+        results[mode] = _percentiles(samples)
+    # Same resumes again: every Gemini section now comes from genai_cache
+    samples = []
+    for doc in docs:
+        started = time.perf_counter()
+        _quiet(predict.classify_resume, doc, "Software Engineer", "Python and AWS", single_call=True)
+        samples.append((time.perf_counter() - started) * 1e3)
+    results['cached'] = _percentiles(samples)
+    return results
+
+
+def bench_feature_extraction(quick):
+    return _quiet(bench_features.run, 1000 if quick else 5000)
+
+
+def bench_ml_scoring(quick):
+    return _quiet(bench_scoring.run, 100 if quick else 300)
+
+
+def bench_model_load(quick):
+    results = {}
+    started = time.perf_counter()
+    registry = ModelRegistry(predict.MODEL_DIR)
+    registry.get('software_engineer')
+    results['registry_one_role_ms'] = (time.perf_counter() - started) * 1e3
+    started = time.perf_counter()
+    roles = _quiet(ModelRegistry(predict.MODEL_DIR).preload)
+    results['registry_all_roles_ms'] = (time.perf_counter() - started) * 1e3
+    results['roles'] = roles
+    started = time.perf_counter()
+    bundle = _quiet(BundleLoader(predict.MODEL_DIR).get)
+    if bundle is not None:
+        results['bundle_open_ms'] = (time.perf_counter() - started) * 1e3
+        started = time.perf_counter()
+        bundle.predict_proba_all_roles(["python developer"])
+        results['bundle_first_rank_ms'] = (time.perf_counter() - started) * 1e3
+    return results
+
+
+def _history_entry(i):
+    return {
+        'timestamp': f"2025-01-01 00:00:{i % 60:02d}", 'job_role': 'Software Engineer',
+        'job_description_snippet': "Python and AWS" * 5, 'resume_snippet': "resume text " * 16 + "...",
+        'ml_prediction': 'Select', 'ml_confidence': '81.00%',
+        'gen_ai_assessment': FakeGeminiClient.ASSESSMENT, 'resume_jd_comparison': FakeGeminiClient.COMPARISON,
+        'improvement_suggestions': FakeGeminiClient.SUGGESTIONS,
+    }
+
+
+def bench_persistence(quick):
+    sizes = [100, 1000, 10000] if quick else [100, 1000, 10000, 100000]
+    results = []
+    for size in sizes:
+        directory = tempfile.mkdtemp(dir=SCRATCH)
+        entries = [_history_entry(i) for i in range(size)]
+        row = {'history_entries': size}
+
+        # The old layout: every save rewrote users.json with all history inline
+        legacy_path = os.path.join(directory, 'users.json')
+        legacy = {'users': {'1': {'email': 'a@example.com', 'password': 'x', 'name': 'A', 'history': entries}},
+                  'next_user_id': 2}
+        started = time.perf_counter()
+        with open(legacy_path, 'w') as f:
+            json.dump(legacy, f, indent=4)
+        row['legacy_save_users_ms'] = (time.perf_counter() - started) * 1e3
+        started = time.perf_counter()
+        with open(legacy_path) as f:
+            json.load(f)
+        row['legacy_load_users_ms'] = (time.perf_counter() - started) * 1e3
+
+        store = UserStore(os.path.join(directory, 'users.db'))
+        started = time.perf_counter()
+        user_id = store.create_user('a@example.com', 'x', 'A')
+        row['store_create_user_ms'] = (time.perf_counter() - started) * 1e3
+        store.add_history_many(user_id, entries)
+        started = time.perf_counter()
+        store.find_user_by_email('A@example.com')
+        store.get_user(user_id)
+        row['store_load_user_ms'] = (time.perf_counter() - started) * 1e3
+        started = time.perf_counter()
+        for i in range(20):
+            store.add_history(user_id, _history_entry(i))
+        row['store_add_history_ms'] = (time.perf_counter() - started) * 1e3 / 20
+        # What the history page costs: the newest page, then one further back
+        started = time.perf_counter()
+        _, cursor = store.get_history_page(user_id)
+        row['store_history_first_page_ms'] = (time.perf_counter() - started) * 1e3
+        started = time.perf_counter()
+        store.get_history_page(user_id, before_id=cursor)
+        row['store_history_next_page_ms'] = (time.perf_counter() - started) * 1e3
+        results.append(row)
+        shutil.rmtree(directory, ignore_errors=True)
+    return results
+
+
+def bench_training(quick):
+    directory = tempfile.mkdtemp(dir=SCRATCH)
+    csv_path = os.path.join(directory, 'synthetic.csv')
+    roles, per_role = (4, 150) if quick else (8, 300)
+    write_csv(csv_path, roles=roles, per_role=per_role, seed=5)
+    model_dir = os.path.join(directory, 'models')
+    started = time.perf_counter()
+    trained = _quiet(training.main, csv_path, model_dir, 1, False, True)
+    full_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    _quiet(training.main, csv_path, model_dir, 1, False, False)
+    incremental_seconds = time.perf_counter() - started
+    shutil.rmtree(directory, ignore_errors=True)
+    return {
+        'roles': roles, 'rows_per_role': per_role, 'roles_trained': len(trained),
+        'full_train_seconds': full_seconds, 'incremental_noop_seconds': incremental_seconds,
+    }
+
+
+def bench_flask(quick):
+    concurrency = 8
+    requests_per_worker = 10 if quick else 40
+    history_size = 1000 if quick else 10000
+    _use_fake_gemini(latency=0.05)
+    flask_app = app_module.app
+    docs, _ = make_corpus(concurrency * requests_per_worker, seed=33)
+
+    def logged_in_client(index):
+        email, password = f"bench{index}@example.com", "bench-password"
+        client = flask_app.test_client()
+        _quiet(client.post, '/signup', data={'name': f"Bench {index}", 'email': email, 'password': password})
+        _quiet(client.post, '/login', data={'email': email, 'password': password})
+        return client
+
+    clients = [logged_in_client(i) for i in range(concurrency)]
+    # One user gets a long history so /history reflects a heavy account
+    heavy_id, _ = app_module.find_user_by_email("bench0@example.com")
+    app_module.user_store.add_history_many(heavy_id, [_history_entry(i) for i in range(history_size)])
+
+    def drive(path_for, method):
+        def worker(index):
+            samples = []
+            for k in range(requests_per_worker):
+                started = time.perf_counter()
+                if method == 'post':
+                    response = clients[index].post(path_for(index, k), json={
+                        'resume_text': docs[index * requests_per_worker + k], 'job_role': 'Software Engineer'})
+                else:
+                    response = clients[index].get(path_for(index, k))
+                samples.append((time.perf_counter() - started) * 1e3)
+                assert response.status_code == 200, response.status_code
+            return samples
+
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()), ThreadPoolExecutor(max_workers=concurrency) as pool:
+            samples = [sample for batch in pool.map(worker, range(concurrency)) for sample in batch]
+        elapsed = time.perf_counter() - started
+        return {**_percentiles(samples), 'requests': len(samples), 'requests_per_second': len(samples) / elapsed}
+
+    return {
+        'concurrency': concurrency,
+        'fake_gemini_latency_ms': 50,
+        'history_entries_heavy_user': history_size,
+        'classify': drive(lambda index, k: '/classify', 'post'),
+        'history': drive(lambda index, k: '/history', 'get'),
+    }
+
+
+def bench_metrics(quick):
+    iterations = 20000 if quick else 200000
+    started = time.perf_counter()
+    for _ in range(iterations):
+        with metrics.span("bench"):
+            pass
+    span_us = (time.perf_counter() - started) * 1e6 / iterations
+    counter = metrics.Counter("resume_bench_total", "Benchmark counter.", ["kind"])
+    started = time.perf_counter()
+    for _ in range(iterations):
+        counter.inc("bench")
+    counter_us = (time.perf_counter() - started) * 1e6 / iterations
+
+    # A warm single-role classification records 5 spans (model_lookup, clean, vectorize, predict, ml)
+    docs, _ = make_corpus(200, seed=41)
+    _quiet(predict._ml_step, docs[0], "Software Engineer")
+    started = time.perf_counter()
+    for doc in docs:
+        _quiet(predict._ml_step, doc, "Software Engineer")
+    ml_step_us = (time.perf_counter() - started) * 1e6 / len(docs)
+
+    started = time.perf_counter()
+    body = metrics.render()
+    return {
+        'span_us': span_us,
+        'counter_inc_us': counter_us,
+        'ml_step_us': ml_step_us,
+        'span_share_of_ml_step': 5 * span_us / ml_step_us,
+        'render_ms': (time.perf_counter() - started) * 1e3,
+        'exposition_lines': body.count("\n"),
+    }
+
+
+def bench_app_startup(quick):
+    return _quiet(bench_startup.run, 1 if quick else 3)
+
+
+def bench_bulk_score(quick):
+    directory = tempfile.mkdtemp(dir=SCRATCH)
+    csv_path = os.path.join(directory, 'resumes.csv')
+    per_role = 250 if quick else 2500
+    write_csv(csv_path, roles=8, per_role=per_role, seed=9)
+    results = {'rows': 8 * per_role}
+    outputs = {}
+    for workers in (1, 2):
+        outputs[workers] = os.path.join(directory, f'scored_{workers}.csv')
+        run = _quiet(bulk_score.main, csv_path, outputs[workers], workers=workers, restart=True)
+        results[f'workers_{workers}'] = {'seconds': run['seconds'], 'rows_per_second': run['rows_scored'] / run['seconds']}
+    with open(outputs[1]) as serial, open(outputs[2]) as pooled:
+        assert serial.read() == pooled.read(), "pooled output differs from serial output"
+    shutil.rmtree(directory, ignore_errors=True)
+    return results
+
+
+def bench_near_dup(quick):
+    return _quiet(bench_near_duplicates.run, 20000 if quick else 200000, 200 if quick else 1000)
+
+
+def bench_compaction(quick):
+    # Recorded, not asserted: only a --live run decides whether compaction is safe to enable
+    return _quiet(bench_prompt_compaction.run, 40 if quick else 200)
+
+
+def bench_prefork_serving(quick):
+    workers = max(2, os.cpu_count() or 1)
+    report = _quiet(bench_prefork.run, (1, workers), 8, 15 if quick else 50)
+    assert report['consistent'], report['runs']
+    return report
+
+
+def bench_online(quick):
+    report = _quiet(bench_online_learning.run, 800 if quick else 1600)
+    assert report['keeps_pace'], report['scenarios']
+    return report
+
+
+SUITES = {
+    'classify': bench_classify,
+    'features': bench_feature_extraction,
+    'scoring': bench_ml_scoring,
+    'model_load': bench_model_load,
+    'persistence': bench_persistence,
+    'training': bench_training,
+    'flask': bench_flask,
+    'metrics': bench_metrics,
+    'startup': bench_app_startup,
+    'bulk': bench_bulk_score,
+    'near_dup': bench_near_dup,
+    'compaction': bench_compaction,
+    'prefork': bench_prefork_serving,
+    'online': bench_online,
+}
+
+
+# --- Reporting ---
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _flatten(value, prefix=''):
+    if isinstance(value, dict):
+        for key, item in value.items():
+            yield from _flatten(item, f"{prefix}.{key}" if prefix else key)
+    elif isinstance(value, list):
+        for i, item in enumerate(value):
+            yield from _flatten(item, f"{prefix}[{i}]")
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        yield prefix, float(value)
+
+
+def compare(old_path, new_report, threshold=1.2):
+    """Prints timing metrics (*_ms, *_us, *_seconds) that moved by more than `threshold`x."""
+    with open(old_path) as f:
+        old = dict(_flatten(json.load(f)['results']))
+    new = dict(_flatten(new_report['results']))
+    flagged = 0
+    for key in sorted(set(old) & set(new)):
+        if not key.endswith(('_ms', '_us', '_seconds')) or old[key] <= 0:
+            continue
+        ratio = new[key] / old[key]
+        if ratio > threshold or ratio < 1 / threshold:
+            flagged += 1
+            print(f"{'SLOWER' if ratio > 1 else 'faster'} {ratio:6.2f}x  {key}: {old[key]:.3f} -> {new[key]:.3f}")
+    print(f"{flagged} timing(s) changed by more than {threshold:g}x versus {old_path}")
+
+
+def run(only=None, quick=False):
+    report = {
+        'commit': _git_commit(),
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'quick': quick,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': {},
+    }
+    random.seed(0)
+    for name, suite in SUITES.items():
+        if only and name not in only:
+            continue
+        started = time.perf_counter()
+        report['results'][name] = suite(quick)
+        print(f"{name:>12}: done in {time.perf_counter() - started:.1f}s")
+    return report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--quick', action='store_true', help="Smaller sizes (10^2..10^4 history, fewer requests)")
+    parser.add_argument('--only', default='', help=f"Comma-separated subset of: {', '.join(SUITES)}")
+    parser.add_argument('--out', help="JSON output path (default: benchmarks/results/<timestamp>_<commit>.json)")
+    parser.add_argument('--compare', help="Earlier results JSON to diff timings against")
+    args = parser.parse_args()
+
+    only = {name.strip() for name in args.only.split(',') if name.strip()}
+    unknown = only - set(SUITES)
+    if unknown:
+        parser.error(f"unknown suite(s): {', '.join(sorted(unknown))}")
+    try:
+        report = run(only, args.quick)
+    finally:
+        app_module.job_queue.stop(timeout=1)
+        shutil.rmtree(SCRATCH, ignore_errors=True)
+
+    out_path = args.out
+    if out_path is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = report['timestamp'].replace(':', '').replace('-', '').replace('+0000', 'Z')
+        out_path = os.path.join(RESULTS_DIR, f"{stamp}_{report['commit'] or 'nogit'}.json")
+    with open(out_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {out_path}")
+    if args.compare:
+        compare(args.compare, report)
@@ -0,0 +1,74 @@
+"""
+Synthetic resumes in the Dataset/dataset.csv layout (Role, Name, Resume,
+decision), for exercising main.py and the scoring paths without the real data.
+
+    python benchmarks/synthetic_data.py out.csv [--roles 8] [--per-role 300]
+"""
+import argparse
+import csv
+import random
+
+ROLE_SKILLS = {
+    'Software Engineer': "python java golang microservices kubernetes docker ci cd testing algorithms",
+    'Data Scientist': "python statistics regression pandas sklearn experiments modeling visualization",
+    'UI Designer': "figma sketch typography wireframes prototyping design systems accessibility",
+    'Product Manager': "roadmap stakeholders prioritization metrics discovery launches strategy",
+    'DevOps Engineer': "terraform aws monitoring kubernetes pipelines automation linux ansible",
+    'Data Engineer': "spark airflow sql warehouse etl kafka pipelines dbt",
+    'QA Engineer': "selenium automation regression test plans cypress defects quality",
+    'Cloud Architect': "aws azure gcp networking security landing zones migration cost",
+}
+GENERIC_WORDS = (
+    "team collaborated delivered improved managed responsible communication leadership "
+    "customers reports meetings documentation process quality stakeholders project"
+).split()
+_FIRST = ["john", "maria", "li", "ahmed", "ann", "priya", "carlos", "emma"]
+_LAST = ["smith", "garcia", "wei", "doe", "patel", "khan", "novak"]
+
+
+def make_rows(roles=8, per_role=300, words=250, seed=0):
+    """Yields dicts; 'select' rows lean on the role's skills, 'reject' rows on generic filler."""
+    rng = random.Random(seed)
+    role_names = list(ROLE_SKILLS)[:roles] + [f"Role {k}" for k in range(len(ROLE_SKILLS), roles)]
+    # Extra roles get a fixed pseudo-random skill set so each still has some signal
+    role_skills = {
+        role: (ROLE_SKILLS.get(role) or " ".join(random.Random(role).sample(GENERIC_WORDS, 6))).split()
+        for role in role_names
+    }
+    for i in range(roles * per_role):
+        role = role_names[i % roles]
+        skills = role_skills[role]
+        selected = rng.random() < 0.45
+        skill_share = 0.14 if selected else 0.10
+        name = f"{rng.choice(_FIRST).title()} {rng.choice(_LAST).title()}"
+        body = [rng.choice(skills) if rng.random() < skill_share else rng.choice(GENERIC_WORDS) for _ in range(words)]
+        extras = []
+        if rng.random() < (0.6 if selected else 0.2): extras.append("Portfolio: https://example.dev/" + name.split()[0].lower())
+        if rng.random() < (0.5 if selected else 0.15): extras.append("Received an award for excellence.")
+        yield {
+            'Role': role,
+            'Name': name,
+            'Resume': f"{name}\nExperience: " + " ".join(body) + " " + " ".join(extras),
+            'decision': 'select' if selected else 'reject',
+        }
+
+
+def write_csv(path, **kwargs):
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=['Role', 'Name', 'Resume', 'decision'])
+        writer.writeheader()
+        count = 0
+        for row in make_rows(**kwargs):
+            writer.writerow(row)
+            count += 1
+    return count
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('path')
+    parser.add_argument('--roles', type=int, default=8)
+    parser.add_argument('--per-role', type=int, default=300)
+    parser.add_argument('--words', type=int, default=250)
+    args = parser.parse_args()
+    print(f"Wrote {write_csv(args.path, roles=args.roles, per_role=args.per_role, words=args.words)} rows to {args.path}")
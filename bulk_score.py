@@ -0,0 +1,250 @@
+"""
+Offline bulk scoring: streams a CSV or JSONL file of resumes through the
+saved role models across a process pool and appends results to an output
+file (CSV or JSONL, by extension) as each chunk finishes.
+
+Memory stays bounded: at most `workers * 2` chunks are read ahead of the
+writer. After every written chunk a checkpoint (<output>.checkpoint.json)
+records the rows and bytes done, so an interrupted run picks up where it
+stopped when started again with the same arguments.
+
+    python bulk_score.py resumes.csv scored.csv [--workers 4] [--chunk-size 500] [--genai off|cache|live]
+"""
+import argparse
+import contextlib
+import csv
+import hashlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import predict
+
+# --- 1. Settings ---
+CHUNK_SIZE = 500
+GENAI_MODES = ('off', 'cache', 'live')
+OUTPUT_FIELDS = ['row', 'id', 'role', 'ml_prediction', 'ml_confidence', 'error']
+GENAI_FIELDS = ['gen_ai_assessment', 'resume_jd_comparison', 'improvement_suggestions']
+PROGRESS_EVERY = 5.0  # seconds between progress lines
+
+# Resumes can be far longer than the csv module's default 128 KiB field limit
+csv.field_size_limit(min(sys.maxsize, 2**31 - 1))
+
+
+# --- 2. Input ---
+def _input_format(path, explicit=None):
+    if explicit:
+        return explicit
+    return 'jsonl' if path.lower().endswith(('.jsonl', '.ndjson')) else 'csv'
+
+def read_records(path, input_format=None):
+    """Yields one dict per input row, reading the file incrementally."""
+    with open(path, 'r', newline='', encoding='utf-8') as f:
+        if _input_format(path, input_format) == 'jsonl':
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(f)
+
+def iter_chunks(records, chunk_size, skip=0):
+    """(first row number, [record, ...]) chunks; the first `skip` records are dropped (already scored)."""
+    chunk, start = [], skip
+    for row_number, record in enumerate(records):
+        if row_number < skip:
+            continue
+        chunk.append(record)
+        if len(chunk) == chunk_size:
+            yield start, chunk
+            chunk, start = [], row_number + 1
+    if chunk:
+        yield start, chunk
+
+
+# --- 3. Scoring (runs in the worker processes) ---
+def score_chunk(start, records, options):
+    """Output rows for one chunk, in input order."""
+    items, ids = [], []
+    best_fit_roles = {}
+    if options['best_fit']:
+        # Every role is scored against the whole chunk in one pass, not once per record
+        ranked_rows = [offset for offset, record in enumerate(records) if record.get(options['text_column'])]
+        with contextlib.redirect_stdout(io.StringIO()):
+            ranked = predict.rank_roles_batch([records[offset][options['text_column']] for offset in ranked_rows], top_k=1)
+        best_fit_roles = {offset: roles[0]['role'] for offset, roles in zip(ranked_rows, ranked) if roles}
+    for offset, record in enumerate(records):
+        resume_text = record.get(options['text_column']) or ''
+        job_role = best_fit_roles.get(offset) or options['role'] or record.get(options['role_column'])
+        items.append({
+            'resume_text': resume_text,
+            'job_role': job_role,
+            'job_description': record.get(options['jd_column']) if options['jd_column'] else None,
+        })
+        ids.append(record.get(options['id_column']) if options['id_column'] else None)
+
+    genai = options['genai']
+    # predict's per-role log lines would drown the progress report; errors are kept in the rows
+    with contextlib.redirect_stdout(io.StringIO()):
+        # Deterministic, so a resumed or repeated run writes the same confidences
+        results = predict.classify_resumes(items, include_genai=genai != 'off', genai_cache_only=genai == 'cache',
+                                           deterministic=True)
+    return [
+        {'row': start + offset, 'id': ids[offset], **result}
+        for offset, result in enumerate(results)
+    ]
+
+
+# --- 4. Output and Checkpoint ---
+def _checkpoint_path(output_path):
+    return output_path + '.checkpoint.json'
+
+def _run_fingerprint(input_path, options):
+    """Identifies the input file and scoring options a checkpoint belongs to."""
+    stat = os.stat(input_path)
+    payload = json.dumps({'input': os.path.abspath(input_path), 'size': stat.st_size,
+                          'mtime_ns': stat.st_mtime_ns, 'options': options}, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def load_checkpoint(output_path, fingerprint):
+    """(rows done, output bytes done) to resume from, or (0, 0) for a fresh run."""
+    try:
+        with open(_checkpoint_path(output_path), 'r') as f:
+            checkpoint = json.load(f)
+    except (OSError, ValueError):
+        return 0, 0
+    if checkpoint.get('fingerprint') != fingerprint:
+        raise SystemExit(
+            f"{_checkpoint_path(output_path)} belongs to a different input or options; "
+            "pass --restart to start over."
+        )
+    if not os.path.exists(output_path) or os.path.getsize(output_path) < checkpoint['output_bytes']:
+        raise SystemExit(f"{output_path} is shorter than its checkpoint says; pass --restart to start over.")
+    return checkpoint['rows_done'], checkpoint['output_bytes']
+
+def save_checkpoint(output_path, fingerprint, rows_done, output_bytes):
+    # Written to a temp file and renamed, so a crash never leaves a torn checkpoint
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(output_path)), suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        json.dump({'fingerprint': fingerprint, 'rows_done': rows_done, 'output_bytes': output_bytes,
+                   'updated_at': time.strftime('%Y-%m-%d %H:%M:%S')}, f)
+    os.replace(tmp_path, _checkpoint_path(output_path))
+
+class ResultWriter:
+    """Appends scored rows as CSV or JSONL; `flush()` makes them durable and returns the file size."""
+
+    def __init__(self, path, fields, resume_bytes):
+        self.as_csv = not path.lower().endswith(('.jsonl', '.ndjson'))
+        self.fields = fields
+        self.file = open(path, 'a+', newline='', encoding='utf-8')
+        # Anything after the last checkpoint came from an interrupted chunk; drop it
+        self.file.truncate(resume_bytes)
+        self.file.seek(resume_bytes)
+        self.csv = csv.DictWriter(self.file, fieldnames=fields, extrasaction='ignore') if self.as_csv else None
+        if self.as_csv and resume_bytes == 0:
+            self.csv.writeheader()
+
+    def write(self, rows):
+        for row in rows:
+            if self.as_csv:
+                self.csv.writerow(row)
+            else:
+                self.file.write(json.dumps({field: row.get(field) for field in self.fields}) + "\n")
+
+    def flush(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        return os.fstat(self.file.fileno()).st_size
+
+    def close(self):
+        self.file.close()
+
+
+# --- 5. Main ---
+def main(input_path, output_path, workers=1, chunk_size=CHUNK_SIZE, genai='off', role=None, best_fit=False,
+         text_column='Resume', role_column='Role', id_column=None, jd_column=None, input_format=None, restart=False):
+    options = {
+        'text_column': text_column, 'role_column': role_column, 'id_column': id_column, 'jd_column': jd_column,
+        'role': role, 'best_fit': best_fit, 'genai': genai, 'chunk_size': chunk_size,
+    }
+    fields = OUTPUT_FIELDS + (GENAI_FIELDS if genai != 'off' else [])
+    fingerprint = _run_fingerprint(input_path, options)
+    if restart:
+        for path in (output_path, _checkpoint_path(output_path)):
+            if os.path.exists(path):
+                os.remove(path)
+    rows_done, output_bytes = load_checkpoint(output_path, fingerprint)
+    if rows_done:
+        print(f"Resuming from checkpoint: {rows_done} rows already scored.")
+    if genai == 'live':
+        print("Warning: --genai live calls Gemini for every row; rate limits apply per worker process.")
+
+    writer = ResultWriter(output_path, fields, output_bytes)
+    chunks = iter_chunks(read_records(input_path, input_format), chunk_size, skip=rows_done)
+    started = last_report = time.perf_counter()
+    scored = errors = 0
+
+    def write_chunk(rows):
+        nonlocal rows_done, scored, errors, last_report
+        writer.write(rows)
+        rows_done += len(rows)
+        scored += len(rows)
+        errors += sum(1 for row in rows if row.get('error'))
+        save_checkpoint(output_path, fingerprint, rows_done, writer.flush())
+        now = time.perf_counter()
+        if now - last_report >= PROGRESS_EVERY:
+            last_report = now
+            print(f"{rows_done} rows done ({scored / (now - started):.0f} rows/s this run, {errors} errors)")
+
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        if pool is None:
+            for start, records in chunks:
+                write_chunk(score_chunk(start, records, options))
+        else:
+            # Chunks are written in input order; read-ahead is capped so memory does not grow with the input
+            pending = deque()
+            for start, records in chunks:
+                pending.append(pool.submit(score_chunk, start, records, options))
+                if len(pending) >= workers * 2:
+                    write_chunk(pending.popleft().result())
+            while pending:
+                write_chunk(pending.popleft().result())
+    except KeyboardInterrupt:
+        print(f"Interrupted; {rows_done} rows are saved in {output_path}. Run the same command again to resume.")
+        raise SystemExit(130)
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+        writer.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"Scored {scored} rows in {elapsed:.1f}s ({scored / elapsed if elapsed else 0:.0f} rows/s, "
+          f"{errors} errors) with {workers} worker(s); {rows_done} rows in {output_path}.")
+    return {'rows_scored': scored, 'rows_total': rows_done, 'errors': errors, 'seconds': elapsed}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Score a CSV/JSONL of resumes with the saved role models.")
+    parser.add_argument('input', help="CSV or JSONL file of resumes")
+    parser.add_argument('output', help="Results file; .jsonl/.ndjson writes JSON lines, anything else CSV")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="Scoring processes; 1 scores in this process (default: %(default)s)")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="Rows per chunk (default: %(default)s)")
+    parser.add_argument('--genai', choices=GENAI_MODES, default='off',
+                        help="off: ML only; cache: add Gen AI results already in genai_cache; live: call Gemini (default: %(default)s)")
+    parser.add_argument('--role', help="Score every row against this role instead of the role column")
+    parser.add_argument('--best-fit', action='store_true', help="Score every row against its best-fit role")
+    parser.add_argument('--text-column', default='Resume', help="Resume text field (default: %(default)s)")
+    parser.add_argument('--role-column', default='Role', help="Job role field (default: %(default)s)")
+    parser.add_argument('--id-column', help="Field copied to the output 'id' column")
+    parser.add_argument('--jd-column', help="Job description field (used by --genai cache/live)")
+    parser.add_argument('--format', choices=('csv', 'jsonl'), help="Input format (default: from the extension)")
+    parser.add_argument('--restart', action='store_true', help="Ignore any checkpoint and rescore from the first row")
+    args = parser.parse_args()
+    main(args.input, args.output, args.workers, args.chunk_size, args.genai, args.role, args.best_fit,
+         args.text_column, args.role_column, args.id_column, args.jd_column, args.format, args.restart)
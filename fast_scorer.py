@@ -0,0 +1,104 @@
+import re
+
+import numpy as np
+
+from features import extract_features
+from metrics import span
+
+# --- 1. Analyzer ---
+def build_word_analyzer(lowercase=True, stop_words=None, ngram_range=(1, 1), token_pattern=r"(?u)\b\w\w+\b"):
+    """
+    Plain-Python equivalent of TfidfVectorizer(analyzer='word', ...).build_analyzer():
+    lowercase, token_pattern tokens, stop words removed, then n-grams joined by spaces.
+    """
+    token_re = re.compile(token_pattern)
+    if stop_words == 'english':
+        from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+        stop_words = ENGLISH_STOP_WORDS
+    stop_words = frozenset(stop_words or ())
+    min_n, max_n = ngram_range
+
+    def analyze(doc):
+        if lowercase:
+            doc = doc.lower()
+        tokens = token_re.findall(doc)
+        if stop_words:
+            tokens = [token for token in tokens if token not in stop_words]
+        grams = list(tokens) if min_n == 1 else []
+        for n in range(max(2, min_n), max_n + 1):
+            grams.extend(" ".join(gram) for gram in zip(*(tokens[k:] for k in range(n))))
+        return grams
+
+    return analyze
+
+
+# --- 2. Scoring Core ---
+def _tfidf_decision(columns, idf, coef):
+    """
+    x . coef for the l2-normalized TF-IDF row built from `columns` (one entry
+    per n-gram occurrence). Sums run left to right over sorted columns, the
+    same order scikit-learn's sparse kernels use, so results match bit for bit.
+    """
+    if len(columns) == 0:
+        return 0.0
+    unique_columns, counts = np.unique(columns, return_counts=True)
+    weights = counts * idf[unique_columns]
+    squared_norm = 0.0
+    for weight in weights.tolist():
+        squared_norm += weight * weight
+    normalized = weights / np.sqrt(squared_norm)
+    decision = 0.0
+    for value, coefficient in zip(normalized.tolist(), coef[unique_columns].tolist()):
+        decision += value * coefficient
+    return decision
+
+
+class RoleScorer:
+    """
+    One role's TF-IDF + LogisticRegression compiled to plain arrays.
+
+    `columns_of(grams)` maps the analyzer's n-grams to column ids into
+    `idf`/`coef` (unknown n-grams dropped). Gives the same P(Select) as
+    model.predict_proba(hstack([vectorizer.transform(...), flags])) without
+    sklearn's validation or sparse-matrix construction.
+    """
+
+    def __init__(self, analyze, columns_of, idf, coef, extra_coef, intercept):
+        self.analyze = analyze
+        self.columns_of = columns_of
+        self.idf = np.asarray(idf, dtype=np.float64)
+        self.coef = np.asarray(coef, dtype=np.float64)
+        self.extra_coef = [float(value) for value in extra_coef]
+        self.intercept = float(intercept)
+        from scipy.special import expit  # imported here so importing this module stays light
+        self._expit = expit
+
+    @classmethod
+    def from_sklearn(cls, model, vectorizer):
+        if list(model.classes_) != [0, 1] or vectorizer.norm != 'l2' or vectorizer.sublinear_tf or not vectorizer.use_idf:
+            raise ValueError("RoleScorer only supports binary 0/1 models on l2-normalized TF-IDF.")
+        analyze = build_word_analyzer(
+            vectorizer.lowercase, vectorizer.stop_words, vectorizer.ngram_range, vectorizer.token_pattern
+        )
+        lookup = vectorizer.vocabulary_.get
+
+        def columns_of(grams):
+            return [column for column in map(lookup, grams) if column is not None]
+
+        n_terms = len(vectorizer.vocabulary_)
+        return cls(analyze, columns_of, vectorizer.idf_, model.coef_[0, :n_terms],
+                   model.coef_[0, n_terms:], model.intercept_[0])
+
+    def select_probability(self, resume_text):
+        """P(Select) for one raw resume."""
+        with span("clean"):
+            cleaned, portfolio, honors = extract_features(resume_text)
+        with span("vectorize"):
+            columns = self.columns_of(self.analyze(cleaned))
+        with span("predict"):
+            decision = _tfidf_decision(columns, self.idf, self.coef)
+            if portfolio:
+                decision += self.extra_coef[0]
+            if honors:
+                decision += self.extra_coef[1]
+            return float(self._expit(decision + self.intercept))
@@ -0,0 +1,142 @@
+import re
+import numpy as np
+
+# --- 1. Shared Constants ---
+# Used by training (main.py) and inference (predict.py); changing anything here
+# changes the features the saved models were fitted on.
+CUSTOM_STOP_WORDS = frozenset([
+    'resume', 'profile', 'summary', 'objective', 'experience', 'education', 'skills',
+    'projects', 'references', 'company', 'organization', 'location', 'city', 'state',
+    'jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec',
+    'january', 'february', 'march', 'april', 'june', 'july', 'august', 'september',
+    'october', 'november', 'december', 'present', 'current', 'llc', 'inc', 'corp',
+    'gpa', 'university', 'college', 'degree', 'linkedin', 'github', 'email', 'phone',
+    'address', 'date', 'birth', 'street', 'com', 'www', 'http', 'httpss'
+])
+
+_PORTFOLIO_RE = re.compile(r'(https?://|www\.)', re.IGNORECASE)
+_HONORS_WORDS = ('award', 'honor', 'certification', 'certificate', 'publication', 'patent', 'distinction', 'fellowship')
+_HONORS_RE = re.compile(r'\b(' + '|'.join(_HONORS_WORDS) + r')\b', re.IGNORECASE)
+_PORTFOLIO_MARKERS = ('http://', 'https://', 'www.')
+
+# Deleting every char outside [a-z\s] is done on ASCII bytes with one translate call.
+# Non-ASCII runs are first collapsed: to ' ' if they contain whitespace (a word
+# break), else to '' (they would be deleted anyway).
+_ASCII_WHITESPACE = bytes(c for c in range(128) if chr(c).isspace())
+_ASCII_DELETE = bytes(c for c in range(128) if not (97 <= c <= 122) and c not in _ASCII_WHITESPACE)
+_ASCII_TABLE = bytes.maketrans(_ASCII_WHITESPACE, b' ' * len(_ASCII_WHITESPACE))
+_NON_ASCII_RE = re.compile(r'[^\x00-\x7f]+')
+
+
+def _collapse_non_ascii(match):
+    return ' ' if any(ch.isspace() for ch in match.group()) else ''
+
+
+def _is_word_char(ch):
+    # Same definition of a word character as the re module's \b for str patterns
+    return ch.isalnum() or ch == '_'
+
+
+def _remove_word(text, word):
+    """Equivalent to re.sub(r'\b' + re.escape(word) + r'\b', '', text), using str.find."""
+    n = len(word)
+    if not n or word not in text:
+        return text
+    word_starts = _is_word_char(word[0])
+    word_ends = _is_word_char(word[-1])
+    pieces = []
+    keep_from = 0
+    pos = text.find(word)
+    while pos != -1:
+        before = pos > 0 and _is_word_char(text[pos - 1])
+        end = pos + n
+        after = end < len(text) and _is_word_char(text[end])
+        if before != word_starts and after != word_ends:
+            pieces.append(text[keep_from:pos])
+            keep_from = end
+            pos = text.find(word, end)
+        else:
+            pos = text.find(word, pos + 1)
+    if not pieces:
+        return text
+    pieces.append(text[keep_from:])
+    return ''.join(pieces)
+
+
+def _has_word(text, word):
+    """Equivalent to re.search(r'\b' + word + r'\b', text) for a word that starts and ends with a word character."""
+    n = len(word)
+    pos = text.find(word)
+    while pos != -1:
+        if (pos == 0 or not _is_word_char(text[pos - 1])) and (pos + n == len(text) or not _is_word_char(text[pos + n])):
+            return True
+        pos = text.find(word, pos + 1)
+    return False
+
+
+def _ascii_flags(lowered):
+    """
+    (has_portfolio_link, has_honors_or_certs) for lower-cased ASCII text, where
+    plain substring scans match exactly what the IGNORECASE regexes do.
+    """
+    portfolio = 1 if any(marker in lowered for marker in _PORTFOLIO_MARKERS) else 0
+    honors = 1 if any(_has_word(lowered, word) for word in _HONORS_WORDS) else 0
+    return portfolio, honors
+
+
+def _clean_lowered(text, name_words):
+    for name_word in name_words:
+        text = _remove_word(text, name_word)
+    if not text.isascii():
+        text = _NON_ASCII_RE.sub(_collapse_non_ascii, text)
+    text = text.encode('ascii').translate(_ASCII_TABLE, _ASCII_DELETE).decode('ascii')
+    stop_words = CUSTOM_STOP_WORDS
+    return " ".join([word for word in text.split() if len(word) > 2 and word not in stop_words])
+
+
+# --- 2. Single-Document Helpers ---
+def clean_text_aggressively(text, name_words=()):
+    """Lower-cases, strips the candidate's name words and non-letters, drops stop words and words of <= 2 letters."""
+    if not isinstance(text, str): return ""
+    return _clean_lowered(text.lower(), name_words)
+
+def has_portfolio_link(text):
+    if not isinstance(text, str): return 0
+    return 1 if _PORTFOLIO_RE.search(text) else 0
+
+def has_honors_or_certs(text):
+    if not isinstance(text, str): return 0
+    return 1 if _HONORS_RE.search(text) else 0
+
+def extract_features(text, name_words=()):
+    """
+    Returns (cleaned_text, has_portfolio_link, has_honors_or_certs) for one
+    document. ASCII text is lower-cased once and the flags are read from that
+    copy by the cleaning pass; other text uses the regex helpers.
+    """
+    if not isinstance(text, str): return "", 0, 0
+    lowered = text.lower()
+    if text.isascii():
+        portfolio, honors = _ascii_flags(lowered)
+    else:
+        portfolio, honors = has_portfolio_link(text), has_honors_or_certs(text)
+    return _clean_lowered(lowered, name_words), portfolio, honors
+
+
+# --- 3. Batch Mode ---
+def extract_features_batch(texts, name_words_list=None):
+    """
+    Cleans a list of documents and computes their engineered flags.
+
+    Returns (cleaned_texts, flags) where flags is an (n, 2) float array of
+    [has_portfolio_link, has_honors_or_certs] rows. `name_words_list`, when
+    given, holds one iterable of name words per document.
+    """
+    if name_words_list is None:
+        name_words_list = [()] * len(texts)
+    cleaned_texts = []
+    flags = np.zeros((len(texts), 2), dtype=float)
+    for row, (text, name_words) in enumerate(zip(texts, name_words_list)):
+        cleaned, flags[row, 0], flags[row, 1] = extract_features(text, name_words)
+        cleaned_texts.append(cleaned)
+    return cleaned_texts, flags
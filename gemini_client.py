@@ -0,0 +1,339 @@
+import contextlib
+import os
+import random
+import sys
+import threading
+import time
+
+# --- 1. Errors ---
+class CircuitOpenError(Exception):
+    """Raised instead of calling Gemini while the circuit breaker is open."""
+
+
+class RateLimitTimeout(Exception):
+    """Raised when no rate-limit token or concurrency slot frees up in time."""
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a call's deadline passes before another attempt could start."""
+
+
+# HTTP codes worth retrying: quota (429) and transient upstream failures.
+RETRYABLE_CODES = frozenset({408, 429, 500, 502, 503, 504})
+
+
+def _transport_errors():
+    # google.genai raises httpx's own timeout/connection errors, which are not
+    # TimeoutError/ConnectionError subclasses. httpx is only loaded with the
+    # real client, so when it is not imported none of its errors can occur.
+    httpx = sys.modules.get('httpx')
+    return (httpx.TransportError,) if httpx is not None else ()
+
+
+def is_retryable(error):
+    """True for quota/transient errors (google.genai APIError codes, timeouts, dropped connections)."""
+    code = getattr(error, 'code', None) or getattr(error, 'status_code', None)
+    if isinstance(code, int):
+        return code in RETRYABLE_CODES
+    return isinstance(error, (TimeoutError, ConnectionError) + _transport_errors())
+
+
+def http_timeout_from_env():
+    """
+    Seconds before a single Gemini HTTP request is abandoned: GENAI_HTTP_TIMEOUT,
+    defaulting to the per-call deadline GENAI_CALL_TIMEOUT (20). Calls made
+    under call_deadline() clip it further to the time they have left.
+    """
+    return float(os.environ.get("GENAI_HTTP_TIMEOUT", os.environ.get("GENAI_CALL_TIMEOUT", "20")))
+
+
+# --- 2. Token Bucket ---
+class TokenBucket:
+    """`rate` tokens per second refill a bucket of `capacity`; each call takes one."""
+
+    def __init__(self, rate, capacity, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = clock()
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout):
+        """Takes a token, waiting up to `timeout` seconds. Returns False on timeout."""
+        deadline = self._clock() + timeout
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return True
+                wait = (1.0 - self._tokens) / self.rate
+            if now + wait > deadline:
+                return False
+            self._sleep(wait)
+
+
+# --- 3. Circuit Breaker ---
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and rejects calls
+    for `reset_timeout` seconds. Then one trial call is let through
+    (half-open): success closes the circuit, failure opens it again.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        self.times_opened = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        if self._opened_at is None:
+            return 'closed'
+        if self._clock() - self._opened_at >= self.reset_timeout:
+            return 'half_open'
+        return 'open'
+
+    def is_open(self):
+        """True while calls would be rejected (a half-open circuit still admits its trial call)."""
+        with self._lock:
+            state = self._state()
+            return state == 'open' or (state == 'half_open' and self._trial_in_flight)
+
+    def allow(self):
+        with self._lock:
+            state = self._state()
+            if state == 'closed':
+                return True
+            if state == 'half_open' and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_in_flight or (self._opened_at is None and self._failures >= self.failure_threshold):
+                self._opened_at = self._clock()
+                self.times_opened += 1
+                print(f"Gemini circuit breaker opened after {self._failures} failure(s); "
+                      f"pausing calls for {self.reset_timeout:g}s.")
+            self._trial_in_flight = False
+
+    def release_trial(self):
+        """Ends a trial call that neither succeeded nor failed upstream (e.g. a 400)."""
+        with self._lock:
+            self._trial_in_flight = False
+
+
+# --- 4. Call Deadlines ---
+_deadline_local = threading.local()
+
+
+@contextlib.contextmanager
+def call_deadline(deadline):
+    """Gemini calls this thread makes inside the block give up at `deadline` (a time.monotonic() value)."""
+    previous = getattr(_deadline_local, 'deadline', None)
+    _deadline_local.deadline = deadline
+    try:
+        yield
+    finally:
+        _deadline_local.deadline = previous
+
+
+def current_deadline():
+    """The deadline set by the innermost call_deadline() block on this thread, or None."""
+    return getattr(_deadline_local, 'deadline', None)
+
+
+def _with_http_timeout(kwargs, timeout):
+    """generate_content kwargs whose per-request HTTP timeout is `timeout` seconds (None: unchanged)."""
+    config = kwargs.get('config')
+    if timeout is None or not (config is None or isinstance(config, dict)):
+        return kwargs
+    config = dict(config or {})
+    config['http_options'] = {**(config.get('http_options') or {}), 'timeout': max(1, int(timeout * 1000))}
+    return {**kwargs, 'config': config}
+
+
+# --- 5. Resilient Client ---
+class _Models:
+    """Mirrors client.models so callers keep writing client.models.generate_content(...)."""
+
+    def __init__(self, owner):
+        self._owner = owner
+
+    def generate_content(self, **kwargs):
+        return self._owner.generate_content(**kwargs)
+
+    def generate_content_stream(self, **kwargs):
+        return self._owner.generate_content_stream(**kwargs)
+
+
+class ResilientGeminiClient:
+    """
+    Wraps a google.genai Client (or any object with the same
+    models.generate_content / generate_content_stream methods, e.g. a local
+    fake) with:
+
+      - a token-bucket rate limit plus a cap on concurrent calls,
+      - bounded exponential backoff with jitter on retryable errors,
+      - a circuit breaker that fails fast while Gemini keeps failing,
+      - the caller's deadline (see call_deadline): no wait, retry or HTTP
+        request outlives it.
+
+    `clock` and `sleep` can be swapped for deterministic tests.
+    """
+
+    def __init__(self, client, rate_per_second=5.0, burst=10, max_concurrency=8, max_retries=3,
+                 backoff_base=0.5, backoff_max=8.0, acquire_timeout=10.0, breaker=None,
+                 clock=time.monotonic, sleep=time.sleep):
+        self.client = client
+        self.models = _Models(self)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.acquire_timeout = acquire_timeout
+        self.breaker = breaker if breaker is not None else CircuitBreaker(clock=clock)
+        self._bucket = TokenBucket(rate_per_second, burst, clock=clock, sleep=sleep)
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.retries = 0
+        self.failures = 0
+        self.rejected_open = 0
+        self.throttled = 0
+        self.expired = 0
+
+    def is_open(self):
+        return self.breaker.is_open()
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def _backoff(self, attempt):
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return delay * random.uniform(0.5, 1.0)
+
+    def _remaining(self, deadline):
+        return None if deadline is None else deadline - self._clock()
+
+    def _call(self, attempt_once, deadline=None):
+        """
+        Runs attempt_once(timeout) under the breaker, rate limit and retry
+        policy. `timeout` is the seconds left before `deadline` (default: the
+        thread's call_deadline), or None without one. Token and slot waits
+        are clipped to it and no retry starts once its backoff would end past it.
+        """
+        if deadline is None:
+            deadline = current_deadline()
+        if not self.breaker.allow():
+            self._count('rejected_open')
+            raise CircuitOpenError("Gemini circuit breaker is open")
+        attempt = 0
+        while True:
+            remaining = self._remaining(deadline)
+            if remaining is not None and remaining <= 0:
+                self._count('expired')
+                self.breaker.release_trial()
+                raise DeadlineExceeded("Gemini call deadline passed")
+            if not self._bucket.acquire(self.acquire_timeout if remaining is None else min(self.acquire_timeout, remaining)):
+                self._count('throttled')
+                self.breaker.release_trial()
+                raise RateLimitTimeout("Timed out waiting for a Gemini rate-limit token")
+            remaining = self._remaining(deadline)
+            if not self._slots.acquire(timeout=self.acquire_timeout if remaining is None else max(0.0, min(self.acquire_timeout, remaining))):
+                self._count('throttled')
+                self.breaker.release_trial()
+                raise RateLimitTimeout("Timed out waiting for a Gemini concurrency slot")
+            self._count('calls')
+            try:
+                result = attempt_once(self._remaining(deadline))
+            except Exception as e:
+                if not is_retryable(e):
+                    self.breaker.release_trial()
+                    raise
+                self._count('failures')
+                delay = self._backoff(attempt)
+                remaining = self._remaining(deadline)
+                # Giving up at the deadline still counts, or a hung Gemini would never open the breaker
+                if attempt >= self.max_retries or (remaining is not None and delay >= remaining):
+                    self.breaker.record_failure()
+                    raise
+                print(f"Gemini call failed ({e}); retry {attempt + 1}/{self.max_retries} in {delay:.2f}s.")
+            else:
+                self.breaker.record_success()
+                return result
+            finally:
+                self._slots.release()
+            self._count('retries')
+            attempt += 1
+            self._sleep(delay)
+
+    def generate_content(self, **kwargs):
+        return self._call(lambda timeout: self.client.models.generate_content(**_with_http_timeout(kwargs, timeout)))
+
+    def generate_content_stream(self, **kwargs):
+        """
+        Streams chunks. The first chunk is fetched under the retry policy;
+        a failure after text has been yielded is not retried.
+        """
+        def first_chunk(timeout):
+            stream = iter(self.client.models.generate_content_stream(**_with_http_timeout(kwargs, timeout)))
+            return stream, next(stream, None)
+
+        stream, chunk = self._call(first_chunk)
+        while chunk is not None:
+            yield chunk
+            chunk = next(stream, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "breaker_state": self.breaker.state,
+                "breaker_times_opened": self.breaker.times_opened,
+                "calls": self.calls,
+                "retries": self.retries,
+                "failures": self.failures,
+                "rejected_open": self.rejected_open,
+                "throttled": self.throttled,
+                "expired": self.expired,
+            }
+
+
+def resilient_client_from_env(client):
+    """Wraps `client` using GENAI_RATE_* / GENAI_RETRY_* / GENAI_BREAKER_* environment variables."""
+    return ResilientGeminiClient(
+        client,
+        rate_per_second=float(os.environ.get("GENAI_RATE_PER_SECOND", "5")),
+        burst=int(os.environ.get("GENAI_RATE_BURST", "10")),
+        max_concurrency=int(os.environ.get("GENAI_MAX_CONCURRENCY", "8")),
+        max_retries=int(os.environ.get("GENAI_RETRY_MAX", "3")),
+        backoff_base=float(os.environ.get("GENAI_RETRY_BACKOFF", "0.5")),
+        breaker=CircuitBreaker(
+            failure_threshold=int(os.environ.get("GENAI_BREAKER_FAILURES", "5")),
+            reset_timeout=float(os.environ.get("GENAI_BREAKER_RESET", "30")),
+        ),
+    )
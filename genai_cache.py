@@ -0,0 +1,245 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# --- 1. Cache Keys ---
+def text_digest(text):
+    """sha256 hex of a resume; cache keys are built from it rather than from the full text."""
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+def make_cache_key(kind, model, job_role, resume_text, job_description=None, resume_digest=None, compaction=""):
+    """
+    Content-addressed key for one Gemini prompt: sha256 over every input that
+    shapes the reply. Pass `resume_digest` (text_digest of the resume) instead
+    of the text to build the key for a resume that is no longer at hand.
+    `compaction` is the PromptCompactor fingerprint, since the prompt holds
+    the compacted text rather than the text hashed here.
+    """
+    if resume_digest is None:
+        resume_digest = text_digest(resume_text)
+    digest = hashlib.sha256()
+    for part in (kind, model, (job_role or "").lower(), resume_digest, job_description or "", compaction):
+        encoded = part.encode("utf-8")
+        # Length-prefix each part so ('ab', 'c') and ('a', 'bc') never collide.
+        digest.update(len(encoded).to_bytes(8, "big"))
+        digest.update(encoded)
+    return digest.hexdigest()
+
+
+# --- 2. Two-Tier Cache ---
+class GenAICache:
+    """
+    Response cache for Gemini text: an in-memory LRU in front of a SQLite table.
+
+    Entries older than `ttl_seconds` are treated as misses and deleted. The
+    SQLite tier is trimmed back to `max_rows` (least recently used first)
+    every `evict_every` writes. Disk hits record their access time in memory
+    and write it back in batches of `access_flush_every` (and before each
+    trim). Pass db_path=None for a memory-only cache.
+
+    The lock only guards the memory tier and counters; SQLite is read and
+    written outside it, on a connection per thread (and per forked worker).
+    """
+
+    def __init__(self, db_path, ttl_seconds=7 * 24 * 3600, max_memory_entries=512,
+                 max_rows=50000, evict_every=100, access_flush_every=64):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.max_memory_entries = max_memory_entries
+        self.max_rows = max_rows
+        self.evict_every = evict_every
+        self.access_flush_every = access_flush_every
+        self._memory = OrderedDict()  # key -> (created_at, text)
+        self._pending_access = {}  # key -> last disk-hit time, not yet written to SQLite
+        self._hits_since_flush = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._writes_since_evict = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.writes = 0
+        self._disk = bool(db_path)
+        if self._disk and self._connection() is None:
+            self._disk = False
+
+    @staticmethod
+    def _open(db_path):
+        try:
+            conn = sqlite3.connect(db_path, check_same_thread=False, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS genai_cache ("
+                " key TEXT PRIMARY KEY,"
+                " kind TEXT NOT NULL,"
+                " response TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_genai_cache_accessed ON genai_cache (accessed_at)")
+            conn.commit()
+            return conn
+        except sqlite3.Error as e:
+            print(f"Error opening GenAI cache '{db_path}': {e}. Falling back to memory only.")
+            return None
+
+    def _connection(self):
+        """This thread's SQLite connection, or None for a memory-only cache."""
+        if not self._disk:
+            return None
+        conn = getattr(self._local, 'conn', None)
+        # A forked worker must not use its parent's SQLite connection; it opens its own.
+        if conn is None or self._local.pid != os.getpid():
+            conn = self._open(self.db_path)
+            if conn is None:
+                return None
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _expired(self, created_at, now):
+        return self.ttl_seconds is not None and now - created_at > self.ttl_seconds
+
+    def _remember(self, key, created_at, text):
+        self._memory[key] = (created_at, text)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    @staticmethod
+    def _write_access_times(conn, access_times):
+        conn.executemany(
+            "UPDATE genai_cache SET accessed_at = max(accessed_at, ?) WHERE key = ?",
+            [(accessed_at, key) for key, accessed_at in access_times.items()]
+        )
+
+    def get(self, key):
+        """Returns the cached response text for `key`, or None."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if not self._expired(entry[0], now):
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return entry[1]
+                del self._memory[key]
+
+        row = None
+        conn = self._connection()
+        if conn is not None:
+            try:
+                row = conn.execute("SELECT response, created_at FROM genai_cache WHERE key = ?", (key,)).fetchone()
+                if row is not None and self._expired(row[1], now):
+                    conn.execute("DELETE FROM genai_cache WHERE key = ?", (key,))
+                    conn.commit()
+                    row = None
+            except sqlite3.Error as e:
+                print(f"GenAI cache read error: {e}")
+                row = None
+
+        access_times = None
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            text, created_at = row
+            self._remember(key, created_at, text)
+            self.disk_hits += 1
+            self._pending_access[key] = now
+            self._hits_since_flush += 1
+            if self._hits_since_flush >= self.access_flush_every:
+                self._hits_since_flush = 0
+                access_times, self._pending_access = self._pending_access, {}
+        if access_times:
+            try:
+                self._write_access_times(conn, access_times)
+                conn.commit()
+            except sqlite3.Error as e:
+                print(f"GenAI cache write error: {e}")
+        return text
+
+    def put(self, key, kind, text):
+        now = time.time()
+        access_times = None
+        with self._lock:
+            self._remember(key, now, text)
+            self.writes += 1
+            self._writes_since_evict += 1
+            if self._writes_since_evict >= self.evict_every:
+                self._writes_since_evict = 0
+                self._hits_since_flush = 0
+                access_times, self._pending_access = self._pending_access, {}
+        conn = self._connection()
+        if conn is None:
+            return
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO genai_cache (key, kind, response, created_at, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (key, kind, text, now, now)
+            )
+            if access_times is not None:
+                # The trim is least recently used first, so it needs the pending access times
+                self._write_access_times(conn, access_times)
+                self._evict(conn, now)
+            conn.commit()
+        except sqlite3.Error as e:
+            print(f"GenAI cache write error: {e}")
+
+    def _evict(self, conn, now):
+        if self.ttl_seconds is not None:
+            conn.execute("DELETE FROM genai_cache WHERE created_at < ?", (now - self.ttl_seconds,))
+        conn.execute(
+            "DELETE FROM genai_cache WHERE key IN ("
+            " SELECT key FROM genai_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_rows,)
+        )
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._pending_access.clear()
+            self._hits_since_flush = 0
+        conn = self._connection()
+        if conn is not None:
+            conn.execute("DELETE FROM genai_cache")
+            conn.commit()
+
+    def stats(self):
+        disk_rows = 0
+        conn = self._connection()
+        if conn is not None:
+            try:
+                disk_rows = conn.execute("SELECT COUNT(*) FROM genai_cache").fetchone()[0]
+            except sqlite3.Error:
+                pass
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            return {
+                "memory_entries": len(self._memory),
+                "disk_entries": disk_rows,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "writes": self.writes,
+                "hit_rate": (hits / lookups) if lookups else 0.0,
+            }
+
+
+def cache_from_env():
+    """Builds the process-wide cache from GENAI_CACHE_* environment variables."""
+    db_path = os.environ.get("GENAI_CACHE_PATH", "genai_cache.sqlite3")
+    if db_path.lower() in ("", "none", "off"):
+        db_path = None
+    return GenAICache(
+        db_path,
+        ttl_seconds=float(os.environ.get("GENAI_CACHE_TTL", str(7 * 24 * 3600))),
+        max_memory_entries=int(os.environ.get("GENAI_CACHE_MEMORY_ENTRIES", "512")),
+        max_rows=int(os.environ.get("GENAI_CACHE_MAX_ROWS", "50000")),
+    )
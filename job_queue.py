@@ -0,0 +1,334 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+
+# --- 1. Job Records ---
+# A job is a plain dict:
+#   id, user_id, status ('queued' | 'running' | 'done' | 'failed'), payload,
+#   result, error, submitted_at, started_at, finished_at (epoch seconds)
+JOB_STATUSES = ('queued', 'running', 'done', 'failed')
+
+
+class QueueFullError(Exception):
+    """Raised by JobQueue.submit when max_pending jobs are already waiting."""
+
+
+# --- 2. Backends ---
+class MemoryJobBackend:
+    """In-process backend: jobs live in a dict and vanish with the process."""
+
+    def __init__(self, max_finished=1000):
+        self.max_finished = max_finished
+        self._jobs = {}
+        self._pending = deque()
+        self._finished = OrderedDict()  # job id -> None, oldest first, for trimming
+        self._lock = threading.Lock()
+
+    def add(self, job):
+        with self._lock:
+            self._jobs[job['id']] = job
+            self._pending.append(job['id'])
+
+    def claim(self, now):
+        """Marks the oldest queued job as running and returns a copy, or None."""
+        with self._lock:
+            if not self._pending:
+                return None
+            job = self._jobs[self._pending.popleft()]
+            job['status'], job['started_at'] = 'running', now
+            return dict(job)
+
+    def finish(self, job_id, status, result, error, now):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job.update(status=status, result=result, error=error, finished_at=now)
+            self._finished[job_id] = None
+            while len(self._finished) > self.max_finished:
+                self._jobs.pop(self._finished.popitem(last=False)[0], None)
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def counts(self):
+        with self._lock:
+            counts = dict.fromkeys(JOB_STATUSES, 0)
+            for job in self._jobs.values():
+                counts[job['status']] += 1
+            return counts
+
+    def requeue_running(self):
+        return 0
+
+
+class SQLiteJobBackend:
+    """
+    Local-file backend: one SQLite table, so jobs survive a restart and
+    several processes on the same host can share the queue. Jobs left
+    'running' for over `stale_seconds` (their process died) are put back in
+    the queue on startup. Finished jobs are deleted after `retention_seconds`.
+    """
+
+    def __init__(self, db_path, retention_seconds=24 * 3600, stale_seconds=600):
+        self.db_path = db_path
+        self.retention_seconds = retention_seconds
+        self.stale_seconds = stale_seconds
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id TEXT PRIMARY KEY,"
+                " user_id TEXT,"
+                " status TEXT NOT NULL,"
+                " payload TEXT NOT NULL,"
+                " result TEXT,"
+                " error TEXT,"
+                " submitted_at REAL NOT NULL,"
+                " started_at REAL,"
+                " finished_at REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, submitted_at)")
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            # Per thread, and never inherited across a fork
+            conn = sqlite3.connect(self.db_path, timeout=10.0, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @staticmethod
+    def _to_job(row):
+        job = dict(row)
+        job['payload'] = json.loads(job['payload'])
+        job['result'] = json.loads(job['result']) if job['result'] is not None else None
+        return job
+
+    def add(self, job):
+        self._connect().execute(
+            "INSERT INTO jobs (id, user_id, status, payload, submitted_at) VALUES (?, ?, ?, ?, ?)",
+            (job['id'], job['user_id'], job['status'], json.dumps(job['payload']), job['submitted_at'])
+        )
+
+    def claim(self, now):
+        conn = self._connect()
+        # BEGIN IMMEDIATE takes the write lock up front, so two workers never claim the same row
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status = 'queued' ORDER BY submitted_at LIMIT 1"
+            ).fetchone()
+            if row is not None:
+                conn.execute("UPDATE jobs SET status = 'running', started_at = ? WHERE id = ?", (now, row['id']))
+            conn.execute("COMMIT")
+        except sqlite3.Error:
+            conn.execute("ROLLBACK")
+            raise
+        if row is None:
+            return None
+        job = self._to_job(row)
+        job['status'], job['started_at'] = 'running', now
+        return job
+
+    def finish(self, job_id, status, result, error, now):
+        conn = self._connect()
+        conn.execute(
+            "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ?",
+            (status, json.dumps(result) if result is not None else None, error, now, job_id)
+        )
+        conn.execute(
+            "DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?", (now - self.retention_seconds,)
+        )
+
+    def get(self, job_id):
+        row = self._connect().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_job(row) if row is not None else None
+
+    def counts(self):
+        counts = dict.fromkeys(JOB_STATUSES, 0)
+        for row in self._connect().execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status"):
+            counts[row['status']] = row['n']
+        return counts
+
+    def requeue_running(self):
+        return self._connect().execute(
+            "UPDATE jobs SET status = 'queued', started_at = NULL WHERE status = 'running' AND started_at < ?",
+            (time.time() - self.stale_seconds,)
+        ).rowcount
+
+
+# --- 3. Queue and Worker Pool ---
+class JobQueue:
+    """
+    Bounded worker pool in front of a job backend.
+
+    `runner(payload)` does the work and returns a JSON-serializable result;
+    `on_complete(job)` (optional) runs on the worker after a job succeeds,
+    e.g. to write history. It runs once the job is recorded as finished, so
+    a crash in between skips the hook instead of re-running the job and
+    repeating it. At most `max_pending` jobs may wait at once.
+    Wait time (submit -> start) and run time samples feed stats().
+    """
+
+    def __init__(self, runner, backend=None, workers=4, max_pending=100, on_complete=None,
+                 poll_interval=0.5, sample_size=1000):
+        self.runner = runner
+        self.backend = backend if backend is not None else MemoryJobBackend()
+        self.workers = workers
+        self.max_pending = max_pending
+        self.on_complete = on_complete
+        self.poll_interval = poll_interval
+        self._wake = threading.Condition()
+        self._threads = []
+        self._threads_pid = None
+        self._stopping = False
+        self._lock = threading.Lock()
+        self._wait_times = deque(maxlen=sample_size)
+        self._run_times = deque(maxlen=sample_size)
+        self.submitted = 0
+        self.rejected = 0
+        self.completed = 0
+        self.failed = 0
+
+    def start(self):
+        if self._threads and self._threads_pid == os.getpid():
+            return
+        if self._threads:
+            # Forked after start(): the threads stayed behind in the parent
+            self._threads = []
+            self._wake = threading.Condition()
+        self._threads_pid = os.getpid()
+        requeued = self.backend.requeue_running()
+        if requeued:
+            print(f"Re-queued {requeued} job(s) interrupted by a restart.")
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=None):
+        with self._wake:
+            self._stopping = True
+            self._wake.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        self._stopping = False
+
+    def submit(self, user_id, payload):
+        """Queues one job and returns its id; raises QueueFullError when the queue is full."""
+        if self.backend.counts()['queued'] >= self.max_pending:
+            with self._lock:
+                self.rejected += 1
+            raise QueueFullError(f"{self.max_pending} jobs already waiting")
+        job = {
+            'id': uuid.uuid4().hex, 'user_id': user_id, 'status': 'queued', 'payload': payload,
+            'result': None, 'error': None, 'submitted_at': time.time(), 'started_at': None, 'finished_at': None,
+        }
+        self.backend.add(job)
+        with self._lock:
+            self.submitted += 1
+        with self._wake:
+            self._wake.notify()
+        return job['id']
+
+    def get(self, job_id):
+        return self.backend.get(job_id)
+
+    def _work(self):
+        while True:
+            with self._wake:
+                if self._stopping:
+                    return
+            try:
+                job = self.backend.claim(time.time())
+            except sqlite3.Error as e:
+                print(f"Job queue claim error: {e}")
+                job = None
+            if job is None:
+                # Sleep until a local submit wakes us; the timeout also picks up jobs
+                # queued by other processes sharing a file backend.
+                with self._wake:
+                    if not self._stopping:
+                        self._wake.wait(self.poll_interval)
+                continue
+            self._run(job)
+
+    def _run(self, job):
+        started = time.time()
+        try:
+            result = self.runner(job['payload'])
+            status, error = 'done', None
+        except Exception as e:
+            print(f"Job {job['id']} failed: {e}")
+            result, status, error = None, 'failed', str(e)
+        finished = time.time()
+        self.backend.finish(job['id'], status, result, error, finished)
+        if status == 'done' and self.on_complete is not None:
+            try:
+                self.on_complete({**job, 'status': status, 'result': result, 'finished_at': finished})
+            except Exception as e:
+                print(f"Job {job['id']} completion hook failed: {e}")
+        with self._lock:
+            self._wait_times.append(started - job['submitted_at'])
+            self._run_times.append(finished - started)
+            if status == 'done':
+                self.completed += 1
+            else:
+                self.failed += 1
+
+    @staticmethod
+    def _summary(samples):
+        if not samples:
+            return {"count": 0, "avg": 0.0, "p50": 0.0, "p95": 0.0, "max": 0.0}
+        ordered = sorted(samples)
+        return {
+            "count": len(ordered),
+            "avg": sum(ordered) / len(ordered),
+            "p50": ordered[len(ordered) // 2],
+            "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+            "max": ordered[-1],
+        }
+
+    def stats(self):
+        counts = self.backend.counts()
+        with self._lock:
+            return {
+                "backend": type(self.backend).__name__,
+                "workers": len(self._threads),
+                "max_pending": self.max_pending,
+                "queue_depth": counts['queued'],
+                "running": counts['running'],
+                "submitted": self.submitted,
+                "rejected": self.rejected,
+                "completed": self.completed,
+                "failed": self.failed,
+                "wait_seconds": self._summary(self._wait_times),
+                "run_seconds": self._summary(self._run_times),
+            }
+
+
+def job_queue_from_env(runner, on_complete=None):
+    """Builds the app's queue from JOB_QUEUE_* environment variables (memory backend by default)."""
+    backend_name = os.environ.get("JOB_QUEUE_BACKEND", "memory").lower()
+    if backend_name == "sqlite":
+        backend = SQLiteJobBackend(os.environ.get("JOB_QUEUE_PATH", "jobs.sqlite3"))
+    else:
+        backend = MemoryJobBackend()
+    return JobQueue(
+        runner, backend,
+        workers=int(os.environ.get("JOB_WORKERS", "4")),
+        max_pending=int(os.environ.get("JOB_MAX_PENDING", "100")),
+        on_complete=on_complete,
+    )
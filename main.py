@@ -1,169 +1,302 @@
 import pandas as pd
 import numpy as np
-import re
 import os
+import time
+import argparse
+import hashlib
+import json
+import tempfile
+import uuid
 import joblib
-import shutil
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.linear_model import LogisticRegression
 from scipy.sparse import hstack
+from features import extract_features_batch
+from model_registry import safe_role_name
+from model_bundle import BUNDLE_POINTER, export_bundle
 
-# --- 1. Create Helper Functions ---
-CUSTOM_STOP_WORDS = set([
-    'resume', 'profile', 'summary', 'objective', 'experience', 'education', 'skills',
-    'projects', 'references', 'company', 'organization', 'location', 'city', 'state',
-    'jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec',
-    'january', 'february', 'march', 'april', 'june', 'july', 'august', 'september',
-    'october', 'november', 'december', 'present', 'current', 'llc', 'inc', 'corp',
-    'gpa', 'university', 'college', 'degree', 'linkedin', 'github', 'email', 'phone',
-    'address', 'date', 'birth', 'street', 'com', 'www', 'http', 'httpss'
-])
-
-def clean_text_aggressively(text, name_words):
-    if not isinstance(text, str):
-        return ""
-    text = text.lower()
-    for name_word in name_words:
-        text = re.sub(r'\b' + re.escape(name_word) + r'\b', '', text)
-    text = re.sub(r'[^a-z\s]', '', text)
-    words = text.split()
-    cleaned_words = [word for word in words if word not in CUSTOM_STOP_WORDS and len(word) > 2]
-    return " ".join(cleaned_words)
-
-def has_portfolio_link(text):
-    if not isinstance(text, str): return 0
-    return 1 if re.search(r'(https?://|www\.)', text, re.IGNORECASE) else 0
-
-def has_honors_or_certs(text):
-    if not isinstance(text, str): return 0
-    return 1 if re.search(r'\b(award|honor|certification|certificate|publication|patent|distinction|fellowship)\b', text, re.IGNORECASE) else 0
-
-# --- 2. Load and Process Data ---
-csv_file = 'Dataset/dataset.csv'
-try:
-    df = pd.read_csv(csv_file)
-    print(f"Successfully loaded '{csv_file}'. Found {len(df)} total records.")
-except FileNotFoundError:
-    print(f"Error: Could not find '{csv_file}'.")
-    exit()
-
-if 'decision' in df.columns and df['decision'].dtype == 'object':
-    df['decision'] = df['decision'].map({'select': 1, 'reject': 0}) 
-    df.dropna(subset=['decision'], inplace=True)
-    df['decision'] = df['decision'].astype(int)
-else:
-    print("Error: Could not find a valid 'decision' column to map.")
-    exit()
-
-# --- 3. Iterate Through All Roles ---
-print("\n--- Starting Model Training for All Roles ---")
-    
-df['role_lower'] = df['Role'].str.lower()
-unique_roles = df['role_lower'].dropna().unique()
-results = [] 
+# --- 1. Helper Functions ---
+# Text cleaning and the engineered flags live in features.py, shared with predict.py.
 
+CSV_FILE = 'Dataset/dataset.csv'
 MODEL_DIR = "saved_models"
+MANIFEST_FILE = "manifest.json"
+MIN_APPLICANTS = 50
+
+# Everything that shapes a trained role besides its data. A change here
+# invalidates every entry in the training manifest.
+TFIDF_PARAMS = dict(stop_words='english', max_features=3000, min_df=3, max_df=0.85, ngram_range=(1, 2))
+MODEL_PARAMS = dict(random_state=42, solver='liblinear', max_iter=1000, class_weight='balanced')
+SPLIT_PARAMS = dict(test_size=0.3, random_state=42)
+TRAINING_COLUMNS = ['Name', 'Resume', 'decision']
+
+def params_fingerprint():
+    payload = json.dumps(
+        {'tfidf': TFIDF_PARAMS, 'model': MODEL_PARAMS, 'split': SPLIT_PARAMS, 'min_applicants': MIN_APPLICANTS},
+        sort_keys=True, default=str
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def role_fingerprint(df_subset):
+    """sha256 over the role's training rows (Name, Resume, decision) in order."""
+    row_hashes = pd.util.hash_pandas_object(df_subset[TRAINING_COLUMNS], index=False).values
+    return hashlib.sha256(row_hashes.tobytes()).hexdigest()
+
+def artifact_paths(model_dir, role):
+    safe_name = safe_role_name(role)
+    return (os.path.join(model_dir, f"{safe_name}_model.joblib"),
+            os.path.join(model_dir, f"{safe_name}_vectorizer.joblib"))
+
+def atomic_dump(obj, path):
+    """joblib.dump to a temp file in the same directory, then rename over `path`."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', prefix='.' + os.path.basename(path) + '.', suffix='.tmp')
+    os.close(fd)
+    try:
+        joblib.dump(obj, tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path): os.remove(tmp_path)
+        raise
+
+def load_manifest(model_dir):
+    path = os.path.join(model_dir, MANIFEST_FILE)
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def save_manifest(model_dir, manifest):
+    path = os.path.join(model_dir, MANIFEST_FILE)
+    fd, tmp_path = tempfile.mkstemp(dir=model_dir, prefix='.' + MANIFEST_FILE + '.', suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def remove_artifacts(model_dir, role):
+    for path in artifact_paths(model_dir, role):
+        if os.path.exists(path):
+            os.remove(path)
+
+def load_dataset(csv_file):
+    """Reads the training CSV and maps 'decision' to 1 (select) / 0 (reject). Returns None on failure."""
+    try:
+        df = pd.read_csv(csv_file)
+        print(f"Successfully loaded '{csv_file}'. Found {len(df)} total records.")
+    except FileNotFoundError:
+        print(f"Error: Could not find '{csv_file}'.")
+        return None
+
+    if 'decision' in df.columns and df['decision'].dtype == 'object':
+        df['decision'] = df['decision'].map({'select': 1, 'reject': 0})
+        df.dropna(subset=['decision'], inplace=True)
+        df['decision'] = df['decision'].astype(int)
+    else:
+        print("Error: Could not find a valid 'decision' column to map.")
+        return None
+
+    df['role_lower'] = df['Role'].str.lower()
+    return df
+
+
+def train_role(role, df_subset, model_dir):
+    """
+    Trains and saves one role's vectorizer + model (steps 5-12 below).
+
+    Runs in a worker process when training in parallel, so it returns its log
+    lines instead of printing them; the parent prints each role's block whole.
+    Returns (result_row_or_None, log_lines).
+    """
+    started = time.perf_counter()
+    log = [f"\nProcessing Role: {role}..."]
 
-if os.path.exists(MODEL_DIR):
-    shutil.rmtree(MODEL_DIR)
-    print(f"Removed old '{MODEL_DIR}' directory.")
-os.makedirs(MODEL_DIR, exist_ok=True)
-print(f"Models will be saved in new '{MODEL_DIR}' directory.")
-
-for role in unique_roles:
-    print(f"\nProcessing Role: {role}...")
-    
-    # 4. Filter
-    df_subset = df[df['role_lower'] == role].copy()
-    
     # 5. Check
-    if len(df_subset) < 50:
-        print(f"Skipping: Only found {len(df_subset)} applicants. (Min: 50)")
-        continue
-    
+    if len(df_subset) < MIN_APPLICANTS:
+        log.append(f"Skipping: Only found {len(df_subset)} applicants. (Min: {MIN_APPLICANTS})")
+        return None, log
+
     # --- NEW: Get counts *before* skipping ---
     value_counts = df_subset['decision'].value_counts()
     select_count = value_counts.get(1, 0)
     reject_count = value_counts.get(0, 0)
-    
+
     if df_subset['decision'].nunique() < 2:
-        print(f"Skipping: This role only has one outcome ({select_count} Select / {reject_count} Reject).")
-        continue
-        
-    print(f"Found {len(df_subset)} applicants.")
+        log.append(f"Skipping: This role only has one outcome ({select_count} Select / {reject_count} Reject).")
+        return None, log
+
+    log.append(f"Found {len(df_subset)} applicants.")
     # --- NEW: Print the balance ---
-    print(f"Decision Balance: {select_count} Select / {reject_count} Reject")
+    log.append(f"Decision Balance: {select_count} Select / {reject_count} Reject")
 
     # 6. (DELETED) Augmentation is gone
 
     # 7. Feature Engineering
-    df_subset['has_portfolio_link'] = df_subset['Resume'].apply(has_portfolio_link)
-    df_subset['has_honors_or_certs'] = df_subset['Resume'].apply(has_honors_or_certs)
-    df_subset['name_words'] = df_subset['Name'].apply(lambda x: set(str(x).lower().split()) if pd.notna(x) else set())
-    df_subset['cleaned_resume'] = df_subset.apply(lambda row: clean_text_aggressively(row['Resume'], row['name_words']), axis=1)
-    engineered_features = df_subset[['has_portfolio_link', 'has_honors_or_certs']]
+    name_words = [set(str(x).lower().split()) if pd.notna(x) else set() for x in df_subset['Name']]
+    cleaned_resumes, engineered_features = extract_features_batch(df_subset['Resume'].tolist(), name_words)
 
     # 8. Create TF-IDF
-    vectorizer = TfidfVectorizer(
-        stop_words='english', max_features=3000, min_df=3, max_df=0.85, ngram_range=(1, 2)
-    )
-    tfidf_matrix = vectorizer.fit_transform(df_subset['cleaned_resume'])
+    vectorizer = TfidfVectorizer(**TFIDF_PARAMS)
+    tfidf_matrix = vectorizer.fit_transform(cleaned_resumes)
     features_combined = hstack([tfidf_matrix, engineered_features])
 
     # 9. Prepare Data
     target = df_subset['decision']
     X_train, X_test, y_train, y_test = train_test_split(
-        features_combined, target, test_size=0.3, random_state=42
+        features_combined, target, **SPLIT_PARAMS
     )
 
     # 10. Train
-    print("Training model with class_weight='balanced'...")
-    ml_model = LogisticRegression(
-        random_state=42, 
-        solver='liblinear', 
-        max_iter=1000,
-        class_weight='balanced'
-    )
+    log.append("Training model with class_weight='balanced'...")
+    ml_model = LogisticRegression(**MODEL_PARAMS)
     ml_model.fit(X_train, y_train)
 
     # 11. Evaluate
     predictions = ml_model.predict(X_test)
     accuracy = accuracy_score(y_test, predictions)
-    print(f"Success! Accuracy: {accuracy * 100:.2f}%")
-    
-    # --- NEW: Add counts to results ---
-    results.append({
-        'Role': role, 
-        'Accuracy': accuracy, 
-        'Select_Count': select_count, 
-        'Reject_Count': reject_count, 
-        'Total_Applicants': len(df_subset)
-    })
+    log.append(f"Success! Accuracy: {accuracy * 100:.2f}%")
 
     # 12. SAVE THE MODEL AND VECTORIZER
-    safe_role_name = re.sub(r'[^a-z0-9_]+', '', role.replace(' ', '_'))
-    model_path = os.path.join(MODEL_DIR, f"{safe_role_name}_model.joblib")
-    vectorizer_path = os.path.join(MODEL_DIR, f"{safe_role_name}_vectorizer.joblib")
-    
-    joblib.dump(ml_model, model_path)
-    joblib.dump(vectorizer, vectorizer_path)
-    print(f"Saved balanced model to {model_path}")
-
-# --- 13. Final Report ---
-print("\n--- Final Accuracy Report (Balanced Models) ---")
-if results:
-    results_df = pd.DataFrame(results)
-    # --- NEW: Reorder columns ---
-    results_df = results_df[[
-        'Role', 
-        'Accuracy', 
-        'Select_Count', 
-        'Reject_Count', 
-        'Total_Applicants'
-    ]]
-    results_df = results_df.sort_values(by='Accuracy', ascending=False)
-    print(results_df.to_string(index=False))
-else:
-    print("No roles had sufficient data to train a model.")
\ No newline at end of file
+    # Each file is renamed into place whole, so a running predict.py never reads
+    # a partial pickle. The shared training id lets its registry tell a new
+    # vectorizer next to the old model (between the two renames) from a pair.
+    ml_model.training_id_ = vectorizer.training_id_ = uuid.uuid4().hex
+    model_path, vectorizer_path = artifact_paths(model_dir, role)
+    atomic_dump(vectorizer, vectorizer_path)
+    atomic_dump(ml_model, model_path)
+    log.append(f"Saved balanced model to {model_path}")
+
+    # --- NEW: Add counts to results ---
+    result = {
+        'Role': role,
+        'Accuracy': float(accuracy),
+        'Select_Count': int(select_count),
+        'Reject_Count': int(reject_count),
+        'Total_Applicants': len(df_subset),
+        'Train_Seconds': time.perf_counter() - started
+    }
+    return result, log
+
+
+def main(csv_file=CSV_FILE, model_dir=MODEL_DIR, workers=1, full=False, bundle=False):
+    # --- 2. Load and Process Data ---
+    df = load_dataset(csv_file)
+    if df is None:
+        exit()
+
+    # --- 3. Iterate Through All Roles ---
+    print("\n--- Starting Model Training for All Roles ---")
+    results = []
+
+    # Models are replaced in place (never deleted up front) so the app keeps serving during training
+    os.makedirs(model_dir, exist_ok=True)
+    manifest = load_manifest(model_dir)
+    params_hash = params_fingerprint()
+    if manifest.get('params_hash') != params_hash:
+        if manifest: print("Training parameters changed; retraining every role.")
+        manifest = {'params_hash': params_hash, 'roles': {}}
+    print(f"Models will be saved in '{model_dir}' (manifest: {MANIFEST_FILE}).")
+
+    # 4. Partition every role's rows in a single groupby pass (first-seen order, like unique())
+    partitions = [
+        (role, df_subset[TRAINING_COLUMNS])
+        for role, df_subset in df.groupby('role_lower', sort=False)
+    ]
+
+    # Only roles whose rows changed since the last run are retrained
+    to_train = []
+    for role, df_subset in partitions:
+        fingerprint = role_fingerprint(df_subset)
+        entry = manifest['roles'].get(role)
+        unchanged = (
+            not full and entry is not None and entry['fingerprint'] == fingerprint
+            and (entry['result'] is None or all(os.path.exists(p) for p in artifact_paths(model_dir, role)))
+        )
+        if unchanged:
+            if entry['result']: results.append({**entry['result'], 'Status': 'unchanged'})
+            continue
+        to_train.append((role, df_subset, fingerprint))
+    print(f"{len(to_train)} of {len(partitions)} roles need training.")
+
+    def record(role, fingerprint, result, log):
+        print("\n".join(log))
+        if result:
+            results.append({**result, 'Status': 'trained'})
+        else:
+            remove_artifacts(model_dir, role)  # role no longer qualifies; drop any stale model
+        manifest['roles'][role] = {'fingerprint': fingerprint, 'result': result}
+        save_manifest(model_dir, manifest)
+
+    started = time.perf_counter()
+    if workers <= 1:
+        for role, df_subset, fingerprint in to_train:
+            result, log = train_role(role, df_subset, model_dir)
+            record(role, fingerprint, result, log)
+    elif to_train:
+        print(f"Training {len(to_train)} roles across {workers} worker processes...")
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(train_role, role, df_subset, model_dir): (role, fingerprint)
+                for role, df_subset, fingerprint in to_train
+            }
+            for future in as_completed(futures):
+                role, fingerprint = futures[future]
+                result, log = future.result()
+                record(role, fingerprint, result, log)
+    total_seconds = time.perf_counter() - started
+
+    # Roles that vanished from the dataset (and any pre-manifest leftovers) lose their artifacts
+    current_roles = {role for role, _ in partitions}
+    for role in [r for r in manifest['roles'] if r not in current_roles]:
+        remove_artifacts(model_dir, role)
+        del manifest['roles'][role]
+    kept = {safe_role_name(role) for role, entry in manifest['roles'].items() if entry['result']}
+    for filename in os.listdir(model_dir):
+        for suffix in ("_model.joblib", "_vectorizer.joblib"):
+            if filename.endswith(suffix) and filename[:-len(suffix)] not in kept:
+                os.remove(os.path.join(model_dir, filename))
+                print(f"Removed stale artifact {filename}")
+    save_manifest(model_dir, manifest)
+
+    # Keep the memory-mapped bundle (see model_bundle.py) in step with the joblib artifacts
+    if bundle or os.path.exists(os.path.join(model_dir, BUNDLE_POINTER)):
+        if kept:
+            export_bundle(model_dir)
+        else:
+            print("No trained roles; skipping bundle export.")
+
+    # --- 13. Final Report ---
+    print("\n--- Final Accuracy Report (Balanced Models) ---")
+    if results:
+        results_df = pd.DataFrame(results)
+        # --- NEW: Reorder columns ---
+        results_df = results_df[[
+            'Role',
+            'Accuracy',
+            'Select_Count',
+            'Reject_Count',
+            'Total_Applicants',
+            'Train_Seconds',
+            'Status'
+        ]]
+        results_df = results_df.sort_values(by='Accuracy', ascending=False)
+        print(results_df.to_string(index=False))
+    else:
+        print("No roles had sufficient data to train a model.")
+    print(f"\nTrained {len(to_train)} changed role(s) in {total_seconds:.2f}s wall time with {workers} worker(s).")
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Train one resume classifier per role.")
+    parser.add_argument('--csv', default=CSV_FILE, help="Training data CSV (default: %(default)s)")
+    parser.add_argument('--model-dir', default=MODEL_DIR, help="Where to write the joblib artifacts (default: %(default)s)")
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('TRAIN_WORKERS', '1')),
+                        help="Worker processes for per-role training; 1 trains serially (default: %(default)s)")
+    parser.add_argument('--full', action='store_true', help="Retrain every role even if its data is unchanged")
+    parser.add_argument('--export-bundle', action='store_true',
+                        help="Also write the shared memory-mapped model bundle (re-exported automatically once one exists)")
+    args = parser.parse_args()
+    main(args.csv, args.model_dir, args.workers, args.full, args.export_bundle)
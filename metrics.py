@@ -0,0 +1,199 @@
+import bisect
+import contextvars
+import math
+import threading
+import time
+
+# --- 1. Metric Types ---
+# Latency buckets in seconds: sub-millisecond ML steps up to the 20s Gemini deadline.
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0)
+
+_REGISTRY = []
+_COLLECTORS = []
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labelnames, labelvalues, extra=()):
+    pairs = list(zip(labelnames, labelvalues)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic count, optionally split by labels (passed positionally, in labelnames order)."""
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _REGISTRY.append(self)
+
+    def inc(self, *labelvalues, amount=1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labelvalues, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram of observed values (seconds), one series per label set."""
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}  # labelvalues -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+        _REGISTRY.append(self)
+
+    def observe(self, value, *labelvalues):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = sorted((labelvalues, list(series)) for labelvalues, series in self._series.items())
+        for labelvalues, series in snapshot:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), series[:-1]):
+                cumulative += count
+                labels = _format_labels(self.labelnames, labelvalues, [('le', _format_value(bound))])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, labelvalues)
+            lines.append(f"{self.name}_sum{labels} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+def register_collector(collect):
+    """
+    Adds a scrape-time source. `collect()` returns a list of
+    (name, type, documentation, [(labels dict, value), ...]); used to
+    expose counters other components already keep (registry, caches, queue).
+    """
+    _COLLECTORS.append(collect)
+
+
+def render():
+    """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+    lines = []
+    for metric in _REGISTRY:
+        lines.extend(metric.render())
+    for collect in _COLLECTORS:
+        try:
+            families = collect()
+        except Exception as e:
+            print(f"Metrics collector failed: {e}")
+            continue
+        for name, kind, documentation, samples in families:
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{name}{_format_labels(labels.keys(), labels.values())} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+# --- 2. Application Metrics ---
+STAGE_SECONDS = Histogram(
+    "resume_stage_seconds", "Time spent in each classification stage.", ["stage"]
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "resume_http_request_seconds", "Flask request latency by endpoint.", ["endpoint", "method", "status"]
+)
+GENAI_CALL_SECONDS = Histogram(
+    "resume_genai_call_seconds", "Latency of Gemini calls that missed the cache, by prompt kind.", ["kind"]
+)
+GENAI_CACHE_LOOKUPS = Counter(
+    "resume_genai_cache_lookups_total", "Gemini response cache lookups by prompt kind and result.", ["kind", "result"]
+)
+GENAI_ERRORS = Counter(
+    "resume_genai_errors_total", "Gemini calls that raised, by prompt kind.", ["kind"]
+)
+GENAI_BUSY = Counter(
+    "resume_genai_busy_rejections_total", "Gemini calls refused because GENAI_MAX_IN_FLIGHT calls were still queued or running."
+)
+NEAR_DUPLICATES = Counter(
+    "resume_near_duplicate_lookups_total", "Near-duplicate resume lookups by outcome.", ["outcome"]
+)
+PROMPT_TOKENS = Counter(
+    "resume_prompt_tokens_total", "Estimated resume/JD prompt tokens before ('original') and after ('sent') compaction.", ["stage"]
+)
+CLASSIFICATIONS = Counter(
+    "resume_classifications_total", "Completed classifications by ML outcome.", ["prediction"]
+)
+FEEDBACK = Counter(
+    "resume_feedback_total", "Recruiter Select/Reject decisions received.", ["decision"]
+)
+
+
+# --- 3. Timing Spans ---
+# Spans recorded while a trace is active (one per Flask request) are also kept
+# per request, so the route can report them in a Server-Timing header.
+_trace = contextvars.ContextVar('metrics_trace', default=None)
+
+
+def begin_trace():
+    _trace.set([])
+
+
+def current_trace():
+    """[(stage, seconds), ...] recorded since begin_trace, or [] when no trace is active."""
+    return _trace.get() or []
+
+
+def end_trace():
+    _trace.set(None)
+
+
+class span:
+    """
+    Context manager timing its block into resume_stage_seconds{stage=...} (and
+    the current trace, if any). A plain class rather than @contextmanager:
+    it sits inside the per-resume scoring path, where a generator costs more
+    than the timing itself.
+    """
+    __slots__ = ('stage', 'started')
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.started
+        STAGE_SECONDS.observe(elapsed, self.stage)
+        spans = _trace.get()
+        if spans is not None:
+            spans.append((self.stage, elapsed))
+        return False
+
+
+def server_timing(spans):
+    """Server-Timing header value for a request's spans (durations in ms)."""
+    return ", ".join(f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in spans)
@@ -0,0 +1,352 @@
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+
+import numpy as np
+
+from features import extract_features_batch
+from fast_scorer import RoleScorer, build_word_analyzer
+from metrics import span
+from model_registry import _artifact_paths, _is_matching_pair, safe_role_name
+
+# --- 1. Layout ---
+# saved_models/bundle.json points at the current versioned directory, e.g.
+# saved_models/bundle-1a2b3c4d/, which holds:
+#   meta.json          roles (row order), analyzer params, classes
+#   terms.npy          sorted UTF-8 terms of the vocabulary shared by all roles (S<n>)
+#   indptr.npy         CSR row pointers: role r owns entries indptr[r]:indptr[r+1]
+#   indices.npy        shared-vocabulary column of each entry (sorted within a role)
+#   idf.npy, coef.npy  the role's IDF weight and LR coefficient for that column
+#   extra_coef.npy     (n_roles, 2) coefficients of [has_portfolio_link, has_honors_or_certs]
+#   intercept.npy      (n_roles,) LR intercepts
+# Every array is opened with mmap_mode='r', so worker processes share the pages.
+#
+# While bundle.json exists the bundle is authoritative for every role it
+# holds, and serving reads no pickles for them. main.py re-exports it after
+# each training run, so replacing bundle.json is the only reload signal.
+# Bundles are build output, not committed.
+BUNDLE_POINTER = "bundle.json"
+BUNDLE_FORMAT = 1
+_ARRAYS = ('terms', 'indptr', 'indices', 'idf', 'coef', 'extra_coef', 'intercept')
+
+
+def _write_pointer(model_dir, bundle_name):
+    fd, tmp_path = tempfile.mkstemp(dir=model_dir, prefix='.' + BUNDLE_POINTER + '.', suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        json.dump({'format': BUNDLE_FORMAT, 'path': bundle_name}, f)
+    os.replace(tmp_path, os.path.join(model_dir, BUNDLE_POINTER))
+
+
+# --- 2. Export ---
+def export_bundle(model_dir):
+    """
+    Packs every <role>_model.joblib / <role>_vectorizer.joblib pair in
+    model_dir into one bundle directory and points bundle.json at it.
+    Older bundle directories are removed (processes that still have them
+    mapped keep working until they reopen). Returns the bundle path.
+    """
+    import joblib
+    pairs = []
+    for filename in sorted(os.listdir(model_dir)):
+        if filename.endswith("_model.joblib"):
+            safe_name = filename[:-len("_model.joblib")]
+            model_path, vectorizer_path = _artifact_paths(model_dir, safe_name)
+            if os.path.exists(vectorizer_path):
+                pairs.append((safe_name, joblib.load(model_path), joblib.load(vectorizer_path)))
+    if not pairs:
+        raise ValueError(f"No role artifacts found in '{model_dir}'.")
+
+    analyzer_params = None
+    all_terms = set()
+    for safe_name, model, vectorizer in pairs:
+        params = {key: vectorizer.get_params()[key] for key in
+                  ('lowercase', 'stop_words', 'ngram_range', 'token_pattern', 'analyzer', 'norm', 'sublinear_tf', 'use_idf')}
+        params['ngram_range'] = list(params['ngram_range'])
+        if params['norm'] != 'l2' or params['sublinear_tf'] or not params['use_idf']:
+            raise ValueError(f"Role '{safe_name}' uses TF-IDF settings the bundle scorer does not support.")
+        if analyzer_params is None:
+            analyzer_params = params
+        elif params != analyzer_params:
+            raise ValueError(f"Role '{safe_name}' was trained with different vectorizer settings; cannot share a vocabulary.")
+        if not _is_matching_pair(model, vectorizer):
+            raise ValueError(f"Model and vectorizer for '{safe_name}' are from different training runs (retraining in progress?)")
+        if list(model.classes_) != [0, 1] or model.coef_.shape[0] != 1:
+            raise ValueError(f"Role '{safe_name}' is not a binary 0/1 linear model.")
+        all_terms.update(vectorizer.vocabulary_)
+
+    terms_sorted = sorted(all_terms, key=lambda term: term.encode('utf-8'))
+    term_ids = {term: i for i, term in enumerate(terms_sorted)}
+    width = max(1, max(len(term.encode('utf-8')) for term in terms_sorted))
+
+    indptr = [0]
+    indices, idf, coef, extra_coef, intercept = [], [], [], [], []
+    for safe_name, model, vectorizer in pairs:
+        role_terms = sorted(vectorizer.vocabulary_.items(), key=lambda item: term_ids[item[0]])
+        columns = np.array([column for _, column in role_terms], dtype=np.int64)
+        indices.extend(term_ids[term] for term, _ in role_terms)
+        idf.append(vectorizer.idf_[columns])
+        coef.append(model.coef_[0, columns])
+        extra_coef.append(model.coef_[0, -2:])
+        intercept.append(model.intercept_[0])
+        indptr.append(indptr[-1] + len(role_terms))
+
+    arrays = {
+        'terms': np.array([term.encode('utf-8') for term in terms_sorted], dtype=f'S{width}'),
+        'indptr': np.array(indptr, dtype=np.int64),
+        'indices': np.array(indices, dtype=np.int32),
+        'idf': np.concatenate(idf).astype(np.float64),
+        'coef': np.concatenate(coef).astype(np.float64),
+        'extra_coef': np.array(extra_coef, dtype=np.float64),
+        'intercept': np.array(intercept, dtype=np.float64),
+    }
+    meta = {
+        'format': BUNDLE_FORMAT,
+        'roles': [safe_name for safe_name, _, _ in pairs],
+        'analyzer': analyzer_params,
+        'classes': [0, 1],
+    }
+
+    digest = hashlib.sha256(json.dumps(meta, sort_keys=True).encode('utf-8'))
+    for name in _ARRAYS:
+        digest.update(arrays[name].tobytes())
+    bundle_name = f"bundle-{digest.hexdigest()[:12]}"
+    bundle_path = os.path.join(model_dir, bundle_name)
+    if not os.path.isdir(bundle_path):
+        tmp_dir = tempfile.mkdtemp(dir=model_dir, prefix='.' + bundle_name + '.')
+        for name in _ARRAYS:
+            np.save(os.path.join(tmp_dir, f"{name}.npy"), arrays[name])
+        with open(os.path.join(tmp_dir, 'meta.json'), 'w') as f:
+            json.dump(meta, f, indent=2)
+        os.replace(tmp_dir, bundle_path)
+    _write_pointer(model_dir, bundle_name)
+
+    for entry in os.listdir(model_dir):
+        if entry.startswith('bundle-') and entry != bundle_name:
+            shutil.rmtree(os.path.join(model_dir, entry), ignore_errors=True)
+    print(f"Exported {len(pairs)} roles ({len(terms_sorted)} shared terms) to '{bundle_path}'.")
+    return bundle_path
+
+
+# --- 3. Memory-mapped Bundle ---
+class ModelBundle:
+    """All role models from one bundle directory, memory-mapped read-only."""
+
+    def __init__(self, bundle_path):
+        # scikit-learn is only needed once a bundle is opened, not to import this module
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        self.path = bundle_path
+        with open(os.path.join(bundle_path, 'meta.json'), 'r') as f:
+            self.meta = json.load(f)
+        for name in _ARRAYS:
+            setattr(self, name, np.load(os.path.join(bundle_path, f"{name}.npy"), mmap_mode='r'))
+        self.roles = self.meta['roles']
+        self._role_rows = {safe_name: row for row, safe_name in enumerate(self.roles)}
+        self._term_width = self.terms.dtype.itemsize
+        params = dict(self.meta['analyzer'])
+        params['ngram_range'] = tuple(params['ngram_range'])
+        self._analyzer = TfidfVectorizer(
+            lowercase=params['lowercase'], stop_words=params['stop_words'], ngram_range=params['ngram_range'],
+            token_pattern=params['token_pattern'], analyzer=params['analyzer']
+        ).build_analyzer()
+        self._fast_analyzer = build_word_analyzer(
+            params['lowercase'], params['stop_words'], params['ngram_range'], params['token_pattern']
+        )
+        # Built on first use by whichever request thread gets there first
+        self._lazy_lock = threading.Lock()
+        self._term_lookup = None  # term -> shared id, built on first single-resume score
+        self._scorers = {}
+        self._stacked = None  # every role's weights in one matrix, built on first ranking
+
+    def _lookup(self):
+        if self._term_lookup is None:
+            with self._lazy_lock:
+                if self._term_lookup is None:
+                    self._term_lookup = {term.decode('utf-8'): i for i, term in enumerate(self.terms.tolist())}
+        return self._term_lookup
+
+    def has_role(self, job_role):
+        return safe_role_name(job_role) in self._role_rows
+
+    def term_ids(self, cleaned_text):
+        """Shared-vocabulary ids of every n-gram in a cleaned document (repeats kept, unknown terms dropped)."""
+        grams = [gram.encode('utf-8') for gram in self._analyzer(cleaned_text)]
+        grams = [gram for gram in grams if len(gram) <= self._term_width]
+        if not grams:
+            return np.empty(0, dtype=np.int64)
+        grams = np.array(grams, dtype=self.terms.dtype)
+        positions = np.searchsorted(self.terms, grams)
+        positions[positions == len(self.terms)] = 0
+        return positions[self.terms[positions] == grams]
+
+    def count_matrix(self, cleaned_texts):
+        """(n_docs, n_terms) CSR matrix of raw term counts over the shared vocabulary."""
+        from scipy.sparse import csr_matrix
+        rows, cols = [], []
+        for row, text in enumerate(cleaned_texts):
+            ids = self.term_ids(text)
+            rows.append(np.full(len(ids), row, dtype=np.int64))
+            cols.append(ids)
+        rows = np.concatenate(rows) if rows else np.empty(0, dtype=np.int64)
+        cols = np.concatenate(cols) if cols else np.empty(0, dtype=np.int64)
+        counts = csr_matrix((np.ones(len(cols)), (rows, cols)), shape=(len(cleaned_texts), len(self.terms)))
+        counts.sum_duplicates()
+        return counts
+
+    def predict_proba(self, job_role, resume_texts):
+        """
+        Probability of Select (class 1) for each resume against one role,
+        matching the role's joblib vectorizer + LogisticRegression.
+        """
+        from scipy.special import expit
+        row = self._role_rows[safe_role_name(job_role)]
+        cleaned_texts, flags = extract_features_batch(resume_texts)
+        start, end = self.indptr[row], self.indptr[row + 1]
+        columns = np.asarray(self.indices[start:end])
+        tfidf = self.count_matrix(cleaned_texts)[:, columns].multiply(np.asarray(self.idf[start:end])).tocsr()
+        norms = np.sqrt(np.asarray(tfidf.multiply(tfidf).sum(axis=1)).ravel())
+        norms[norms == 0.0] = 1.0
+        decision = (tfidf @ np.asarray(self.coef[start:end])) / norms
+        decision += flags @ np.asarray(self.extra_coef[row]) + self.intercept[row]
+        return expit(decision)
+
+    def role_scorer(self, job_role):
+        """
+        RoleScorer for one role reading its IDF/coefficients straight from the
+        mapped arrays. N-grams are resolved through one term -> id dict shared
+        by every role, then to the role's own entries by binary search.
+        """
+        safe_name = safe_role_name(job_role)
+        scorer = self._scorers.get(safe_name)
+        if scorer is not None:
+            return scorer
+        lookup = self._lookup().get
+        with self._lazy_lock:
+            scorer = self._scorers.get(safe_name)
+            if scorer is None:
+                scorer = self._scorers[safe_name] = self._build_scorer(safe_name, lookup)
+        return scorer
+
+    def _build_scorer(self, safe_name, lookup):
+        row = self._role_rows[safe_name]
+        start, end = self.indptr[row], self.indptr[row + 1]
+        role_ids = np.asarray(self.indices[start:end])
+
+        def columns_of(grams):
+            ids = [term_id for term_id in map(lookup, grams) if term_id is not None]
+            if not ids:
+                return ids
+            ids = np.array(ids, dtype=role_ids.dtype)
+            positions = np.searchsorted(role_ids, ids)
+            positions[positions == len(role_ids)] = 0
+            return positions[role_ids[positions] == ids]
+
+        return RoleScorer(self._fast_analyzer, columns_of, self.idf[start:end], self.coef[start:end],
+                          self.extra_coef[row], self.intercept[row])
+
+
+    def _stacked_weights(self):
+        """
+        (2 * n_terms, 2 * n_roles) CSR matrix of every role's weights: rows
+        [0, n_terms) hold idf * coef in the role columns [0, n_roles), rows
+        [n_terms, 2 * n_terms) hold idf ** 2 in columns [n_roles, 2 * n_roles).
+        [counts, counts ** 2] @ it yields each role's unnormalized decision and
+        squared TF-IDF norm in one product.
+        """
+        if self._stacked is not None:
+            return self._stacked
+        with self._lazy_lock:
+            if self._stacked is not None:
+                return self._stacked
+            from scipy.sparse import csr_matrix
+            n_roles, n_terms = len(self.roles), len(self.terms)
+            role_of_entry = np.repeat(np.arange(n_roles), np.diff(self.indptr))
+            indices = np.asarray(self.indices, dtype=np.int64)
+            idf = np.asarray(self.idf)
+            self._stacked = csr_matrix(
+                (np.concatenate([idf * np.asarray(self.coef), idf * idf]),
+                 (np.concatenate([indices, indices + n_terms]), np.concatenate([role_of_entry, role_of_entry + n_roles]))),
+                shape=(2 * n_terms, 2 * n_roles)
+            )
+        return self._stacked
+
+    def predict_proba_all_roles(self, resume_texts):
+        """
+        (n_resumes, n_roles) probability of Select for every resume against
+        every role, columns in self.roles order. One sparse product covers all
+        roles; results agree with predict_proba to floating-point rounding.
+        """
+        from scipy.sparse import csr_matrix
+        from scipy.special import expit
+        n_roles, n_terms = len(self.roles), len(self.terms)
+        if not resume_texts:
+            return np.empty((0, n_roles))
+        cleaned_texts, flags = extract_features_batch(resume_texts)
+        lookup = self._lookup().get
+        # Each row is [counts, counts ** 2] over the shared vocabulary, built directly in CSR form
+        indptr, indices, data = [0], [], []
+        for text in cleaned_texts:
+            ids, counts = np.unique(
+                np.fromiter((term_id for term_id in map(lookup, self._fast_analyzer(text)) if term_id is not None), dtype=np.int64),
+                return_counts=True
+            )
+            counts = counts.astype(np.float64)
+            indices.extend((ids, ids + n_terms))
+            data.extend((counts, counts * counts))
+            indptr.append(indptr[-1] + 2 * len(ids))
+        rows = csr_matrix(
+            (np.concatenate(data), np.concatenate(indices), np.array(indptr)), shape=(len(cleaned_texts), 2 * n_terms)
+        )
+        products = (rows @ self._stacked_weights()).toarray()
+        norms = np.sqrt(products[:, n_roles:])
+        norms[norms == 0.0] = 1.0
+        decision = products[:, :n_roles] / norms
+        decision += flags @ np.asarray(self.extra_coef).T + np.asarray(self.intercept)
+        return expit(decision)
+
+
+class BundleLoader:
+    """
+    Opens the bundle named by model_dir/bundle.json and reopens it when the
+    pointer is replaced. Each get() costs one stat of the pointer; the swap
+    to a new bundle happens under a lock, so concurrent requests open it once.
+    """
+
+    def __init__(self, model_dir):
+        self.model_dir = model_dir
+        self._pointer_mtime = None
+        self._bundle = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        pointer = os.path.join(self.model_dir, BUNDLE_POINTER)
+        try:
+            mtime = os.stat(pointer).st_mtime_ns
+        except OSError:
+            mtime = None
+        if mtime == self._pointer_mtime:
+            return self._bundle
+        with self._lock:
+            if mtime != self._pointer_mtime:
+                self._bundle = self._open(pointer) if mtime is not None else None
+                self._pointer_mtime = mtime
+            return self._bundle
+
+    def _open(self, pointer):
+        try:
+            with open(pointer, 'r') as f:
+                bundle_name = json.load(f)['path']
+            with span("bundle_open"):
+                bundle = ModelBundle(os.path.join(self.model_dir, bundle_name))
+            print(f"Opened model bundle '{bundle_name}' ({len(bundle.roles)} roles).")
+            return bundle
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Error opening model bundle: {e}")
+            return None
+
+
+if __name__ == '__main__':
+    export_bundle(sys.argv[1] if len(sys.argv) > 1 else "saved_models")
@@ -0,0 +1,147 @@
+import os
+import re
+import threading
+import weakref
+from collections import OrderedDict
+
+from fast_scorer import RoleScorer
+from metrics import span
+
+# --- 1. Helpers ---
+def safe_role_name(job_role):
+    """Maps a human role name ('Software Engineer') to its artifact prefix ('software_engineer')."""
+    role_lower = job_role.lower()
+    return re.sub(r'[^a-z0-9_]+', '', role_lower.replace(' ', '_'))
+
+
+def _artifact_paths(model_dir, safe_name):
+    model_path = os.path.join(model_dir, f"{safe_name}_model.joblib")
+    vectorizer_path = os.path.join(model_dir, f"{safe_name}_vectorizer.joblib")
+    return model_path, vectorizer_path
+
+
+def _is_matching_pair(model, vectorizer):
+    """
+    main.py stamps both halves of a pair with the same training_id_ (pairs
+    saved before that have none), and a role's model expects one column per
+    vocabulary term plus the two engineered flags. Vocabularies capped at
+    max_features all have the same size, so the shape alone is not enough.
+    """
+    if getattr(model, 'training_id_', None) != getattr(vectorizer, 'training_id_', None):
+        return False
+    coef = getattr(model, 'coef_', None)
+    vocabulary = getattr(vectorizer, 'vocabulary_', None)
+    if coef is None or vocabulary is None:
+        return True
+    return coef.shape[1] == len(vocabulary) + 2
+
+
+# --- 2. Registry ---
+class ModelRegistry:
+    """
+    Keeps each role's (model, vectorizer) pair in memory after the first load.
+
+    Entries live in a bounded LRU keyed by the safe role name. Every lookup
+    stats the two artifact files; if either mtime changed since the entry was
+    loaded (e.g. main.py retrained the role) the pair is reloaded from disk.
+    """
+
+    def __init__(self, model_dir, max_entries=64):
+        self.model_dir = model_dir
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # safe_name -> (mtimes, model, vectorizer)
+        self._lock = threading.Lock()
+        self._scorers = weakref.WeakKeyDictionary()  # model -> RoleScorer compiled from it
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.reloads = 0
+        self.evictions = 0
+
+    def get(self, job_role):
+        """Returns (model, vectorizer) for a role, or None when no artifacts exist."""
+        safe_name = safe_role_name(job_role)
+        model_path, vectorizer_path = _artifact_paths(self.model_dir, safe_name)
+        try:
+            mtimes = (os.stat(model_path).st_mtime_ns, os.stat(vectorizer_path).st_mtime_ns)
+        except OSError:
+            with self._lock:
+                self._entries.pop(safe_name, None)
+                self.misses += 1
+            return None
+
+        with self._lock:
+            entry = self._entries.get(safe_name)
+            if entry is not None and entry[0] == mtimes:
+                self._entries.move_to_end(safe_name)
+                self.hits += 1
+                return entry[1], entry[2]
+            self.misses += 1
+            is_reload = entry is not None
+
+        # Load outside the lock so a slow unpickle does not block other roles.
+        import joblib
+        with span("model_load"):
+            model = joblib.load(model_path)
+            vectorizer = joblib.load(vectorizer_path)
+        if not _is_matching_pair(model, vectorizer):
+            # main.py replaces the vectorizer and then the model; we caught the gap
+            # between the two renames. Keep serving the previous pair if we have one.
+            print(f"ML artifacts for '{safe_name}' are mid-update; not caching this load.")
+            if entry is not None:
+                return entry[1], entry[2]
+            raise RuntimeError(f"Model and vectorizer for '{safe_name}' do not match (retraining in progress?)")
+
+        with self._lock:
+            self.loads += 1
+            if is_reload:
+                self.reloads += 1
+                print(f"Reloaded ML artifacts for '{safe_name}' (changed on disk).")
+            self._entries[safe_name] = (mtimes, model, vectorizer)
+            self._entries.move_to_end(safe_name)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return model, vectorizer
+
+    def get_scorer(self, job_role):
+        """Returns a RoleScorer compiled from the role's current model, or None when no artifacts exist."""
+        artifacts = self.get(job_role)
+        if artifacts is None:
+            return None
+        model, vectorizer = artifacts
+        scorer = self._scorers.get(model)
+        if scorer is None:
+            scorer = RoleScorer.from_sklearn(model, vectorizer)
+            with self._lock:
+                self._scorers[model] = scorer
+        return scorer
+
+    def preload(self):
+        """Loads every role found in model_dir. Returns the number of roles loaded."""
+        if not os.path.isdir(self.model_dir):
+            return 0
+        count = 0
+        for filename in sorted(os.listdir(self.model_dir)):
+            if filename.endswith("_model.joblib"):
+                if self.get(filename[:-len("_model.joblib")]) is not None:
+                    count += 1
+        return count
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "cached_roles": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "loads": self.loads,
+                "reloads": self.reloads,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            }
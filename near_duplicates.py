@@ -0,0 +1,228 @@
+import hashlib
+import os
+import threading
+import time
+import zlib
+
+import numpy as np
+
+# --- 1. Fingerprint ---
+NUM_HASHES = 64
+_SEEDS = np.random.default_rng(20240611).integers(0, 2**63, size=NUM_HASHES, dtype=np.uint64)
+_PAIR_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+
+
+def _mix(x):
+    """splitmix64 finalizer over a uint64 array (multiplication wraps, as intended)."""
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def minhash(cleaned_text):
+    """
+    MinHash signature (NUM_HASHES uint64 values) of a cleaned resume (see
+    features.clean_text_aggressively) over its set of words and adjacent word
+    pairs. The share of equal positions between two signatures estimates the
+    Jaccard similarity of those sets; reordering bullets or editing a few
+    words leaves most of them in place.
+    """
+    words = cleaned_text.split()
+    if not words:
+        return np.zeros(NUM_HASHES, dtype=np.uint64)
+    word_hashes = {}
+    for word in words:
+        if word not in word_hashes:
+            data = word.encode('utf-8')
+            word_hashes[word] = zlib.crc32(data) | (zlib.crc32(data, 0x9E3779B9) << 32)
+    positions = np.fromiter((word_hashes[word] for word in words), dtype=np.uint64, count=len(words))
+    pairs = _mix(positions[:-1] * _PAIR_MULTIPLIER + positions[1:])
+    shingles = np.unique(np.concatenate((np.fromiter(word_hashes.values(), dtype=np.uint64), pairs)))
+    return _mix(shingles[None, :] ^ _SEEDS[:, None]).min(axis=1)
+
+
+def scope_hash(job_role, job_description=None):
+    """64-bit id of (role, job description); only resumes in the same scope are compared."""
+    digest = hashlib.blake2b(digest_size=8)
+    for part in ((job_role or "").lower(), job_description or ""):
+        encoded = part.encode('utf-8')
+        digest.update(len(encoded).to_bytes(8, 'big'))
+        digest.update(encoded)
+    return int.from_bytes(digest.digest(), 'big')
+
+
+def estimated_similarity(signature_a, signature_b):
+    """Share of equal MinHash positions, an estimate of the Jaccard similarity."""
+    return float(np.count_nonzero(signature_a == signature_b)) / NUM_HASHES
+
+
+# --- 2. Index ---
+def _band_shape(min_similarity, target_recall=0.95):
+    """
+    (bands, rows) for LSH banding: the most rows per band (fewest unrelated
+    candidates) that still makes a pair at exactly `min_similarity` a
+    candidate with probability >= target_recall.
+    """
+    for rows in range(8, 1, -1):
+        bands = NUM_HASHES // rows
+        if 1.0 - (1.0 - min_similarity ** rows) ** bands >= target_recall:
+            return bands, rows
+    return NUM_HASHES, 1
+
+
+class NearDuplicateIndex:
+    """
+    The last `max_entries` resume signatures, searchable for one whose
+    estimated similarity is at least `min_similarity` in the same scope.
+
+    LSH banding: the signature is cut into bands and each band is hashed
+    (with the scope) into its own bucket table, so only resumes sharing a
+    whole band are compared. Buckets chain entries through a `next` array.
+    The per-entry arrays start at `initial_capacity` slots and double as
+    entries arrive, up to max_entries; once full, the oldest entry is
+    overwritten. Only the bucket heads are sized by max_entries up front
+    (2.5 MiB at the default 50000). Signatures are kept as their
+    low 16 bits for the comparison, with the sha256 digest of the resume so
+    the caller can find the earlier result.
+    """
+
+    _LINK_MASK = 0x7FFFFFFF  # chains store entry numbers in int32
+
+    def __init__(self, max_entries=50000, min_similarity=0.8, max_chain=64, initial_capacity=1024):
+        self.max_entries = max_entries
+        self.min_similarity = min_similarity
+        self.max_chain = max_chain
+        self.bands, self.rows = _band_shape(min_similarity)
+        self._min_equal = int(np.ceil(min_similarity * NUM_HASHES - 1e-9))
+        self._table_bits = max(10, max_entries.bit_length())
+
+        # Entry n (counting every add) lives in slot n % max_entries
+        capacity = min(max_entries, initial_capacity)
+        self._signatures = np.zeros((capacity, NUM_HASHES), dtype=np.uint16)
+        self._scopes = np.zeros(capacity, dtype=np.uint64)
+        self._digests = np.zeros((capacity, 32), dtype=np.uint8)
+        self._seqs = np.full(capacity, -1, dtype=np.int64)
+        self._heads = np.full((self.bands, 1 << self._table_bits), -1, dtype=np.int32)
+        self._next = np.full((self.bands, capacity), -1, dtype=np.int32)
+        self._count = 0
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.matches = 0
+        self.candidates = 0
+        self.lookup_seconds = 0.0
+
+    def _buckets(self, signature, scope):
+        keys = np.full(self.bands, scope, dtype=np.uint64)
+        banded = signature[:self.bands * self.rows].reshape(self.bands, self.rows)
+        for row in range(self.rows):
+            keys = _mix(keys ^ banded[:, row])
+        return (keys >> np.uint64(64 - self._table_bits)).tolist()
+
+    def query(self, signature, scope):
+        """(resume digest, estimated similarity) of the most similar stored entry in scope, or None."""
+        started = time.perf_counter()
+        short = signature.astype(np.uint16)
+        buckets = self._buckets(signature, scope)
+        with self._lock:
+            candidates = set()
+            for band, bucket in enumerate(buckets):
+                link = int(self._heads[band, bucket])
+                for _ in range(self.max_chain):
+                    if link < 0:
+                        break
+                    slot = link % self.max_entries
+                    if (int(self._seqs[slot]) & self._LINK_MASK) != link:
+                        break  # overwritten; the rest of the chain is older still
+                    if int(self._scopes[slot]) == scope:
+                        candidates.add(slot)
+                    link = int(self._next[band, slot])
+            result = None
+            if candidates:
+                slots = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+                equal = np.count_nonzero(self._signatures[slots] == short, axis=1)
+                top = int(np.argmax(equal))
+                if equal[top] >= self._min_equal:
+                    result = (self._digests[slots[top]].tobytes().hex(), int(equal[top]) / NUM_HASHES)
+                    self.matches += 1
+            self.lookups += 1
+            self.candidates += len(candidates)
+            self.lookup_seconds += time.perf_counter() - started
+        return result
+
+    def _grow(self):
+        """Doubles the per-entry arrays (up to max_entries); slots stay where they are."""
+        capacity = len(self._seqs)
+        grown = min(self.max_entries, 2 * capacity)
+
+        def extend(array, fill, axis=0):
+            shape = list(array.shape)
+            shape[axis] = grown - capacity
+            return np.concatenate((array, np.full(shape, fill, dtype=array.dtype)), axis=axis)
+
+        self._signatures = extend(self._signatures, 0)
+        self._scopes = extend(self._scopes, 0)
+        self._digests = extend(self._digests, 0)
+        self._seqs = extend(self._seqs, -1)
+        self._next = extend(self._next, -1, axis=1)
+
+    def add(self, signature, scope, resume_digest):
+        buckets = self._buckets(signature, scope)
+        with self._lock:
+            seq = self._count
+            slot = seq % self.max_entries
+            if slot >= len(self._seqs):
+                self._grow()
+            self._signatures[slot] = signature.astype(np.uint16)
+            self._scopes[slot] = scope
+            self._digests[slot] = np.frombuffer(bytes.fromhex(resume_digest), dtype=np.uint8)
+            self._seqs[slot] = seq
+            for band, bucket in enumerate(buckets):
+                self._next[band, slot] = self._heads[band, bucket]
+                self._heads[band, bucket] = seq & self._LINK_MASK
+            self._count += 1
+
+    def stats(self):
+        with self._lock:
+            arrays = (self._signatures, self._scopes, self._digests, self._seqs, self._heads, self._next)
+            return {
+                "entries": min(self._count, self.max_entries),
+                "max_entries": self.max_entries,
+                "capacity": len(self._seqs),
+                "min_similarity": self.min_similarity,
+                "bands": self.bands,
+                "rows_per_band": self.rows,
+                "lookups": self.lookups,
+                "matches": self.matches,
+                "avg_candidates": (self.candidates / self.lookups) if self.lookups else 0.0,
+                "avg_lookup_us": (self.lookup_seconds / self.lookups * 1e6) if self.lookups else 0.0,
+                "memory_bytes": sum(array.nbytes for array in arrays),
+            }
+
+
+# --- 3. Configuration ---
+NEAR_DUP_MODES = ("flag", "reuse", "off")
+
+def near_duplicate_mode_from_env():
+    """
+    NEAR_DUP_MODE: 'flag' (default) only reports the match. 'reuse' (opt-in)
+    answers from the earlier resume's Gemini results, i.e. gives this
+    candidate another candidate's assessment; only for known resubmissions.
+    """
+    mode = os.environ.get("NEAR_DUP_MODE", "flag").lower()
+    if mode not in NEAR_DUP_MODES:
+        print(f"Unknown NEAR_DUP_MODE '{mode}'; using 'flag'.")
+        mode = "flag"
+    return mode
+
+def near_duplicate_index_from_env():
+    """
+    Builds the process-wide index from NEAR_DUP_* environment variables, or
+    returns None when NEAR_DUP_MODE is 'off'. NEAR_DUP_SIMILARITY is the
+    minimum estimated Jaccard similarity of the resumes' word and word-pair sets.
+    """
+    if near_duplicate_mode_from_env() == "off":
+        return None
+    return NearDuplicateIndex(
+        max_entries=int(os.environ.get("NEAR_DUP_MAX_ENTRIES", "50000")),
+        min_similarity=float(os.environ.get("NEAR_DUP_SIMILARITY", "0.8")),
+    )
@@ -0,0 +1,474 @@
+import argparse
+import copy
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from features import extract_features_batch
+from metrics import span
+from model_registry import safe_role_name
+
+try:
+    import fcntl
+except ImportError:  # no flock (Windows): every process trains its own models
+    fcntl = None
+
+# --- 1. Features and Model ---
+# Hashed word and word-pair counts: no vocabulary is fitted or kept in memory, so
+# a role model can take new examples without refitting its features.
+HASHING_PARAMS = dict(n_features=2**18, ngram_range=(1, 2), stop_words='english', alternate_sign=False, norm='l2')
+SGD_PARAMS = dict(loss='log_loss', alpha=1e-4, random_state=42)
+CLASSES = np.array([0, 1])
+# Each update replays this many earlier examples per new one, drawn from the
+# role's last `replay_window` examples; it smooths single-batch noise while
+# still letting the model follow recent decisions.
+REPLAY_RATIO = 3
+
+_vectorizer = None
+
+def hashing_features(resume_texts, name_words_list=None):
+    """Hashed TF rows plus the two engineered flags, one CSR row per resume."""
+    global _vectorizer
+    from scipy.sparse import hstack
+    if _vectorizer is None:
+        from sklearn.feature_extraction.text import HashingVectorizer
+        _vectorizer = HashingVectorizer(**HASHING_PARAMS)
+    cleaned_resumes, engineered_features = extract_features_batch(resume_texts, name_words_list)
+    return hstack([_vectorizer.transform(cleaned_resumes), engineered_features], format='csr')
+
+def new_model():
+    from sklearn.linear_model import SGDClassifier
+    return SGDClassifier(**SGD_PARAMS)
+
+def balanced_weights(labels, class_counts):
+    """Per-example weights like class_weight='balanced', from the role's running class counts."""
+    total = class_counts[0] + class_counts[1]
+    return np.array([total / (2.0 * max(class_counts[label], 1)) for label in labels])
+
+
+class RoleModel:
+    """One role's SGD classifier plus what its updates and checkpoints need."""
+
+    def __init__(self, role, replay_window=500):
+        self.role = role
+        self.model = None
+        self.class_counts = [0, 0]
+        self.examples = 0
+        self.applied_through = 0  # id of the last feedback row learned from
+        self.window = deque(maxlen=replay_window)  # (csr row, label), newest last
+        self.evaluated = 0  # feedback predicted before it was learned from (progressive validation)
+        self.correct = 0
+
+    def select_probabilities(self, features):
+        model = self.model  # read once; updates swap in a new object
+        return model.predict_proba(features)[:, list(model.classes_).index(1)]
+
+    def learn(self, features, labels, rng):
+        """One micro-batch: the new rows plus replayed ones, fitted on a copy that is then swapped in."""
+        from scipy.sparse import vstack
+        replay = rng.sample(list(self.window), min(len(self.window), REPLAY_RATIO * len(labels)))
+        batch = vstack([features] + [row for row, _ in replay], format='csr') if replay else features
+        batch_labels = list(labels) + [label for _, label in replay]
+        for label in labels:
+            self.class_counts[label] += 1
+        model = copy.deepcopy(self.model) if self.model is not None else new_model()
+        model.partial_fit(batch, batch_labels, classes=CLASSES,
+                          sample_weight=balanced_weights(batch_labels, self.class_counts))
+        self.model = model
+        self.window.extend((features[i], label) for i, label in enumerate(labels))
+        self.examples += len(labels)
+
+    def to_checkpoint(self):
+        from scipy.sparse import vstack
+        rows = [row for row, _ in self.window]
+        return {
+            'role': self.role, 'model': self.model, 'class_counts': self.class_counts, 'examples': self.examples,
+            'applied_through': self.applied_through, 'evaluated': self.evaluated, 'correct': self.correct,
+            'window_features': vstack(rows, format='csr') if rows else None,
+            'window_labels': [label for _, label in self.window],
+        }
+
+    @classmethod
+    def from_checkpoint(cls, data, replay_window=500):
+        role_model = cls(data['role'], replay_window)
+        for field in ('model', 'class_counts', 'examples', 'applied_through', 'evaluated', 'correct'):
+            setattr(role_model, field, data[field])
+        if data['window_features'] is not None:
+            features = data['window_features']
+            role_model.window.extend((features[i], label) for i, label in enumerate(data['window_labels']))
+        return role_model
+
+
+def bootstrap_role(role, resume_texts, labels, name_words_list=None, epochs=10, batch_size=64, replay_window=500, seed=42):
+    """
+    A RoleModel trained on a labeled dataset: shuffled passes of mini-batches,
+    ending on the average of the last pass's weights, which is steadier on a
+    few hundred rows than the final step alone.
+    """
+    features = hashing_features(resume_texts, name_words_list)
+    labels = np.asarray(labels, dtype=int)
+    role_model = RoleModel(role, replay_window)
+    role_model.class_counts = [int(np.sum(labels == 0)), int(np.sum(labels == 1))]
+    model = role_model.model = new_model()
+    order = np.arange(len(labels))
+    rng = np.random.default_rng(seed)
+    for epoch in range(epochs):
+        rng.shuffle(order)
+        coef_sum, intercept_sum, steps = 0.0, 0.0, 0
+        for start in range(0, len(order), batch_size):
+            rows = order[start:start + batch_size]
+            model.partial_fit(features[rows], labels[rows], classes=CLASSES,
+                              sample_weight=balanced_weights(labels[rows], role_model.class_counts))
+            if epoch == epochs - 1:
+                coef_sum, intercept_sum, steps = coef_sum + model.coef_, intercept_sum + model.intercept_, steps + 1
+    model.coef_, model.intercept_ = coef_sum / steps, intercept_sum / steps
+    role_model.examples = len(labels)
+    role_model.window.extend((features[i], int(labels[i])) for i in order[-replay_window:])
+    return role_model
+
+
+# --- 2. Checkpoints ---
+STATE_FILE = 'online_state.json'
+LOCK_FILE = 'online.lock'
+
+def checkpoint_path(checkpoint_dir, role):
+    return os.path.join(checkpoint_dir, f"{safe_role_name(role)}_online.joblib")
+
+def _atomic_write(path, write):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', prefix='.' + os.path.basename(path) + '.', suffix='.tmp')
+    os.close(fd)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path): os.remove(tmp_path)
+        raise
+
+def _write_json(path, data):
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+
+def save_role(checkpoint_dir, role_model):
+    import joblib
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    _atomic_write(checkpoint_path(checkpoint_dir, role_model.role),
+                  lambda path: joblib.dump(role_model.to_checkpoint(), path))
+
+
+# --- 3. Learner ---
+class OnlineLearner:
+    """
+    Per-role online models kept up to date from recruiter feedback.
+
+    Feedback rows are read from `source(after_id, limit)` (the user store's
+    feedback table) by a background thread, never on the request path, and
+    learned from in micro-batches of up to `batch_size` rows per role. Every
+    `checkpoint_seconds` the roles that changed are written to checkpoint_dir
+    (one joblib per role, then online_state.json with the feedback cursor).
+
+    With several processes sharing checkpoint_dir, only the one holding the
+    online.lock file lock trains; the others reload role checkpoints when
+    their mtime changes and take over the lock if the trainer exits.
+    """
+
+    def __init__(self, checkpoint_dir, batch_size=64, checkpoint_seconds=30.0, poll_seconds=1.0,
+                 min_examples=50, replay_window=500):
+        self.checkpoint_dir = checkpoint_dir
+        self.batch_size = batch_size
+        self.checkpoint_seconds = checkpoint_seconds
+        self.poll_seconds = poll_seconds
+        self.min_examples = min_examples
+        self.replay_window = replay_window
+        self._roles = {}  # safe role name -> RoleModel
+        self._mtimes = {}  # safe role name -> checkpoint mtime_ns it was loaded from
+        self._dirty = set()
+        self._cursor = 0  # feedback rows up to this id have been learned from
+        self._rng = random.Random(42)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._thread_pid = None
+        self._stopping = threading.Event()
+        self._lock_file = None
+        self.is_trainer = False
+        self.loaded = False
+        self.batches = 0
+        self.examples_applied = 0
+        self.checkpoints = 0
+        self.last_checkpoint = time.monotonic()
+        self.update_seconds = 0.0
+
+    # --- Scoring ---
+    def role_model(self, job_role):
+        """The role's model once it has learned from at least min_examples examples, else None."""
+        role_model = self._roles.get(safe_role_name(job_role))
+        if role_model is None or role_model.model is None or role_model.examples < self.min_examples:
+            return None
+        return role_model
+
+    def select_probability(self, job_role, resume_text):
+        """P(Select) from the online model, or None when the role has none ready."""
+        probabilities = self.select_probabilities(job_role, [resume_text])
+        return None if probabilities is None else float(probabilities[0])
+
+    def select_probabilities(self, job_role, resume_texts):
+        role_model = self.role_model(job_role)
+        if role_model is None:
+            return None
+        with span("online_ml"):
+            return role_model.select_probabilities(hashing_features(resume_texts))
+
+    def add_role(self, role_model):
+        """Serves (and later checkpoints) a RoleModel built elsewhere, e.g. by bootstrap_role."""
+        safe_name = safe_role_name(role_model.role)
+        with self._lock:
+            self._roles[safe_name] = role_model
+            self._dirty.add(safe_name)
+
+    # --- Training ---
+    def apply(self, rows):
+        """
+        Learns from feedback rows ({'id', 'job_role', 'resume_text', 'decision'}),
+        grouped into one update per role. Each row is first predicted by the
+        current model, for the progressive-validation accuracy in stats().
+        """
+        by_role = {}
+        for row in rows:
+            by_role.setdefault(safe_role_name(row['job_role']), []).append(row)
+        started = time.perf_counter()
+        for safe_name, role_rows in by_role.items():
+            role_model = self._roles.get(safe_name) or RoleModel(role_rows[0]['job_role'], self.replay_window)
+            role_rows = [row for row in role_rows if row['id'] > role_model.applied_through]
+            if not role_rows:
+                continue
+            try:
+                features = hashing_features([row['resume_text'] for row in role_rows])
+                labels = [int(row['decision']) for row in role_rows]
+                if role_model.model is not None:
+                    predicted = (role_model.select_probabilities(features) > 0.5).astype(int)
+                    role_model.evaluated += len(labels)
+                    role_model.correct += int(np.sum(predicted == np.array(labels)))
+                role_model.learn(features, labels, self._rng)
+            except Exception as e:
+                # Skipped rather than retried, so one bad row cannot stall every later update
+                print(f"Online update for role '{role_model.role}' failed; skipping {len(role_rows)} row(s): {e}")
+            role_model.applied_through = role_rows[-1]['id']
+            with self._lock:
+                self._roles[safe_name] = role_model
+                self._dirty.add(safe_name)
+        with self._lock:
+            self._cursor = max([self._cursor] + [row['id'] for row in rows])
+            self.batches += 1
+            self.examples_applied += len(rows)
+            self.update_seconds += time.perf_counter() - started
+
+    def step(self, source):
+        """One trainer round: learn from new feedback, checkpoint when due. Returns the rows applied."""
+        rows = source(self._cursor, self.batch_size)
+        if rows:
+            self.apply(rows)
+        if self._dirty and (time.monotonic() - self.last_checkpoint >= self.checkpoint_seconds):
+            self.checkpoint()
+        return len(rows)
+
+    def checkpoint(self):
+        """Writes every role changed since the last checkpoint, then the feedback cursor."""
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            roles = {safe_name: self._roles[safe_name] for safe_name in dirty}
+            state = {'applied_through': self._cursor, 'saved_at': time.time(),
+                     'roles': {safe_name: role_model.examples for safe_name, role_model in self._roles.items()}}
+        with span("online_checkpoint"):
+            for safe_name, role_model in roles.items():
+                save_role(self.checkpoint_dir, role_model)
+                self._mtimes[safe_name] = os.stat(checkpoint_path(self.checkpoint_dir, role_model.role)).st_mtime_ns
+            _atomic_write(os.path.join(self.checkpoint_dir, STATE_FILE), lambda path: _write_json(path, state))
+        self.checkpoints += 1
+        self.last_checkpoint = time.monotonic()
+
+    def load(self):
+        """(Re)loads role checkpoints whose files changed since they were last read, and the cursor."""
+        import joblib
+        if not os.path.isdir(self.checkpoint_dir):
+            self.loaded = True
+            return 0
+        reloaded = 0
+        for filename in sorted(os.listdir(self.checkpoint_dir)):
+            if not filename.endswith("_online.joblib"):
+                continue
+            safe_name = filename[:-len("_online.joblib")]
+            path = os.path.join(self.checkpoint_dir, filename)
+            try:
+                mtime = os.stat(path).st_mtime_ns
+                if self._mtimes.get(safe_name) == mtime:
+                    continue
+                role_model = RoleModel.from_checkpoint(joblib.load(path), self.replay_window)
+            except (OSError, EOFError, KeyError, ValueError) as e:
+                print(f"Could not load online model '{filename}': {e}")
+                continue
+            with self._lock:
+                self._roles[safe_name] = role_model
+            self._mtimes[safe_name] = mtime
+            reloaded += 1
+        try:
+            with open(os.path.join(self.checkpoint_dir, STATE_FILE)) as f:
+                cursor = json.load(f).get('applied_through', 0)
+        except (OSError, json.JSONDecodeError):
+            cursor = 0
+        with self._lock:
+            self._cursor = max(self._cursor, cursor)
+        self.loaded = True
+        return reloaded
+
+    # --- Background Thread ---
+    def _try_become_trainer(self):
+        if fcntl is None:
+            return True
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+        lock_file = open(os.path.join(self.checkpoint_dir, LOCK_FILE), 'a+')
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        return True
+
+    def start(self, source):
+        """Starts the background thread (once per process) reading feedback from `source`."""
+        if self._thread is not None and self._thread_pid == os.getpid():
+            return
+        self._thread_pid = os.getpid()
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, args=(source,), name="online-learner", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._thread = None
+        if self.is_trainer and self._dirty:
+            self.checkpoint()
+
+    def _run(self, source):
+        try:
+            count = self.load()
+            if count:
+                print(f"Loaded {count} online role model(s) from '{self.checkpoint_dir}'.")
+        except Exception as e:
+            print(f"Online learner failed to load checkpoints: {e}")
+        while not self._stopping.is_set():
+            try:
+                if not self.is_trainer:
+                    self.is_trainer = self._try_become_trainer()
+                    if self.is_trainer:
+                        self.load()  # pick up whatever the previous trainer wrote last
+                if self.is_trainer:
+                    if self.step(source):
+                        continue  # more feedback may be waiting
+                else:
+                    self.load()
+            except Exception as e:
+                print(f"Online learner error: {e}")
+            self._stopping.wait(self.poll_seconds)
+
+    def stats(self):
+        with self._lock:
+            roles = {
+                role_model.role: {
+                    'examples': role_model.examples,
+                    'serving': role_model.examples >= self.min_examples,
+                    'feedback_evaluated': role_model.evaluated,
+                    'progressive_accuracy': (role_model.correct / role_model.evaluated) if role_model.evaluated else None,
+                }
+                for role_model in self._roles.values()
+            }
+            return {
+                'checkpoint_dir': self.checkpoint_dir,
+                'trainer': self.is_trainer,
+                'loaded': self.loaded,
+                'feedback_cursor': self._cursor,
+                'batches': self.batches,
+                'examples_applied': self.examples_applied,
+                'avg_batch_ms': (self.update_seconds / self.batches * 1e3) if self.batches else 0.0,
+                'checkpoints': self.checkpoints,
+                'pending_checkpoint_roles': len(self._dirty),
+                'roles': roles,
+            }
+
+
+# --- 4. Configuration ---
+ONLINE_MODES = ("off", "shadow", "serve")
+
+def online_mode_from_env():
+    """
+    ONLINE_LEARNING: 'off' (default) only stores feedback; 'shadow' trains the
+    online models and reports their prediction next to the batch model's;
+    'serve' scores with a role's online model once it has ONLINE_MIN_EXAMPLES.
+    """
+    mode = os.environ.get("ONLINE_LEARNING", "off").lower()
+    if mode not in ONLINE_MODES:
+        print(f"Unknown ONLINE_LEARNING '{mode}'; using 'off'.")
+        mode = "off"
+    return mode
+
+def online_learner_from_env(model_dir):
+    """Builds the process-wide learner from ONLINE_* environment variables, or None when ONLINE_LEARNING is 'off'."""
+    if online_mode_from_env() == "off":
+        return None
+    return OnlineLearner(
+        os.environ.get("ONLINE_MODEL_DIR", os.path.join(model_dir, "online")),
+        batch_size=int(os.environ.get("ONLINE_BATCH_SIZE", "64")),
+        checkpoint_seconds=float(os.environ.get("ONLINE_CHECKPOINT_SECONDS", "30")),
+        min_examples=int(os.environ.get("ONLINE_MIN_EXAMPLES", "50")),
+        replay_window=int(os.environ.get("ONLINE_REPLAY_WINDOW", "500")),
+    )
+
+
+# --- 5. Bootstrap from the Training CSV ---
+def bootstrap(csv_file, checkpoint_dir, epochs=10):
+    """
+    Seeds checkpoint_dir with one online model per role from the training CSV,
+    using main.py's role filter and train/test split, and reports each
+    role's holdout accuracy.
+    """
+    import pandas as pd
+    from sklearn.model_selection import train_test_split
+    from main import MIN_APPLICANTS, SPLIT_PARAMS, load_dataset
+
+    df = load_dataset(csv_file)
+    if df is None:
+        return []
+    results = []
+    # Same role key as main.py, so 'Data Scientist' and 'data scientist' rows train one model
+    for role, df_subset in df.groupby('role_lower', sort=False):
+        if len(df_subset) < MIN_APPLICANTS or df_subset['decision'].nunique() < 2:
+            continue
+        name_words = [set(str(x).lower().split()) if pd.notna(x) else set() for x in df_subset['Name']]
+        train_idx, test_idx = train_test_split(np.arange(len(df_subset)), **SPLIT_PARAMS)
+        texts, labels = df_subset['Resume'].tolist(), df_subset['decision'].to_numpy()
+        role_model = bootstrap_role(role, [texts[i] for i in train_idx], labels[train_idx],
+                                    [name_words[i] for i in train_idx], epochs=epochs)
+        features = hashing_features([texts[i] for i in test_idx], [name_words[i] for i in test_idx])
+        accuracy = float(np.mean((role_model.select_probabilities(features) > 0.5).astype(int) == labels[test_idx]))
+        save_role(checkpoint_dir, role_model)
+        print(f"{role}: {len(train_idx)} training rows, holdout accuracy {accuracy * 100:.2f}%")
+        results.append({'Role': role, 'Accuracy': accuracy, 'Train_Rows': len(train_idx)})
+    print(f"Wrote {len(results)} online role model(s) to '{checkpoint_dir}'.")
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Seed the online role models from the training CSV.")
+    parser.add_argument('--csv', default='Dataset/dataset.csv', help="Training CSV (default: %(default)s)")
+    parser.add_argument('--model-dir', default=os.environ.get("ONLINE_MODEL_DIR", os.path.join("saved_models", "online")),
+                        help="Checkpoint directory (default: %(default)s)")
+    parser.add_argument('--epochs', type=int, default=10, help="Passes over each role's rows (default: %(default)s)")
+    args = parser.parse_args()
+    bootstrap(args.csv, args.model_dir, args.epochs)
@@ -1,62 +1,440 @@
+import functools
 import os
 import re
-import joblib
 import numpy as np
 import random
-# Import your GenAI client (Gemini in this case)
-from google import genai
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.linear_model import LogisticRegression
-from scipy.sparse import hstack
+import json
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from contextlib import contextmanager
+# google.genai, scikit-learn and scipy are imported on first use (or by warm_up()) to keep app startup fast
+from model_registry import ModelRegistry, safe_role_name
+from model_bundle import BundleLoader
+from genai_cache import cache_from_env, make_cache_key, text_digest
+from gemini_client import DeadlineExceeded, call_deadline, http_timeout_from_env, resilient_client_from_env
+from metrics import CLASSIFICATIONS, GENAI_BUSY, GENAI_CACHE_LOOKUPS, GENAI_CALL_SECONDS, GENAI_ERRORS, NEAR_DUPLICATES, PROMPT_TOKENS, span
+from near_duplicates import minhash, near_duplicate_index_from_env, near_duplicate_mode_from_env, scope_hash
+from prompt_compaction import compactor_from_env
+from online_learning import online_learner_from_env, online_mode_from_env
+from features import (
+    CUSTOM_STOP_WORDS, clean_text_aggressively, extract_features_batch,
+    has_honors_or_certs, has_portfolio_link
+)
 
 # --- 1. Initialize Clients ---
 MODEL_DIR = "saved_models"
+GENAI_MODEL = "gemini-2.5-flash-lite"
 
-# Initialize Google Gemini client (using API_KEY environment variable)
-try:
-    api_key = os.environ.get("API_KEY")
-    if not api_key:
-        print("Error: API_KEY environment variable not found.")
-        client = None
-    else:
-        
-        client = genai.Client(api_key=api_key)
+# Role models are loaded once and kept in memory; set MODEL_CACHE_SIZE to bound the LRU.
+model_registry = ModelRegistry(MODEL_DIR, max_entries=int(os.environ.get("MODEL_CACHE_SIZE", "64")))
+# When main.py has exported a memory-mapped bundle (saved_models/bundle.json), roles are scored from it instead.
+model_bundle = BundleLoader(MODEL_DIR)
+
+# The three Gemini calls per classification run concurrently on this pool.
+# GENAI_CALL_TIMEOUT is the per-call deadline (seconds) before a placeholder is used.
+GENAI_CALL_TIMEOUT = float(os.environ.get("GENAI_CALL_TIMEOUT", "20"))
+GENAI_MAX_WORKERS = int(os.environ.get("GENAI_MAX_WORKERS", "12"))
+genai_executor = ThreadPoolExecutor(
+    max_workers=GENAI_MAX_WORKERS,
+    thread_name_prefix="genai"
+)
+# Every call carries its caller's deadline into the Gemini client (see
+# gemini_client.call_deadline): work still queued when the caller gave up is
+# skipped, and retries, waits and each HTTP request end at the deadline. As a
+# backstop, at most GENAI_MAX_IN_FLIGHT calls may be queued or running; past
+# that, classifications answer ML-only.
+GENAI_MAX_IN_FLIGHT = int(os.environ.get("GENAI_MAX_IN_FLIGHT", str(GENAI_MAX_WORKERS * 2)))
+_genai_in_flight = 0
+_genai_in_flight_lock = threading.Lock()
+
+
+class GenAIBusyError(Exception):
+    """The future's exception when submit_genai refused a call (GENAI_MAX_IN_FLIGHT reached)."""
+
+
+def _release_genai_slot(future):
+    global _genai_in_flight
+    with _genai_in_flight_lock:
+        _genai_in_flight -= 1
+
+def genai_in_flight():
+    """Gemini calls currently queued or running on genai_executor."""
+    with _genai_in_flight_lock:
+        return _genai_in_flight
+
+def _run_by_deadline(deadline, function, *args):
+    if time.monotonic() >= deadline:
+        raise DeadlineExceeded("the caller's deadline passed while the Gen AI call was queued")
+    with call_deadline(deadline):
+        return function(*args)
+
+def submit_genai(function, *args, deadline=None):
+    """
+    genai_executor.submit, or an already-failed future (GenAIBusyError) when
+    GENAI_MAX_IN_FLIGHT calls are pending. The call gives up at `deadline`
+    (time.monotonic(); default GENAI_CALL_TIMEOUT from now).
+    """
+    global _genai_in_flight
+    if deadline is None:
+        deadline = time.monotonic() + GENAI_CALL_TIMEOUT
+    with _genai_in_flight_lock:
+        busy = _genai_in_flight >= GENAI_MAX_IN_FLIGHT
+        if not busy:
+            _genai_in_flight += 1
+    if busy:
+        GENAI_BUSY.inc()
+        future = Future()
+        future.set_exception(GenAIBusyError(f"{GENAI_MAX_IN_FLIGHT} Gemini calls already in flight"))
+        return future
+    try:
+        future = genai_executor.submit(_run_by_deadline, deadline, function, *args)
+    except BaseException:
+        _release_genai_slot(None)
+        raise
+    # Runs when the call finishes, or at once if cancel() removed it from the queue
+    future.add_done_callback(_release_genai_slot)
+    return future
+
+# Gemini replies are cached by a hash of (prompt kind, model, role, resume, JD).
+genai_cache = cache_from_env()
 
+# Lightly edited resubmissions are matched to an earlier resume (see near_duplicates.py);
+# the index is allocated on first use, see get_near_duplicate_index(). It is per process,
+# so under serve.py each worker only matches resumes it has seen itself.
+NEAR_DUP_MODE = near_duplicate_mode_from_env()
+_INDEX_UNSET = object()
+near_duplicate_index = _INDEX_UNSET
+_near_duplicate_lock = threading.Lock()
+
+# With PROMPT_COMPACTION=on, resume and JD text over a token budget is trimmed before it goes into a prompt
+# (see prompt_compaction.py).
+prompt_compactor = compactor_from_env()
+
+# Recruiter Select/Reject feedback keeps a per-role online model up to date (see online_learning.py).
+# ONLINE_LEARNING='serve' scores with it once a role has enough examples; 'shadow' only reports it.
+ONLINE_LEARNING = online_mode_from_env()
+online_learner = online_learner_from_env(MODEL_DIR)
+
+# The Google Gemini client (using API_KEY environment variable) is created on first use; see get_client().
+_CLIENT_UNSET = object()
+client = _CLIENT_UNSET
+_client_lock = threading.Lock()
+
+def _create_client():
+    try:
+        api_key = os.environ.get("API_KEY")
+        if not api_key:
+            print("Error: API_KEY environment variable not found.")
+            return None
+        from google import genai
+        from google.genai import types
+
+        # A client-side HTTP timeout, so a hung request fails (and is retried) instead of waiting forever;
+        # rate limit, retries and a circuit breaker around every call (see gemini_client.py)
+        http_options = types.HttpOptions(timeout=int(http_timeout_from_env() * 1000))
+        resilient_client = resilient_client_from_env(genai.Client(api_key=api_key, http_options=http_options))
         print("Google Gemini client initialized.")
-except Exception as e:
-    print(f"Error initializing Google Gemini client: {e}")
-    gemini_model = None
+        return resilient_client
+    except Exception as e:
+        print(f"Error initializing Google Gemini client: {e}")
+        return None
+
+def get_client():
+    """The Gemini client, created on the first call; None when it is not configured or failed to start."""
+    global client
+    if client is _CLIENT_UNSET:
+        with _client_lock:
+            if client is _CLIENT_UNSET:
+                client = _create_client()
+    return client
+
+def after_fork():
+    """
+    Per-process reset for a worker forked from a process that already ran
+    warm_up: the Gemini client (its HTTP connections, rate limiter and circuit
+    breaker) is created again on first use. Models, the bundle and the
+    near-duplicate index are kept; the fork shares their pages copy-on-write.
+    """
+    global client
+    client = _CLIENT_UNSET
 
 # --- 2. Define Constants and Helpers ---
-CUSTOM_STOP_WORDS = set([
-    'resume', 'profile', 'summary', 'objective', 'experience', 'education', 'skills',
-    'projects', 'references', 'company', 'organization', 'location', 'city', 'state',
-    'jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec',
-    'january', 'february', 'march', 'april', 'june', 'july', 'august', 'september',
-    'october', 'november', 'december', 'present', 'current', 'llc', 'inc', 'corp',
-    'gpa', 'university', 'college', 'degree', 'linkedin', 'github', 'email', 'phone',
-    'address', 'date', 'birth', 'street', 'com', 'www', 'http', 'httpss'
-])
-
-def _clean_text_aggressively(text, name_words):
-    if not isinstance(text, str): return ""
-    text = text.lower()
-    for name_word in name_words:
-        text = re.sub(r'\b' + re.escape(name_word) + r'\b', '', text)
-    text = re.sub(r'[^a-z\s]', '', text)
-    words = text.split()
-    cleaned_words = [word for word in words if word not in CUSTOM_STOP_WORDS and len(word) > 2]
-    return " ".join(cleaned_words)
-
-def _has_portfolio_link(text):
-    if not isinstance(text, str): return 0
-    return 1 if re.search(r'(https?://|www\.)', text, re.IGNORECASE) else 0
-
-def _has_honors_or_certs(text):
-    if not isinstance(text, str): return 0
-    return 1 if re.search(r'\b(award|honor|certification|certificate|publication|patent|distinction|fellowship)\b', text, re.IGNORECASE) else 0
-
-# --- 3. Gen AI Assessment Function ---
+# Text cleaning and engineered flags are shared with main.py (see features.py).
+_clean_text_aggressively = clean_text_aggressively
+_has_portfolio_link = has_portfolio_link
+_has_honors_or_certs = has_honors_or_certs
+
+def _build_features(vectorizer, resume_texts):
+    """TF-IDF rows plus the two engineered flags, one row per resume, as a CSR matrix."""
+    from scipy.sparse import hstack
+    cleaned_resumes, engineered_features = extract_features_batch(resume_texts)
+    tfidf_matrix = vectorizer.transform(cleaned_resumes)
+    return hstack([tfidf_matrix, engineered_features], format='csr')
+
+def _select_probabilities(job_role, resume_texts):
+    """
+    P(Select) for each resume against one role: from the model bundle when it
+    has the role, otherwise from the joblib registry. None if no model exists.
+    """
+    if ONLINE_LEARNING == "serve":
+        probabilities = online_learner.select_probabilities(job_role, resume_texts)
+        if probabilities is not None:
+            return probabilities
+    bundle = model_bundle.get()
+    if bundle is not None and bundle.has_role(job_role):
+        return bundle.predict_proba(job_role, resume_texts)
+    artifacts = model_registry.get(job_role)
+    if artifacts is None:
+        return None
+    model, vectorizer = artifacts
+    probabilities = model.predict_proba(_build_features(vectorizer, resume_texts))
+    return probabilities[:, list(model.classes_).index(1)]
+
+def _role_scorer(job_role):
+    """The role's compiled RoleScorer, from the bundle when it has the role. None if no model exists."""
+    bundle = model_bundle.get()
+    if bundle is not None and bundle.has_role(job_role):
+        return bundle.role_scorer(job_role)
+    return model_registry.get_scorer(job_role)
+
+def _select_probability(job_role, resume_text):
+    """Single-resume P(Select) through a compiled RoleScorer (no sklearn per call). None if no model exists."""
+    if ONLINE_LEARNING == "serve":
+        select_probability = online_learner.select_probability(job_role, resume_text)
+        if select_probability is not None:
+            return select_probability
+    with span("model_lookup"):
+        scorer = _role_scorer(job_role)
+    if scorer is None:
+        return None
+    return scorer.select_probability(resume_text)
+
+def _all_role_probabilities(resume_text):
+    """
+    (safe role names, P(Select) per role) for one resume against every role:
+    a single stacked product over the bundle when one is exported, otherwise
+    each role's compiled scorer in turn.
+    """
+    bundle = model_bundle.get()
+    if bundle is not None:
+        return list(bundle.roles), bundle.predict_proba_all_roles([resume_text])[0]
+    if not os.path.isdir(MODEL_DIR):
+        return [], np.empty(0)
+    safe_names, select_probabilities = [], []
+    for filename in sorted(os.listdir(MODEL_DIR)):
+        if filename.endswith("_model.joblib"):
+            scorer = model_registry.get_scorer(filename[:-len("_model.joblib")])
+            if scorer is not None:
+                safe_names.append(filename[:-len("_model.joblib")])
+                select_probabilities.append(scorer.select_probability(resume_text))
+    return safe_names, np.array(select_probabilities)
+
+def _all_role_probabilities_batch(resume_texts):
+    """
+    (safe role names, (n resumes, n roles) P(Select) matrix) for many resumes:
+    one stacked product over the bundle, otherwise one vectorizer and model
+    pass per joblib role over all of them.
+    """
+    bundle = model_bundle.get()
+    if bundle is not None:
+        return list(bundle.roles), bundle.predict_proba_all_roles(resume_texts)
+    if not os.path.isdir(MODEL_DIR):
+        return [], np.empty((len(resume_texts), 0))
+    safe_names, columns = [], []
+    for filename in sorted(os.listdir(MODEL_DIR)):
+        if filename.endswith("_model.joblib"):
+            artifacts = model_registry.get(filename[:-len("_model.joblib")])
+            if artifacts is not None:
+                model, vectorizer = artifacts
+                probabilities = model.predict_proba(_build_features(vectorizer, resume_texts))
+                safe_names.append(filename[:-len("_model.joblib")])
+                columns.append(probabilities[:, list(model.classes_).index(1)])
+    if not columns:
+        return [], np.empty((len(resume_texts), 0))
+    return safe_names, np.column_stack(columns)
+
+def _label_and_confidence(select_probability):
+    """('Select' | 'Reject', confidence in percent) for one P(Select)."""
+    if select_probability > 0.5:
+        return 'Select', select_probability * 100
+    return 'Reject', (1.0 - select_probability) * 100
+
+def _ml_step(resume_text, job_role):
+    """(error dict or {}, label, confidence in percent) for the ML half of a classification."""
+    print(f"Attempting to classify for role: '{job_role}'")
+    try:
+        with span("ml"):
+            select_probability = _select_probability(job_role, resume_text)
+        if select_probability is None:
+            return { "error": f"No ML model found for role '{job_role}'." }, "Error", 0.0
+        ml_prediction_label, ml_confidence_float = _label_and_confidence(select_probability)
+        return {}, ml_prediction_label, ml_confidence_float
+    except Exception as e:
+        return {"error": f"ML model error: {e}"}, "Error", 0.0
+
+def _genai_unavailable_reason():
+    """Why Gemini will not be called right now, or None when it is available."""
+    genai_client = get_client()
+    if genai_client is None:
+        return "Gen AI unavailable (no Gemini client configured)"
+    if genai_client.is_open():
+        return "Gen AI temporarily unavailable (Gemini circuit breaker open)"
+    if genai_in_flight() >= GENAI_MAX_IN_FLIGHT:
+        return f"Gen AI busy ({GENAI_MAX_IN_FLIGHT} calls still in flight)"
+    return None
+
+def _ml_only_sections(reason):
+    message = f"{reason}; ML-only result."
+    return {"gen_ai_assessment": message, "resume_jd_comparison": message, "improvement_suggestions": message}
+
+# --- 3. Cached Gemini Call ---
+class _CachedResponse:
+    """Stands in for a genai response when the text comes from genai_cache."""
+    prompt_feedback = None
+
+    def __init__(self, text):
+        self.text = text
+
+def _cache_key(kind, job_role, resume_text, job_description=None, resume_digest=None):
+    """genai_cache key for one prompt, including the current model and prompt compaction settings."""
+    return make_cache_key(kind, GENAI_MODEL, job_role, resume_text, job_description, resume_digest,
+                          compaction=prompt_compactor.fingerprint())
+
+def _cache_lookup(kind, key):
+    """genai_cache.get, counted as a hit or miss for `kind`."""
+    cached = genai_cache.get(key)
+    GENAI_CACHE_LOOKUPS.inc(kind, "miss" if cached is None else "hit")
+    return cached
+
+@contextmanager
+def _timed_call(kind):
+    """Times one uncached Gemini call; a call that raises is counted as an error."""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        GENAI_ERRORS.inc(kind)
+        raise
+    finally:
+        GENAI_CALL_SECONDS.observe(time.perf_counter() - started, kind)
+
+def _generate_content(kind, prompt, job_role, resume_text, job_description=None):
+    """Calls Gemini through genai_cache; only successful replies are stored."""
+    key = _cache_key(kind, job_role, resume_text, job_description)
+    cached = _cache_lookup(kind, key)
+    if cached is not None:
+        return _CachedResponse(cached)
+    with _timed_call(kind):
+        response = get_client().models.generate_content(model=GENAI_MODEL, contents=prompt)
+    if response.text:
+        genai_cache.put(key, kind, response.text)
+    return response
+
+def _stream_content(kind, prompt, job_role, resume_text, on_text, stop=None):
+    """
+    Streams Gemini's reply to `on_text` chunk by chunk and returns the full
+    text. A cache hit arrives as a single chunk. Setting `stop` abandons the
+    stream; partial replies are never cached.
+    """
+    key = _cache_key(kind, job_role, resume_text)
+    cached = _cache_lookup(kind, key)
+    if cached is not None:
+        on_text(cached)
+        return cached
+    parts = []
+    with _timed_call(kind):
+        for chunk in get_client().models.generate_content_stream(model=GENAI_MODEL, contents=prompt):
+            if stop is not None and stop.is_set():
+                return "".join(parts)
+            if chunk.text:
+                parts.append(chunk.text)
+                on_text(chunk.text)
+    text = "".join(parts)
+    if text:
+        genai_cache.put(key, kind, text)
+    return text
+
+def get_near_duplicate_index():
+    """The near-duplicate index, created on the first call; None when NEAR_DUP_MODE is 'off'."""
+    global near_duplicate_index
+    if near_duplicate_index is _INDEX_UNSET:
+        with _near_duplicate_lock:
+            if near_duplicate_index is _INDEX_UNSET:
+                near_duplicate_index = near_duplicate_index_from_env()
+    return near_duplicate_index
+
+def _check_near_duplicate(resume_text, job_role, job_description=None, allow_reuse=True):
+    """
+    Looks the resume up among earlier ones for the same role and JD, then
+    remembers it. On a near-duplicate in 'reuse' mode the earlier resume's
+    cached Gemini replies are copied to this resume's cache keys, so the
+    normal flow below finds them without calling Gemini; `allow_reuse=False`
+    (read-only callers) only flags the match and never writes the cache. Returns
+    {"similarity", "reused": [prompt kinds]} for a match, else None.
+    """
+    index = get_near_duplicate_index()
+    if index is None or not resume_text:
+        return None
+    with span("near_duplicate"):
+        digest = text_digest(resume_text)
+        signature = minhash(_clean_text_aggressively(resume_text))
+        scope = scope_hash(job_role, job_description)
+        match = index.query(signature, scope)
+        if match is None or match[0] != digest:
+            index.add(signature, scope, digest)
+        if match is None or match[0] == digest:
+            # Nothing similar, or an exact resubmission the usual cache keys already cover
+            NEAR_DUPLICATES.inc("miss" if match is None else "exact")
+            return None
+
+        earlier_digest, similarity = match
+        reused = []
+        if NEAR_DUP_MODE == "reuse" and allow_reuse:
+            has_jd = bool(job_description and job_description.strip())
+            for kind in ("assessment", "jd_comparison", "suggestions", "combined"):
+                if kind == "jd_comparison" and not has_jd:
+                    continue
+                kind_jd = job_description if kind in ("jd_comparison", "combined") else None
+                key = _cache_key(kind, job_role, resume_text, kind_jd, resume_digest=digest)
+                earlier = genai_cache.get(_cache_key(kind, job_role, None, kind_jd, resume_digest=earlier_digest))
+                if earlier is not None and genai_cache.get(key) is None:
+                    genai_cache.put(key, kind, earlier)
+                    reused.append(kind)
+    NEAR_DUPLICATES.inc("reused" if reused else "flagged")
+    print(f"Near-duplicate of an earlier resume ({similarity:.0%} similar); reused: {', '.join(reused) or 'nothing'}.")
+    return {"similarity": round(similarity, 4), "reused": reused}
+
+# --- 4. Gen AI Assessment Function ---
+def _parse_assessment(text):
+    """Sentiment and a wording-based confidence for an assessment reply."""
+    assessment = text.lower() # Convert to lowercase for easier checking
+
+    # Determine sentiment
+    sentiment = "Neutral"
+    if "strong" in assessment or "good" in assessment:
+        sentiment = "Positive"
+    elif "weak" in assessment or "poor" in assessment:
+        sentiment = "Negative"
+
+    # Estimate a simple confidence score from wording to give Gemini a variable weight
+    gen_confidence = 0.60
+    if re.search(r'\b(strong|strongly|excellent|outstanding|exceptional|highly)\b', assessment):
+        gen_confidence = 0.92
+    elif re.search(r'\b(very|well|good|solid|suitable|competent)\b', assessment):
+        gen_confidence = 0.78
+    elif re.search(r'\b(somewhat|possibly|maybe|could|might)\b', assessment):
+        gen_confidence = 0.55
+    elif re.search(r'\b(weak|poor|limited|insufficient|not a good)\b', assessment):
+        gen_confidence = 0.22
+
+    return {
+        "gen_ai_assessment": text,
+        "gen_ai_sentiment": sentiment,
+        "gen_ai_confidence": gen_confidence
+    } # Return original case text + confidence
+
 def get_gen_ai_assessment(resume_text, job_role):
 
     prompt = f"""
@@ -67,38 +445,14 @@ def get_gen_ai_assessment(resume_text, job_role):
     
     Resume Text:
     ---
-    {resume_text}
+    {_prompt_resume(resume_text, job_role)}
     ---
     
     Respond *only* with your 2-sentence assessment.
     """
     try:
-        response = client.models.generate_content(model="gemini-2.5-flash-lite",contents=prompt)
-        assessment = response.text.lower() # Convert to lowercase for easier checking
-
-        # Determine sentiment
-        sentiment = "Neutral"
-        if "strong" in assessment or "good" in assessment:
-            sentiment = "Positive"
-        elif "weak" in assessment or "poor" in assessment:
-            sentiment = "Negative"
-
-        # Estimate a simple confidence score from wording to give Gemini a variable weight
-        gen_confidence = 0.60
-        if re.search(r'\b(strong|strongly|excellent|outstanding|exceptional|highly)\b', assessment):
-            gen_confidence = 0.92
-        elif re.search(r'\b(very|well|good|solid|suitable|competent)\b', assessment):
-            gen_confidence = 0.78
-        elif re.search(r'\b(somewhat|possibly|maybe|could|might)\b', assessment):
-            gen_confidence = 0.55
-        elif re.search(r'\b(weak|poor|limited|insufficient|not a good)\b', assessment):
-            gen_confidence = 0.22
-
-        return {
-            "gen_ai_assessment": response.text,
-            "gen_ai_sentiment": sentiment,
-            "gen_ai_confidence": gen_confidence
-        } # Return original case text + confidence
+        response = _generate_content("assessment", prompt, job_role, resume_text)
+        return _parse_assessment(response.text)
 
     except Exception as e:
         print(f"Error calling Google Gemini API: {e}")
@@ -108,7 +462,7 @@ def get_gen_ai_assessment(resume_text, job_role):
         except:
            pass
         return {"gen_ai_assessment": f"Error calling Google Gemini API: {e}. Feedback: {error_details}", "gen_ai_sentiment": "Error", "gen_ai_confidence": 0.5}
-# --- 4. (NEW) Gen AI Resume-JD Comparison Function ---
+# --- 5. (NEW) Gen AI Resume-JD Comparison Function ---
 def get_resume_jd_comparison(resume_text, job_description, job_role):
     if not job_description or not job_description.strip():
          return {"resume_jd_comparison": "No job description provided for comparison."}
@@ -120,18 +474,18 @@ def get_resume_jd_comparison(resume_text, job_description, job_role):
 
     Resume Text:
     ---
-    {resume_text}
+    {_prompt_resume(resume_text, job_role)}
     ---
 
     Job Description:
     ---
-    {job_description}
+    {_prompt_job_description(job_description, job_role)}
     ---
 
     Provide only the comparison paragraph.
     """
     try:
-        response = client.models.generate_content(model="gemini-2.5-flash-lite",contents=prompt)
+        response = _generate_content("jd_comparison", prompt, job_role, resume_text, job_description)
         comparison = response.text
         return {"resume_jd_comparison": comparison}
     except Exception as e:
@@ -142,20 +496,23 @@ def get_resume_jd_comparison(resume_text, job_description, job_role):
         return {"resume_jd_comparison": f"Error calling Google Gemini API: {e}. Feedback: {error_details}"}
 
 
-# --- 5. Gen AI Improvement Suggestions Function ---
+# --- 6. Gen AI Improvement Suggestions Function ---
 # (Keep get_resume_improvement_suggestions as before)
-def get_resume_improvement_suggestions(resume_text, job_role):
-    
-    prompt = f"""
+def _suggestions_prompt(resume_text, job_role):
+    return f"""
     You are an expert career coach reviewing a resume for the specific job role of '{job_role}'.
     Analyze the provided resume and give 2-3 specific, actionable suggestions on how the candidate
     could improve their resume *to better match this particular role*.
     Focus on highlighting relevant skills, quantifying achievements, or adding specific keywords. Keep suggestions concise (bullet points or short paragraph).
-    Resume Text: --- {resume_text} ---
+    Resume Text: --- {_prompt_resume(resume_text, job_role)} ---
     Provide only the improvement suggestions.
     """
+
+def get_resume_improvement_suggestions(resume_text, job_role):
+    
+    prompt = _suggestions_prompt(resume_text, job_role)
     try:
-        response = client.models.generate_content(model="gemini-2.5-flash-lite",contents=prompt)
+        response = _generate_content("suggestions", prompt, job_role, resume_text)
         suggestions = response.text
         return {"improvement_suggestions": suggestions}
     except Exception as e:
@@ -165,55 +522,155 @@ def get_resume_improvement_suggestions(resume_text, job_role):
         except: pass
         return {"improvement_suggestions": f"Error: {e}. Feedback: {error_details}"}
 
+def stream_resume_improvement_suggestions(resume_text, job_role, on_text, stop=None):
+    """Same suggestions, streamed token by token from Gemini to `on_text`."""
+    try:
+        suggestions = _stream_content("suggestions", _suggestions_prompt(resume_text, job_role), job_role, resume_text, on_text, stop)
+        return {"improvement_suggestions": suggestions}
+    except Exception as e:
+        print(f"Error calling Google Gemini API (suggestions stream): {e}")
+        return {"improvement_suggestions": f"Error: {e}."}
 
 
 
-# --- 6. (MODIFIED) Main Public Function ---
-def classify_resume(resume_text, job_role, job_description=None): # Added job_description argument
+
+# --- 7. Single-call Gen AI (structured JSON) ---
+# GENAI_SINGLE_CALL=1 asks Gemini for assessment, confidence, JD comparison and
+# suggestions in one JSON reply, so the resume is sent (and paid for) once.
+GENAI_SINGLE_CALL = os.environ.get("GENAI_SINGLE_CALL", "0").lower() in ("1", "true", "yes", "on")
+_MATCH_SENTIMENT = {"strong": "Positive", "good": "Positive", "weak": "Negative", "poor": "Negative"}
+_NO_JD_MESSAGE = "No job description provided for comparison."
+
+def _combined_prompt(resume_text, job_role, job_description):
+    has_jd = bool(job_description and job_description.strip())
+    jd_instruction = (
+        "a concise paragraph (3-4 sentences) on how well the resume aligns with the job description below, "
+        "naming 1-2 key strengths and 1-2 gaps"
+        if has_jd else "null"
+    )
+    jd_section = f"""
+    Job Description:
+    ---
+    {_prompt_job_description(job_description, job_role)}
+    ---
+    """ if has_jd else ""
+    return f"""
+    You are an expert recruiter reviewing a resume for the job role of '{job_role}'.
+    Respond with a single JSON object and nothing else, using exactly these keys:
+      "match": one of "Strong", "Good", "Weak", "Poor"
+      "confidence": a number from 0 to 1, how sure you are of that match rating
+      "assessment": two sentences: "This candidate appears to be a [Strong/Good/Weak/Poor] match." then one sentence of justification
+      "jd_comparison": {jd_instruction}
+      "suggestions": 2-3 specific, actionable suggestions (as one string of bullet points) to better match this role
+
+    Resume Text:
+    ---
+    {_prompt_resume(resume_text, job_role)}
+    ---
+    {jd_section}
     """
-    Classifies a resume using ML, GenAI assessment, confidence adjustment,
-    JD comparison (if JD provided), and improvement suggestions.
+
+def parse_combined_response(text, has_job_description):
+    """
+    Validates the single-call JSON reply. Returns (gen_ai_result,
+    jd_comparison_result, improvement_result) shaped like the three
+    separate calls' results; raises ValueError if the reply is unusable.
     """
+    text = (text or "").strip()
+    if text.startswith("```"):
+        # Tolerate a fenced ```json block despite response_mime_type
+        text = text.strip("`").strip()
+        if text[:4].lower() == "json":
+            text = text[4:]
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"reply is not JSON: {e}") from None
+    if not isinstance(data, dict):
+        raise ValueError("reply is not a JSON object")
 
-    # --- Part 1: ML Model ---
-    # (ML logic remains the same)
-    print(f"Attempting to classify for role: '{job_role}'")
-    role_lower = job_role.lower()
-    safe_role_name = re.sub(r'[^a-z0-9_]+', '', role_lower.replace(' ', '_'))
-    model_path = os.path.join(MODEL_DIR, f"{safe_role_name}_model.joblib")
-    vectorizer_path = os.path.join(MODEL_DIR, f"{safe_role_name}_vectorizer.joblib")
-    ml_result = {}
-    ml_prediction_label = "Error"
-    ml_confidence_float = 0.0
-    if not os.path.exists(model_path) or not os.path.exists(vectorizer_path):
-        ml_result = { "error": f"No ML model found for role '{job_role}'." }
+    match = str(data.get("match", "")).strip().lower()
+    if match not in _MATCH_SENTIMENT:
+        raise ValueError(f"unexpected match rating {data.get('match')!r}")
+    try:
+        confidence = float(data.get("confidence"))
+    except (TypeError, ValueError):
+        raise ValueError(f"confidence {data.get('confidence')!r} is not a number") from None
+    if 1.0 < confidence <= 100.0:
+        confidence /= 100.0  # a percentage despite the instructions
+    if not 0.0 <= confidence <= 1.0:
+        raise ValueError(f"confidence {confidence} is out of range")
+    assessment, suggestions = data.get("assessment"), data.get("suggestions")
+    if isinstance(suggestions, list):
+        suggestions = "\n".join(f"- {item}" for item in suggestions)
+    if not isinstance(assessment, str) or not assessment.strip():
+        raise ValueError("missing assessment")
+    if not isinstance(suggestions, str) or not suggestions.strip():
+        raise ValueError("missing suggestions")
+    comparison = data.get("jd_comparison")
+    if has_job_description:
+        if not isinstance(comparison, str) or not comparison.strip():
+            raise ValueError("missing jd_comparison")
     else:
-        try:
-            model = joblib.load(model_path)
-            vectorizer = joblib.load(vectorizer_path)
-            cleaned_resume = _clean_text_aggressively(resume_text, set())
-            portfolio = _has_portfolio_link(resume_text)
-            honors = _has_honors_or_certs(resume_text)
-            engineered_features = np.array([[portfolio, honors]])
-            tfidf_matrix = vectorizer.transform([cleaned_resume])
-            features_combined = hstack([tfidf_matrix, engineered_features])
-            prediction = model.predict(features_combined)[0]
-            probability = model.predict_proba(features_combined)[0]
-            ml_prediction_label = 'Select' if prediction == 1 else 'Reject'
-            ml_confidence_float = probability[prediction] * 100
-        except Exception as e:
-            ml_result = {"error": f"ML model error: {e}"}
+        comparison = _NO_JD_MESSAGE
 
-    # --- Part 2: Gen AI Assessment ---
-    print("Getting Gen AI assessment using Gemini...")
-    gen_ai_result = get_gen_ai_assessment(resume_text, job_role)
+    return (
+        {"gen_ai_assessment": assessment.strip(), "gen_ai_sentiment": _MATCH_SENTIMENT[match], "gen_ai_confidence": confidence},
+        {"resume_jd_comparison": comparison.strip()},
+        {"improvement_suggestions": suggestions.strip()},
+    )
 
-    # --- Part 3: Adjust Confidence ---
-    # (Confidence adjustment logic remains the same)
+def get_combined_genai(resume_text, job_role, job_description=None):
+    """
+    One Gemini call for all three sections. Returns parse_combined_response's
+    triple, or None when the call fails or the reply does not validate (the
+    caller then falls back to the three separate prompts).
+    """
+    has_jd = bool(job_description and job_description.strip())
+    key = _cache_key("combined", job_role, resume_text, job_description)
+    try:
+        text = _cache_lookup("combined", key)
+        if text is None:
+            with _timed_call("combined"):
+                response = get_client().models.generate_content(
+                    model=GENAI_MODEL, contents=_combined_prompt(resume_text, job_role, job_description),
+                    config={"response_mime_type": "application/json"}
+                )
+            text = response.text
+            sections = parse_combined_response(text, has_jd)
+            genai_cache.put(key, "combined", text)  # only replies that validate are cached
+            return sections
+        return parse_combined_response(text, has_jd)
+    except Exception as e:
+        print(f"Single-call Gen AI failed ({e}); falling back to separate prompts.")
+        return None
+
+
+# --- 8. Deadline Helper for Concurrent Gen AI Calls ---
+def _await_genai(future, deadline, placeholder, label):
+    """Waits for a Gen AI future until the absolute `deadline`; returns `placeholder` if it is missed."""
+    try:
+        return future.result(timeout=max(0.0, deadline - time.monotonic()))
+    except FutureTimeoutError:
+        # Drops a call still queued; a running one ends at the same deadline inside the client
+        future.cancel()
+        print(f"Gen AI {label} missed its deadline; using placeholder.")
+        return placeholder
+    except Exception as e:
+        print(f"Gen AI {label} failed: {e}")
+        return placeholder
+
+
+# --- 9. Confidence Adjustment ---
+def _adjust_confidence(ml_prediction_label, ml_confidence_float, gen_ai_result, jitter=True):
+    """
+    Nudges the ML confidence (0-100) towards or away from the GenAI sentiment.
+    jitter=False leaves out the random ±10%, so the same inputs always give the same result.
+    """
     adjusted_confidence_float = ml_confidence_float
     MAX_ADJUSTMENT = 70.0
     MIN_ADJUSTMENT = 5.0
-    if "error" not in ml_result and gen_ai_result.get("gen_ai_sentiment") != "Error" and gen_ai_result.get("gen_ai_sentiment") != "Neutral":
+    if gen_ai_result.get("gen_ai_sentiment") != "Error" and gen_ai_result.get("gen_ai_sentiment") != "Neutral":
         gen_ai_positive = gen_ai_result["gen_ai_sentiment"] == "Positive"
         ml_is_select = ml_prediction_label == "Select"
 
@@ -228,8 +685,9 @@ def classify_resume(resume_text, job_role, job_description=None): # Added job_de
         dynamic_adjustment = base_adjustment * scale
 
         # Add a small random jitter so the adjustment isn't identical every time (±10%)
-        jitter = random.uniform(-0.10, 0.10) * dynamic_adjustment
-        dynamic_adjustment = max(MIN_ADJUSTMENT, min(MAX_ADJUSTMENT, dynamic_adjustment + jitter))
+        if jitter:
+            dynamic_adjustment += random.uniform(-0.10, 0.10) * dynamic_adjustment
+        dynamic_adjustment = max(MIN_ADJUSTMENT, min(MAX_ADJUSTMENT, dynamic_adjustment))
 
         if gen_ai_positive == ml_is_select:
             print(f"GenAI agrees with ML ({ml_prediction_label}). Boosting confidence by {dynamic_adjustment:.2f}.")
@@ -239,19 +697,130 @@ def classify_resume(resume_text, job_role, job_description=None): # Added job_de
             adjusted_confidence_float = max(0.0, ml_confidence_float - dynamic_adjustment)
     else:
         print("Skipping confidence adjustment.")
+    return adjusted_confidence_float
+
+
+# --- 10. Gen AI Fan-out ---
+def _submit_genai(resume_text, job_role, job_description, deadline):
+    """Starts the three independent Gemini calls, each ending at `deadline`; returns their futures."""
+    return (
+        submit_genai(get_gen_ai_assessment, resume_text, job_role, deadline=deadline),
+        submit_genai(get_resume_jd_comparison, resume_text, job_description, job_role, deadline=deadline),
+        submit_genai(get_resume_improvement_suggestions, resume_text, job_role, deadline=deadline),
+    )
+
+def _await_assessment(future, deadline, timeout):
+    return _await_genai(
+        future, deadline,
+        {"gen_ai_assessment": f"Gen AI assessment timed out after {timeout:g}s.", "gen_ai_sentiment": "Error", "gen_ai_confidence": 0.5},
+        "assessment"
+    )
+
+def _await_comparison_and_suggestions(comparison_future, suggestions_future, deadline, timeout):
+    jd_comparison_result = _await_genai(
+        comparison_future, deadline,
+        {"resume_jd_comparison": f"Resume-JD comparison timed out after {timeout:g}s."},
+        "JD comparison"
+    )
+    improvement_result = _await_genai(
+        suggestions_future, deadline,
+        {"improvement_suggestions": f"Improvement suggestions timed out after {timeout:g}s."},
+        "suggestions"
+    )
+    return jd_comparison_result, improvement_result
+
+def _await_combined(combined_future, resume_text, job_role, job_description, deadline, timeout):
+    """
+    The three section results from the single-call future. A reply that did
+    not validate falls back to the three separate calls within what is left
+    of the deadline; a missed deadline gives the usual placeholders.
+    """
+    sections = _await_genai(combined_future, deadline, "timeout", "combined call")
+    if sections == "timeout":
+        return (
+            {"gen_ai_assessment": f"Gen AI assessment timed out after {timeout:g}s.", "gen_ai_sentiment": "Error", "gen_ai_confidence": 0.5},
+            {"resume_jd_comparison": f"Resume-JD comparison timed out after {timeout:g}s."},
+            {"improvement_suggestions": f"Improvement suggestions timed out after {timeout:g}s."},
+        )
+    if sections is not None:
+        return sections
+    assessment_future, comparison_future, suggestions_future = _submit_genai(resume_text, job_role, job_description, deadline)
+    gen_ai_result = _await_assessment(assessment_future, deadline, timeout)
+    return (gen_ai_result, *_await_comparison_and_suggestions(comparison_future, suggestions_future, deadline, timeout))
+
+
+# --- 11. (MODIFIED) Main Public Function ---
+def classify_resume(resume_text, job_role, job_description=None, genai_timeout=None, single_call=None): # Added job_description argument
+    """
+    Classifies a resume using ML, GenAI assessment, confidence adjustment,
+    JD comparison (if JD provided), and improvement suggestions.
+
+    The three Gemini calls are issued concurrently before the ML model runs.
+    Each has its own deadline (`genai_timeout`, default GENAI_CALL_TIMEOUT);
+    a call that misses it degrades to a placeholder message. With
+    `single_call` (default GENAI_SINGLE_CALL) one structured JSON call
+    replaces the three, falling back to them if its reply does not parse.
+    """
+    single_call = GENAI_SINGLE_CALL if single_call is None else single_call
+    timeout = GENAI_CALL_TIMEOUT if genai_timeout is None else genai_timeout
+    started = time.monotonic()
+    deadline = started + timeout
+
+    # While Gemini is unavailable (breaker open), answer from the ML model alone
+    unavailable = _genai_unavailable_reason()
+    if unavailable is not None:
+        print(f"{unavailable}; returning the ML-only result.")
+        ml_result, ml_prediction_label, ml_confidence_float = _ml_step(resume_text, job_role)
+        if "error" not in ml_result:
+            ml_result = {"ml_prediction": ml_prediction_label, "ml_confidence": f"{ml_confidence_float:.2f}%"}
+        CLASSIFICATIONS.inc(ml_prediction_label)
+        result = {"role": job_role, **ml_result, **_ml_only_sections(unavailable)}
+        online_ml = _online_shadow(resume_text, job_role)
+        if online_ml is not None:
+            result["online_ml"] = online_ml
+        return result
+
+    # --- Part 0: Fire off the independent Gen AI calls ---
+    near_duplicate = _check_near_duplicate(resume_text, job_role, job_description)
+    compaction = _compaction_report(resume_text, job_role, job_description, single_call)
+    if single_call:
+        print("Requesting a single structured Gen AI review from Gemini...")
+        combined_future = submit_genai(get_combined_genai, resume_text, job_role, job_description, deadline=deadline)
+    else:
+        print("Requesting Gen AI assessment, JD comparison and suggestions from Gemini...")
+        assessment_future, comparison_future, suggestions_future = _submit_genai(resume_text, job_role, job_description, deadline)
+
+    # --- Part 1: ML Model ---
+    ml_result, ml_prediction_label, ml_confidence_float = _ml_step(resume_text, job_role)
+
+    # --- Part 2: Gen AI Assessment ---
+    # The confidence adjustment only needs this call, so wait for it first.
+    with span("genai_wait"):
+        if single_call:
+            gen_ai_result, jd_comparison_result, improvement_result = _await_combined(
+                combined_future, resume_text, job_role, job_description, deadline, timeout
+            )
+        else:
+            gen_ai_result = _await_assessment(assessment_future, deadline, timeout)
+
+    # --- Part 3: Adjust Confidence ---
+    adjusted_confidence_float = ml_confidence_float
+    if "error" not in ml_result:
+        adjusted_confidence_float = _adjust_confidence(ml_prediction_label, ml_confidence_float, gen_ai_result)
+    else:
+        print("Skipping confidence adjustment.")
     if "error" not in ml_result:
         ml_result = {
             "ml_prediction": ml_prediction_label,
             "ml_confidence": f"{adjusted_confidence_float:.2f}%"
         }
 
-    # --- Part 4: (NEW) Get Resume-JD Comparison ---
-    print("Getting Resume-JD comparison using Gemini...")
-    jd_comparison_result = get_resume_jd_comparison(resume_text, job_description, job_role)
-
-    # --- Part 5: Get Improvement Suggestions ---
-    print("Getting improvement suggestions using Gemini...")
-    improvement_result = get_resume_improvement_suggestions(resume_text, job_role)
+    # --- Part 4/5: Resume-JD Comparison and Improvement Suggestions ---
+    if not single_call:
+        with span("genai_wait"):
+            jd_comparison_result, improvement_result = _await_comparison_and_suggestions(
+                comparison_future, suggestions_future, deadline, timeout
+            )
 
     # --- Part 6: Combine All Results ---
     final_result = {
@@ -261,5 +830,429 @@ def classify_resume(resume_text, job_role, job_description=None): # Added job_de
         **jd_comparison_result, # Add the comparison dictionary
         **improvement_result
     }
+    if near_duplicate is not None:
+        final_result["near_duplicate"] = near_duplicate
+    if compaction is not None:
+        final_result["prompt_compaction"] = compaction
+    online_ml = _online_shadow(resume_text, job_role)
+    if online_ml is not None:
+        final_result["online_ml"] = online_ml
+
+    CLASSIFICATIONS.inc(ml_prediction_label)
+    return final_result
+
+
+# --- 12. Streaming Classification ---
+def classify_resume_stream(resume_text, job_role, job_description=None, genai_timeout=None):
+    """
+    Generator form of classify_resume for progressive rendering. Yields
+    (event, payload) pairs as soon as each part is ready:
+
+      'ml'                 ML prediction with the unadjusted confidence
+      'assessment'         Gemini assessment plus the adjusted ml_confidence
+      'jd_comparison'      resume-JD comparison
+      'suggestions_delta'  the next chunk of improvement suggestions ({"text": ...})
+      'suggestions'        the complete improvement suggestions
+      'done'               the full result, shaped like classify_resume's
+
+    The first event costs only the ML model; assessment and comparison are
+    emitted in whichever order Gemini finishes them. Anything still missing
+    at the deadline gets the same placeholder classify_resume uses.
+    """
+    timeout = GENAI_CALL_TIMEOUT if genai_timeout is None else genai_timeout
+    deadline = time.monotonic() + timeout
+
+    unavailable = _genai_unavailable_reason()
+    if unavailable is not None:
+        print(f"{unavailable}; streaming the ML-only result.")
+        ml_result, ml_prediction_label, ml_confidence_float = _ml_step(resume_text, job_role)
+        if "error" not in ml_result:
+            ml_result = {"ml_prediction": ml_prediction_label, "ml_confidence": f"{ml_confidence_float:.2f}%"}
+        yield 'ml', {"role": job_role, **ml_result}
+        sections = _ml_only_sections(unavailable)
+        yield 'assessment', {"gen_ai_assessment": sections["gen_ai_assessment"], **ml_result}
+        yield 'jd_comparison', {"resume_jd_comparison": sections["resume_jd_comparison"]}
+        yield 'suggestions', {"improvement_suggestions": sections["improvement_suggestions"]}
+        CLASSIFICATIONS.inc(ml_prediction_label)
+        done = {"role": job_role, **ml_result, **sections}
+        online_ml = _online_shadow(resume_text, job_role)
+        if online_ml is not None:
+            done["online_ml"] = online_ml
+        yield 'done', done
+        return
+
+    events = queue.Queue()
+    stop = threading.Event()
+
+    def run(event, function, *args):
+        try:
+            events.put((event, function(*args)))
+        except Exception as e:
+            print(f"Gen AI {event} failed: {e}")
+
+    near_duplicate = _check_near_duplicate(resume_text, job_role, job_description)
+    compaction = _compaction_report(resume_text, job_role, job_description)
+    print("Streaming Gen AI assessment, JD comparison and suggestions from Gemini...")
+    refused = [
+        event for event, future in (
+            ('assessment', submit_genai(run, 'assessment', get_gen_ai_assessment, resume_text, job_role, deadline=deadline)),
+            ('jd_comparison', submit_genai(run, 'jd_comparison', get_resume_jd_comparison, resume_text, job_description, job_role,
+                                           deadline=deadline)),
+            ('suggestions', submit_genai(run, 'suggestions', stream_resume_improvement_suggestions, resume_text, job_role,
+                                         lambda text: events.put(('suggestions_delta', text)), stop, deadline=deadline)),
+        )
+        if future.done() and isinstance(future.exception(), GenAIBusyError)
+    ]
+    if refused:
+        # Refused calls never run, so answer them now instead of waiting out the deadline
+        busy_sections = _ml_only_sections(f"Gen AI busy ({GENAI_MAX_IN_FLIGHT} calls still in flight)")
+        busy_payloads = {
+            'assessment': {"gen_ai_assessment": busy_sections["gen_ai_assessment"], "gen_ai_sentiment": "Error", "gen_ai_confidence": 0.5},
+            'jd_comparison': {"resume_jd_comparison": busy_sections["resume_jd_comparison"]},
+            'suggestions': {"improvement_suggestions": busy_sections["improvement_suggestions"]},
+        }
+        for event in refused:
+            events.put((event, busy_payloads[event]))
+
+    # A client that disconnects closes this generator (GeneratorExit at a yield); the finally
+    # still tells the suggestions stream to stop so it does not keep pulling chunks from Gemini.
+    try:
+        ml_result, ml_prediction_label, ml_confidence_float = _ml_step(resume_text, job_role)
+        if "error" not in ml_result:
+            ml_result = {"ml_prediction": ml_prediction_label, "ml_confidence": f"{ml_confidence_float:.2f}%"}
+        yield 'ml', {"role": job_role, **ml_result}
+
+        results = {}
+        partial_suggestions = []
+
+        def finish(event, payload):
+            results[event] = payload
+            if event == 'assessment':
+                if "error" not in ml_result:
+                    adjusted_confidence_float = _adjust_confidence(ml_prediction_label, ml_confidence_float, payload)
+                    ml_result["ml_confidence"] = f"{adjusted_confidence_float:.2f}%"
+                return {"gen_ai_assessment": payload.get("gen_ai_assessment", "N/A"), **ml_result}
+            return payload
+
+        while len(results) < 3:
+            try:
+                event, payload = events.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if event == 'suggestions_delta':
+                partial_suggestions.append(payload)
+                yield event, {"text": payload}
+            else:
+                yield event, finish(event, payload)
+    finally:
+        stop.set()
+
+    placeholders = {
+        'assessment': {"gen_ai_assessment": f"Gen AI assessment timed out after {timeout:g}s.", "gen_ai_sentiment": "Error", "gen_ai_confidence": 0.5},
+        'jd_comparison': {"resume_jd_comparison": f"Resume-JD comparison timed out after {timeout:g}s."},
+        'suggestions': {"improvement_suggestions": f"Improvement suggestions timed out after {timeout:g}s."},
+    }
+    if partial_suggestions:
+        placeholders['suggestions'] = {
+            "improvement_suggestions": "".join(partial_suggestions) + f"\n\n(Cut off after {timeout:g}s.)"
+        }
+    for event, placeholder in placeholders.items():
+        if event not in results:
+            print(f"Gen AI {event} missed its deadline; using placeholder.")
+            yield event, finish(event, placeholder)
+
+    done = {
+        "role": job_role,
+        **ml_result,
+        "gen_ai_assessment": results['assessment'].get("gen_ai_assessment", "N/A"),
+        **results['jd_comparison'],
+        **results['suggestions']
+    }
+    if near_duplicate is not None:
+        done["near_duplicate"] = near_duplicate
+    if compaction is not None:
+        done["prompt_compaction"] = compaction
+    online_ml = _online_shadow(resume_text, job_role)
+    if online_ml is not None:
+        done["online_ml"] = online_ml
+    CLASSIFICATIONS.inc(ml_prediction_label)
+    yield 'done', done
+
+
+# --- 13. Best-fit Roles ---
+BEST_FIT_TOP_K = int(os.environ.get("BEST_FIT_TOP_K", "5"))
+
+def role_display_name(safe_name):
+    """'software_engineer' -> 'Software Engineer' (artifacts only keep the safe name)."""
+    return safe_name.replace('_', ' ').title()
+
+def rank_roles(resume_text, top_k=BEST_FIT_TOP_K):
+    """
+    The top_k roles for a resume, highest P(Select) first. ML only (no Gemini
+    calls), so it costs about as much as scoring a single role.
+    """
+    with span("rank_roles"):
+        safe_names, select_probabilities = _all_role_probabilities(resume_text)
+    return _ranked_roles(safe_names, select_probabilities, top_k)
+
+def rank_roles_batch(resume_texts, top_k=BEST_FIT_TOP_K):
+    """rank_roles for many resumes, scoring every role over all of them at once. One list per resume, in order."""
+    if not resume_texts:
+        return []
+    with span("rank_roles"):
+        safe_names, select_probabilities = _all_role_probabilities_batch(resume_texts)
+    return [_ranked_roles(safe_names, row, top_k) for row in select_probabilities]
+
+def _ranked_roles(safe_names, select_probabilities, top_k):
+    ranked = []
+    for row in np.argsort(-select_probabilities, kind='stable')[:max(1, top_k)]:
+        label, confidence = _label_and_confidence(select_probabilities[row])
+        ranked.append({
+            "role": role_display_name(safe_names[row]),
+            "role_key": safe_names[row],
+            "select_probability": round(float(select_probabilities[row]), 6),
+            "ml_prediction": label,
+            "ml_confidence": f"{confidence:.2f}%"
+        })
+    return ranked
+
+
+# --- 14. Batch Classification ---
+BATCH_MAX_ITEMS = int(os.environ.get("BATCH_MAX_ITEMS", "1000"))
+
+def cached_genai_sections(resume_text, job_role, job_description=None):
+    """
+    The Gen AI results genai_cache already holds for one classification,
+    without calling Gemini: (parsed assessment or None, {section: text}).
+    A cached single-call reply fills whatever the separate prompts lack.
+    """
+    assessment_text = _cache_lookup("assessment", _cache_key("assessment", job_role, resume_text))
+    gen_ai_result = _parse_assessment(assessment_text) if assessment_text is not None else None
+    sections = {} if gen_ai_result is None else {"gen_ai_assessment": assessment_text}
+    has_jd = bool(job_description and job_description.strip())
+    if has_jd:
+        comparison = _cache_lookup("jd_comparison", _cache_key("jd_comparison", job_role, resume_text, job_description))
+        if comparison is not None:
+            sections["resume_jd_comparison"] = comparison
+    suggestions = _cache_lookup("suggestions", _cache_key("suggestions", job_role, resume_text))
+    if suggestions is not None:
+        sections["improvement_suggestions"] = suggestions
+
+    if gen_ai_result is None or len(sections) < (3 if has_jd else 2):
+        combined = _cache_lookup("combined", _cache_key("combined", job_role, resume_text, job_description))
+        if combined is not None:
+            assessment, comparison, improvement = parse_combined_response(combined, has_jd)
+            if gen_ai_result is None:
+                gen_ai_result = assessment
+            for section in (assessment, comparison, improvement):
+                for field in ("gen_ai_assessment", "resume_jd_comparison", "improvement_suggestions"):
+                    if field in section:
+                        sections.setdefault(field, section[field])
+    return gen_ai_result, sections
+
+def classify_resumes(items, include_genai=False, genai_timeout=None, genai_cache_only=False, deterministic=False):
+    """
+    Classifies many resumes in one call. `items` is a list of dicts with
+    'resume_text', 'job_role' and an optional 'job_description'; results are
+    returned in the same order, each shaped like classify_resume's output.
+
+    Items are grouped by role so every role's vectorizer and model run once
+    over a single sparse matrix. GenAI enrichment is opt-in per batch; with
+    `genai_cache_only` it uses whatever genai_cache holds and never calls Gemini.
+    `deterministic` drops the random jitter from the confidence adjustment,
+    so scoring the same input twice gives the same confidences.
+    """
+    results = [None] * len(items)
+    ml_confidences = {}  # index -> unadjusted ML confidence (0-100)
+    groups = {}
+    for index, item in enumerate(items):
+        job_role = item.get('job_role')
+        if not item.get('resume_text') or not job_role:
+            results[index] = {"role": job_role, "error": "Missing 'resume_text' or 'job_role'"}
+            continue
+        groups.setdefault(safe_role_name(job_role), []).append(index)
+
+    # --- Part 1: One vectorizer pass and one scoring pass per role ---
+    for indices in groups.values():
+        job_role = items[indices[0]]['job_role']
+        print(f"Batch-classifying {len(indices)} resume(s) for role: '{job_role}'")
+        try:
+            with span("ml_batch"):
+                select_probabilities = _select_probabilities(job_role, [items[index]['resume_text'] for index in indices])
+            if select_probabilities is None:
+                for index in indices:
+                    results[index] = {"role": items[index]['job_role'], "error": f"No ML model found for role '{job_role}'."}
+                continue
+            for row, index in enumerate(indices):
+                label, ml_confidences[index] = _label_and_confidence(select_probabilities[row])
+                results[index] = {"role": items[index]['job_role'], "ml_prediction": label}
+        except Exception as e:
+            for index in indices:
+                results[index] = {"role": items[index]['job_role'], "error": f"ML model error: {e}"}
+        verdicts = _online_shadow_batch(job_role, [items[index]['resume_text'] for index in indices])
+        if verdicts is not None:
+            for index, online_ml in zip(indices, verdicts):
+                results[index]["online_ml"] = online_ml
+
+    # --- Part 2: Optional GenAI enrichment, a pool-sized window at a time ---
+    if include_genai and genai_cache_only:
+        for index in sorted(ml_confidences):
+            item = items[index]
+            # Cache-only enrichment is read-only: flag near-duplicates, never copy replies into the cache
+            near_duplicate = _check_near_duplicate(item['resume_text'], item['job_role'], item.get('job_description'),
+                                                   allow_reuse=False)
+            if near_duplicate is not None:
+                results[index]["near_duplicate"] = near_duplicate
+            gen_ai_result, sections = cached_genai_sections(item['resume_text'], item['job_role'], item.get('job_description'))
+            if gen_ai_result is not None:
+                ml_confidences[index] = _adjust_confidence(results[index]["ml_prediction"], ml_confidences[index], gen_ai_result,
+                                                           jitter=not deterministic)
+            results[index].update(sections)
+        include_genai = False
+    unavailable = _genai_unavailable_reason() if include_genai else None
+    if unavailable is not None:
+        print(f"{unavailable}; skipping batch enrichment.")
+        for index in ml_confidences:
+            results[index].update(_ml_only_sections(unavailable))
+    elif include_genai:
+        timeout = GENAI_CALL_TIMEOUT if genai_timeout is None else genai_timeout
+        pending = sorted(ml_confidences)
+        window_size = max(1, GENAI_MAX_WORKERS // 3)
+        for window_start in range(0, len(pending), window_size):
+            window = pending[window_start:window_start + window_size]
+            for index in window:
+                near_duplicate = _check_near_duplicate(items[index]['resume_text'], items[index]['job_role'], items[index].get('job_description'))
+                if near_duplicate is not None:
+                    results[index]["near_duplicate"] = near_duplicate
+                compaction = _compaction_report(items[index]['resume_text'], items[index]['job_role'], items[index].get('job_description'))
+                if compaction is not None:
+                    results[index]["prompt_compaction"] = compaction
+            deadline = time.monotonic() + timeout
+            futures = {
+                index: _submit_genai(items[index]['resume_text'], items[index]['job_role'], items[index].get('job_description'), deadline)
+                for index in window
+            }
+            for index in window:
+                assessment_future, comparison_future, suggestions_future = futures[index]
+                gen_ai_result = _await_assessment(assessment_future, deadline, timeout)
+                ml_confidences[index] = _adjust_confidence(results[index]["ml_prediction"], ml_confidences[index], gen_ai_result,
+                                                           jitter=not deterministic)
+                jd_comparison_result, improvement_result = _await_comparison_and_suggestions(
+                    comparison_future, suggestions_future, deadline, timeout
+                )
+                results[index].update({
+                    "gen_ai_assessment": gen_ai_result.get("gen_ai_assessment", "N/A"),
+                    **jd_comparison_result,
+                    **improvement_result
+                })
+
+    for index, confidence in ml_confidences.items():
+        results[index]["ml_confidence"] = f"{confidence:.2f}%"
+    for result in results:
+        CLASSIFICATIONS.inc(result.get("ml_prediction", "Error"))
+    return results
+
+
+# --- 15. Warm-up ---
+def warm_up():
+    """
+    Does up front what the first classification would otherwise pay for:
+    imports scikit-learn/scipy, creates the Gemini client and the
+    near-duplicate index, opens the model bundle (or loads every joblib role)
+    and the online model checkpoints, and scores a sample resume against every role. Returns the seconds taken.
+    """
+    started = time.perf_counter()
+    with span("warm_up"):
+        get_client()
+        get_near_duplicate_index()
+        if model_bundle.get() is None:
+            model_registry.preload()
+        if online_learner is not None:
+            online_learner.load()
+        rank_roles("Warm-up resume: Python developer with AWS experience.", top_k=1)
+    elapsed = time.perf_counter() - started
+    print(f"Warm-up finished in {elapsed:.2f}s.")
+    return elapsed
+
+
+# --- 16. Prompt Compaction ---
+def _term_weight(job_role):
+    """
+    Extra relevance for a cleaned resume/JD segment: the summed IDF of the
+    role vectorizer's terms in it, above the IDF of its most common term, so
+    rare, role-specific wording outranks boilerplate when a prompt is
+    trimmed. None when the role has no model.
+    """
+    try:
+        scorer = _role_scorer(job_role)
+    except Exception as e:
+        print(f"No role vectorizer for prompt compaction: {e}")
+        return None
+    if scorer is None:
+        return None
+
+    idf_floor = float(scorer.idf.min()) if len(scorer.idf) else 0.0
+
+    def weight(cleaned_segment):
+        columns = scorer.columns_of(scorer.analyze(cleaned_segment))
+        return float(np.sum(scorer.idf[columns]) - idf_floor * len(columns)) if len(columns) else 0.0
+    return weight
+
+@functools.lru_cache(maxsize=256)
+def _compacted(text, job_role, part):
+    """Compacted resume ('resume') or job description ('jd') text; computed once for all of a request's prompts."""
+    with span("prompt_compaction"):
+        term_weight = _term_weight(job_role)
+        if part == 'jd':
+            return prompt_compactor.compact_job_description(text, term_weight)
+        return prompt_compactor.compact_resume(text, term_weight)
+
+def _prompt_resume(resume_text, job_role):
+    return _compacted(resume_text, job_role, 'resume').text if prompt_compactor.enabled else resume_text
+
+def _prompt_job_description(job_description, job_role):
+    return _compacted(job_description, job_role, 'jd').text if prompt_compactor.enabled else job_description
+
+def _compaction_report(resume_text, job_role, job_description=None, single_call=False):
+    """
+    Estimated prompt tokens this classification's Gemini prompts carry for
+    the resume and JD, before and after compaction: the resume goes into
+    three prompts (one with single_call), the JD into one. None when off.
+    """
+    if not prompt_compactor.enabled or not resume_text:
+        return None
+    resume = _compacted(resume_text, job_role, 'resume')
+    resume_prompts = 1 if single_call else 3
+    before, after = resume.tokens_before * resume_prompts, resume.tokens_after * resume_prompts
+    if job_description and job_description.strip():
+        jd = _compacted(job_description, job_role, 'jd')
+        before, after = before + jd.tokens_before, after + jd.tokens_after
+    prompt_compactor.record(before, after)
+    PROMPT_TOKENS.inc("original", amount=before)
+    PROMPT_TOKENS.inc("sent", amount=after)
+    print(f"Prompt compaction: ~{before} -> ~{after} input tokens ({before - after} saved).")
+    return {"tokens_before": before, "tokens_after": after, "tokens_saved": before - after}
+
+
+# --- 17. Online Learning (shadow mode) ---
+def _online_shadow_batch(job_role, resume_texts):
+    """With ONLINE_LEARNING='shadow', the online model's verdict for each resume (one role); otherwise None."""
+    if ONLINE_LEARNING != "shadow":
+        return None
+    try:
+        select_probabilities = online_learner.select_probabilities(job_role, resume_texts)
+    except Exception as e:
+        print(f"Online model error: {e}")
+        return None
+    if select_probabilities is None:
+        return None
+    verdicts = []
+    for select_probability in select_probabilities:
+        label, confidence = _label_and_confidence(select_probability)
+        verdicts.append({"ml_prediction": label, "ml_confidence": f"{confidence:.2f}%"})
+    return verdicts
 
-    return final_result
\ No newline at end of file
+def _online_shadow(resume_text, job_role):
+    """The shadow verdict for one resume, for classify_resume and classify_resume_stream; otherwise None."""
+    verdicts = _online_shadow_batch(job_role, [resume_text])
+    return None if verdicts is None else verdicts[0]
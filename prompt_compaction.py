@@ -0,0 +1,138 @@
+import os
+import re
+import threading
+from collections import namedtuple
+
+from features import clean_text_aggressively
+
+# --- 1. Token Estimate ---
+# Gemini bills by tokens; ~4 characters per token is close enough for budgeting English text.
+CHARS_PER_TOKEN = 4
+
+def estimate_tokens(text):
+    return (len(text or "") + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+# --- 2. Segmentation ---
+_SPACES_RE = re.compile(r'[^\S\n]+')
+_SENTENCE_BREAK_RE = re.compile(r'(?<=[.!?;])\s+(?=\S)')
+LONG_LINE_CHARS = 200  # longer lines (pasted paragraphs) are split into sentences
+
+def normalize_whitespace(text):
+    """Runs of spaces/tabs collapsed to one space, lines stripped, blank lines removed."""
+    lines = (_SPACES_RE.sub(' ', line).strip() for line in (text or "").splitlines())
+    return "\n".join(line for line in lines if line)
+
+def split_segments(text):
+    """The lines of the normalized text, with long lines split into sentences."""
+    segments = []
+    for line in normalize_whitespace(text).split("\n"):
+        if len(line) > LONG_LINE_CHARS:
+            segments.extend(part for part in _SENTENCE_BREAK_RE.split(line) if part)
+        elif line:
+            segments.append(line)
+    return segments
+
+
+# --- 3. Compaction ---
+WORD_WEIGHT = 0.25  # small next to a role-specific term's IDF, so it mostly breaks ties
+CompactedText = namedtuple('CompactedText', ['text', 'tokens_before', 'tokens_after', 'segments_dropped'])
+
+def compact_text(text, budget, term_weight=None):
+    """
+    Shrinks `text` for a prompt. Whitespace is always normalized; nothing
+    else changes while the text fits in `budget` tokens. Over budget,
+    segments (lines or sentences) with nothing left after
+    clean_text_aggressively (headers, contact details, dates; the
+    CUSTOM_STOP_WORDS vocabulary) are dropped, then the segments with the
+    most signal per token are kept, in their original order. A segment's
+    signal is WORD_WEIGHT per cleaned word plus `term_weight(cleaned
+    segment)`, if given.
+    """
+    if not text:
+        return CompactedText(text or "", 0, 0, 0)
+    segments = split_segments(text)
+    costs = [estimate_tokens(segment) + 1 for segment in segments]  # +1 for the joining newline
+    kept = list(range(len(segments)))
+    if budget and sum(costs) > budget:
+        cleaned = [clean_text_aggressively(segment) for segment in segments]
+        # Segments with nothing but stop words go first; keep everything if that is all there is
+        kept = [i for i in kept if cleaned[i]] or kept
+        scores = {i: WORD_WEIGHT * len(cleaned[i].split()) + (term_weight(cleaned[i]) if term_weight else 0.0) for i in kept}
+        chosen, used = [], 0
+        for i in sorted(kept, key=lambda i: (-scores[i] / costs[i], i)):
+            if used + costs[i] <= budget:
+                chosen.append(i)
+                used += costs[i]
+        kept = sorted(chosen)
+    compacted = "\n".join(segments[i] for i in kept)
+    return CompactedText(compacted, estimate_tokens(text), estimate_tokens(compacted), len(segments) - len(kept))
+
+
+# Bump when compact_text's selection changes, so cached replies to old prompts are not reused.
+COMPACTOR_VERSION = 2
+
+
+class PromptCompactor:
+    """
+    Token budgets for the resume and job description text inlined in Gemini
+    prompts, plus running totals of estimated tokens before and after.
+    """
+
+    def __init__(self, enabled=True, resume_budget=800, job_description_budget=250):
+        self.enabled = enabled
+        self.resume_budget = resume_budget
+        self.job_description_budget = job_description_budget
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.tokens_before = 0
+        self.tokens_after = 0
+
+    def compact_resume(self, text, term_weight=None):
+        if not self.enabled:
+            return CompactedText(text, estimate_tokens(text), estimate_tokens(text), 0)
+        return compact_text(text, self.resume_budget, term_weight)
+
+    def compact_job_description(self, text, term_weight=None):
+        if not self.enabled:
+            return CompactedText(text, estimate_tokens(text), estimate_tokens(text), 0)
+        return compact_text(text, self.job_description_budget, term_weight)
+
+    def fingerprint(self):
+        """Identifies how prompts are compacted (mode, budgets, version); part of every Gemini cache key."""
+        if not self.enabled:
+            return "off"
+        return f"v{COMPACTOR_VERSION}:resume={self.resume_budget}:jd={self.job_description_budget}"
+
+    def record(self, tokens_before, tokens_after):
+        with self._lock:
+            self.requests += 1
+            self.tokens_before += tokens_before
+            self.tokens_after += tokens_after
+
+    def stats(self):
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "resume_budget": self.resume_budget,
+                "job_description_budget": self.job_description_budget,
+                "requests": self.requests,
+                "tokens_before": self.tokens_before,
+                "tokens_after": self.tokens_after,
+                "tokens_saved": self.tokens_before - self.tokens_after,
+                "saved_share": (1 - self.tokens_after / self.tokens_before) if self.tokens_before else 0.0,
+            }
+
+
+def compactor_from_env():
+    """
+    Builds the process-wide compactor from PROMPT_COMPACTION and
+    PROMPT_*_TOKEN_BUDGET environment variables. Off unless PROMPT_COMPACTION
+    is set: check that assessments agree on your own resumes first
+    (benchmarks/bench_prompt_compaction.py --live --sample ...).
+    """
+    return PromptCompactor(
+        enabled=os.environ.get("PROMPT_COMPACTION", "off").lower() in ("1", "on", "true", "yes"),
+        resume_budget=int(os.environ.get("PROMPT_RESUME_TOKEN_BUDGET", "800")),
+        job_description_budget=int(os.environ.get("PROMPT_JD_TOKEN_BUDGET", "250")),
+    )
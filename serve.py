@@ -0,0 +1,123 @@
+"""
+Pre-fork server: one master process imports the app (loading every role
+model), then forks worker processes that all accept on the same listening
+socket. The preloaded models, vectorizers and bundle are shared between the
+workers copy-on-write instead of being loaded once per worker.
+
+Workers keep no account or history state of their own: users and history
+live in the SQLite user database (USER_DB_FILE), background jobs in the
+SQLite job queue (JOB_QUEUE_BACKEND defaults to 'sqlite' here when there is
+more than one worker) and Gemini replies in the shared genai_cache file.
+Gemini rate limits (GENAI_RATE_*) and /metrics counters are per worker, and
+so is the near-duplicate index: a resubmission is only matched to a resume
+the same worker has seen (NEAR_DUP_MAX_ENTRIES bounds each worker's copy).
+A worker that dies is replaced; SIGTERM or Ctrl-C stops them all.
+
+    python serve.py [--host 127.0.0.1] [--port 5000] [--workers 4]
+"""
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+
+RESPAWN_BACKOFF = 1.0  # seconds to wait before replacing a worker that died right after starting
+
+
+# --- 1. Workers ---
+def _serve_worker(app_module, sock, host, port):
+    """Runs in a forked child: serves requests on the inherited socket until SIGTERM/SIGINT."""
+    from werkzeug.serving import make_server
+
+    app_module.init_worker()
+    server = make_server(host, port, app_module.app, threaded=True, fd=sock.fileno())
+
+    def stop(signum, frame):
+        # shutdown() waits for serve_forever to return, so it cannot run on this (the serving) thread
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    server.serve_forever()
+
+
+def _spawn(app_module, sock, host, port):
+    pid = os.fork()
+    if pid:
+        return pid
+    code = 0
+    try:
+        _serve_worker(app_module, sock, host, port)
+    except BaseException as e:
+        print(f"Worker {os.getpid()} stopped: {e!r}")
+        code = 1
+    finally:
+        sys.stdout.flush()
+        os._exit(code)
+
+
+# --- 2. Master ---
+def main(host='127.0.0.1', port=5000, workers=os.cpu_count() or 1, backlog=1024):
+    os.environ['APP_PREFORK'] = '1'
+    if workers > 1:
+        # Jobs held in one worker's memory could not be polled through another
+        os.environ.setdefault('JOB_QUEUE_BACKEND', 'sqlite')
+
+    sock = socket.create_server((host, port), backlog=backlog)
+    sock.set_inheritable(True)
+    # Every worker wakes for a new connection but only one gets it; non-blocking, the others'
+    # accept() fails with EAGAIN (ignored by the server) instead of hanging and blocking shutdown.
+    sock.setblocking(False)
+
+    started = time.perf_counter()
+    import app as app_module  # loads and warms every model (APP_PREFORK runs the warm-up synchronously)
+    # Keep the collector from touching (and so copying) the preloaded objects in every worker
+    gc.collect()
+    gc.freeze()
+    print(f"Master {os.getpid()} ready in {time.perf_counter() - started:.1f}s; "
+          f"starting {workers} worker(s) on http://{host}:{sock.getsockname()[1]}")
+
+    children = {}  # pid -> start time
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for _ in range(workers):
+        children[_spawn(app_module, sock, host, port)] = time.monotonic()
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        born = children.pop(pid, None)
+        if stopping or born is None:
+            continue
+        print(f"Worker {pid} exited (status {status}); starting a replacement.")
+        if time.monotonic() - born < RESPAWN_BACKOFF:
+            time.sleep(RESPAWN_BACKOFF)
+        children[_spawn(app_module, sock, host, port)] = time.monotonic()
+    sock.close()
+    print("All workers stopped.")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Serve the app from pre-forked worker processes.")
+    parser.add_argument('--host', default='127.0.0.1', help="Address to listen on (default: %(default)s)")
+    parser.add_argument('--port', type=int, default=5000, help="Port to listen on; 0 picks a free one (default: %(default)s)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="Worker processes (default: %(default)s)")
+    args = parser.parse_args()
+    main(args.host, args.port, args.workers)
@@ -0,0 +1,60 @@
+// Loads an entry's Gemini texts when it is expanded on the history page.
+document.addEventListener("DOMContentLoaded", () => {
+  // Same filters the page used when every entry was rendered in full
+  function usable(text, extraSkip) {
+    return text && !text.includes('Error') && !(extraSkip && text.includes(extraSkip));
+  }
+
+  function section(title, text, italic) {
+    const div = document.createElement('div');
+    div.className = 'mt-2';
+    const strong = document.createElement('strong');
+    strong.textContent = title;
+    const p = document.createElement('p');
+    if (italic) {
+      p.className = 'mb-0 fst-italic';
+      p.textContent = `"${text}"`;
+    } else {
+      p.style.whiteSpace = 'pre-wrap';
+      p.textContent = text;
+    }
+    div.append(strong, p);
+    return div;
+  }
+
+  function render(container, entry) {
+    container.innerHTML = '';
+    if (usable(entry.gen_ai_assessment)) {
+      container.appendChild(section('AI Assessment:', entry.gen_ai_assessment, true));
+    }
+    if (usable(entry.resume_jd_comparison, 'No job description')) {
+      container.appendChild(section('Resume vs. Job Description Analysis:', entry.resume_jd_comparison));
+    }
+    if (usable(entry.improvement_suggestions)) {
+      container.appendChild(section('Improvement Suggestions:', entry.improvement_suggestions));
+    }
+    if (!container.children.length) {
+      container.appendChild(section('AI Analysis:', 'No AI analysis was recorded for this entry.'));
+    }
+  }
+
+  document.querySelectorAll('.history-details-toggle').forEach((button) => {
+    const container = button.nextElementSibling;
+    let loaded = false;
+    button.addEventListener('click', async () => {
+      const hidden = container.classList.toggle('d-none');
+      button.textContent = hidden ? 'Show AI analysis' : 'Hide AI analysis';
+      if (hidden || loaded) return;
+      container.textContent = 'Loading...';
+      try {
+        const response = await fetch(button.dataset.entryUrl, { headers: { 'Accept': 'application/json' } });
+        if (!response.ok) throw new Error(`HTTP ${response.status}`);
+        render(container, await response.json());
+        loaded = true;
+      } catch (err) {
+        console.error('[history.js] failed to load entry', err);
+        container.textContent = 'Could not load the AI analysis. Please try again.';
+      }
+    });
+  });
+});
@@ -7,7 +7,7 @@ if (window.__hh_upload_initialized) {
   // Original file contents below...
   document.addEventListener("DOMContentLoaded", () => {
     console.log('[upload.js] DOMContentLoaded — upload script initialized');
-    // --- Form submit handler (populates structured results, typewriter) ---
+    // --- Form submit handler (streams results into the card as they arrive) ---
     const form = document.getElementById("classify-form");
     const resultContainer = document.getElementById("result-container");
     const resultPlaceholder = document.getElementById("result-placeholder");
@@ -17,6 +17,8 @@ if (window.__hh_upload_initialized) {
     const genaiText = document.getElementById('result-genai-text');
     const jdText = document.getElementById('result-jd-text');
     const improvementEl = document.getElementById('improvement-suggestions');
+    const bestFitEl = document.getElementById('result-best-fit');
+    const bestFitList = document.getElementById('result-best-fit-list');
 
     function setBadge(badgeEl, prediction) {
       if (!badgeEl) return;
@@ -27,20 +29,43 @@ if (window.__hh_upload_initialized) {
       badgeEl.appendChild(span);
     }
 
-    function typewriter(element, text, speed = 18) {
-      if (!element) return Promise.resolve();
-      element.textContent = '';
-      let i = 0;
-      return new Promise((resolve) => {
-        const timer = setInterval(() => {
-          element.textContent += text.charAt(i);
-          i++;
-          if (i >= text.length) {
-            clearInterval(timer);
-            resolve();
-          }
-        }, speed);
+    function renderBestFit(roles) {
+      if (!bestFitEl || !bestFitList) return;
+      bestFitList.innerHTML = '';
+      if (!Array.isArray(roles) || roles.length === 0) {
+        bestFitEl.classList.add('d-none');
+        return;
+      }
+      roles.forEach((entry) => {
+        const li = document.createElement('li');
+        li.textContent = `${entry.role} — ${(entry.select_probability * 100).toFixed(1)}% Select`;
+        bestFitList.appendChild(li);
       });
+      bestFitEl.classList.remove('d-none');
+    }
+
+    // Parses a text/event-stream response body and calls onEvent(event, data) per frame
+    async function readEventStream(response, onEvent) {
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+          const frame = buffer.slice(0, boundary);
+          buffer = buffer.slice(boundary + 2);
+          let event = 'message';
+          let data = '';
+          frame.split('\n').forEach((line) => {
+            if (line.startsWith('event:')) event = line.slice(6).trim();
+            else if (line.startsWith('data:')) data += line.slice(5).trim();
+          });
+          if (data) onEvent(event, JSON.parse(data));
+        }
+      }
     }
 
     if (form) {
@@ -49,30 +74,71 @@ if (window.__hh_upload_initialized) {
         if (resultPlaceholder) resultPlaceholder.classList.add('d-none');
         if (improvementEl) improvementEl.textContent = '';
 
-        const jobRole = document.getElementById('job-role').value;
+        const jobRole = document.getElementById('job-role').value.trim();
         const jobDescription = document.getElementById('job-description').value;
         const resumeText = document.getElementById('resume-text').value;
 
+        const bestFitToggle = document.getElementById('best-fit');
+
         const payload = { job_role: jobRole, job_description: jobDescription, resume_text: resumeText };
+        // Ranking every role costs a pass over all models, so only when there is no role or the user asks
+        if (!jobRole || (bestFitToggle && bestFitToggle.checked)) {
+          payload.best_fit = true;
+          payload.top_k = 5;
+        }
+
+        if (genaiText) genaiText.textContent = 'Waiting for AI assessment...';
+        if (jdText) jdText.textContent = '';
+        if (confEl) confEl.textContent = 'Confidence: --';
+        renderBestFit(null);
+        const nearDuplicateNote = document.getElementById('result-near-duplicate');
+        if (nearDuplicateNote) nearDuplicateNote.classList.add('d-none');
+
+        // Each streamed event fills in its part of the result card as soon as it arrives
+        const handlers = {
+          best_fit_roles: (data) => renderBestFit(data.best_fit_roles),
+          ml: (data) => {
+            if (roleEl) roleEl.textContent = data.role || jobRole;
+            setBadge(badgeEl, data.ml_prediction || 'Reject');
+            if (confEl) confEl.textContent = data.error ? data.error : `Confidence: ${data.ml_confidence || '--'}`;
+            if (resultContainer) resultContainer.classList.remove('d-none');
+          },
+          assessment: (data) => {
+            if (genaiText) genaiText.textContent = data.gen_ai_assessment || '';
+            if (confEl && data.ml_confidence) confEl.textContent = `Confidence: ${data.ml_confidence}`;
+          },
+          jd_comparison: (data) => { if (jdText) jdText.textContent = data.resume_jd_comparison || ''; },
+          suggestions_delta: (data) => {
+            if (improvementEl) improvementEl.textContent += data.text;
+          },
+          // The complete text replaces the streamed chunks (also covers timeouts and errors)
+          suggestions: (data) => {
+            if (improvementEl) improvementEl.textContent = data.improvement_suggestions || 'No suggestions available.';
+          },
+          done: (data) => {
+            const note = document.getElementById('result-near-duplicate');
+            if (!note || !data.near_duplicate) return;
+            const similarity = Math.round(data.near_duplicate.similarity * 100);
+            note.textContent = data.near_duplicate.reused.length
+              ? `Near-duplicate of an earlier submission (${similarity}% similar); its AI analysis was reused.`
+              : `Near-duplicate of an earlier submission (${similarity}% similar).`;
+            note.classList.remove('d-none');
+          },
+        };
 
         try {
-          const response = await fetch('/classify', {
+          const response = await fetch('/classify_stream', {
             method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify(payload)
           });
-          const result = await response.json();
-
-          if (roleEl) roleEl.textContent = result.role || jobRole;
-          setBadge(badgeEl, (result && result.ml_prediction) ? result.ml_prediction : 'Reject');
-          if (confEl) confEl.textContent = `Confidence: ${result.ml_confidence || '--'}`;
-          if (genaiText) genaiText.textContent = result.gen_ai_assessment || '';
-          if (jdText) jdText.textContent = result.resume_jd_comparison || '';
-
-          if (improvementEl) {
-            const suggestions = result.improvement_suggestions || 'No suggestions available.';
-            await typewriter(improvementEl, suggestions, 18);
+          if (!response.ok || !response.body) {
+            const result = await response.json();
+            if (resultContainer) resultContainer.classList.remove('d-none');
+            if (improvementEl) improvementEl.textContent = `Error: ${result.error || response.statusText}`;
+            return;
           }
-
-          if (resultContainer) resultContainer.classList.remove('d-none');
+          await readEventStream(response, (event, data) => {
+            if (handlers[event]) handlers[event](data);
+          });
         } catch (err) {
           if (resultContainer) resultContainer.classList.remove('d-none');
           if (improvementEl) improvementEl.textContent = 'Error: Could not connect to server. Is app.py running?';
@@ -0,0 +1,38 @@
+import contextlib
+import io
+import os
+import shutil
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODEL_DIR = os.path.join(ROOT, "saved_models")
+
+# The app's modules live at the repository root, not in a package
+sys.path.insert(0, ROOT)
+# Never touch the real Gemini API or the working directory's cache file
+os.environ.pop('API_KEY', None)
+os.environ.setdefault('GENAI_CACHE_PATH', 'off')
+
+BUNDLE_ROLES = ("software_engineer", "data_scientist", "ui_designer")
+
+
+@pytest.fixture
+def bundle_dir(tmp_path):
+    """A few trained roles from saved_models copied to tmp_path and exported as a bundle there."""
+    from model_bundle import export_bundle
+    for role in BUNDLE_ROLES:
+        for kind in ("model", "vectorizer"):
+            shutil.copy2(os.path.join(MODEL_DIR, f"{role}_{kind}.joblib"), tmp_path)
+    export_bundle(str(tmp_path))
+    return str(tmp_path)
+
+
+@pytest.fixture(scope="session")
+def flask_app(tmp_path_factory):
+    """The app module, imported once with its user database in a temporary directory."""
+    os.environ.setdefault('USER_DB_FILE', str(tmp_path_factory.mktemp("app") / "users.db"))
+    with contextlib.redirect_stdout(io.StringIO()):
+        import app
+    return app
@@ -0,0 +1,90 @@
+import contextlib
+import csv
+import io
+
+import pytest
+
+import bulk_score
+import predict
+from genai_cache import GenAICache
+
+RESUMES = [
+    f"Engineer {i}: built python services on aws with docker, kubernetes and terraform; award {i}" for i in range(7)
+]
+
+
+def _input_csv(tmp_path):
+    path = tmp_path / "resumes.csv"
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Resume", "Role"])
+        writer.writerows([resume, "Software Engineer"] for resume in RESUMES)
+    return str(path)
+
+
+def _score(input_path, output_path, **options):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return bulk_score.main(input_path, output_path, chunk_size=2, **options)
+
+
+def _read(path):
+    with open(path, newline="") as f:
+        return list(csv.DictReader(f))
+
+
+def test_interrupted_run_resumes_to_the_same_output(tmp_path, monkeypatch):
+    input_path = _input_csv(tmp_path)
+    _score(input_path, str(tmp_path / "fresh.csv"))
+
+    score_chunk = bulk_score.score_chunk
+
+    def interrupted(start, records, options):
+        if start >= 4:
+            raise KeyboardInterrupt
+        return score_chunk(start, records, options)
+
+    output_path = str(tmp_path / "resumed.csv")
+    monkeypatch.setattr(bulk_score, "score_chunk", interrupted)
+    with pytest.raises(SystemExit):
+        _score(input_path, output_path)
+    assert len(_read(output_path)) == 4
+
+    monkeypatch.setattr(bulk_score, "score_chunk", score_chunk)
+    summary = _score(input_path, output_path)
+    assert summary["rows_scored"] == 3 and summary["rows_total"] == 7
+    assert _read(output_path) == _read(str(tmp_path / "fresh.csv"))
+
+
+def test_checkpoint_from_other_options_is_refused(tmp_path):
+    input_path = _input_csv(tmp_path)
+    output_path = str(tmp_path / "scored.csv")
+    _score(input_path, output_path)
+    with pytest.raises(SystemExit):
+        _score(input_path, output_path, role="Data Scientist")
+
+
+def test_best_fit_ranks_each_chunk_in_one_call(tmp_path, monkeypatch):
+    calls = []
+    rank_roles_batch = predict.rank_roles_batch
+    monkeypatch.setattr(predict, "rank_roles", lambda *args, **kwargs: pytest.fail("ranked one record at a time"))
+    monkeypatch.setattr(predict, "rank_roles_batch",
+                        lambda texts, top_k: calls.append(len(texts)) or rank_roles_batch(texts, top_k))
+    output_path = str(tmp_path / "scored.csv")
+    _score(_input_csv(tmp_path), output_path, best_fit=True)
+    assert calls == [2, 2, 2, 1]
+    expected = [ranked[0]["role"] for ranked in rank_roles_batch(RESUMES, top_k=1)]
+    assert [row["role"] for row in _read(output_path)] == expected
+
+
+def test_cached_genai_confidence_is_the_same_on_every_run(tmp_path, monkeypatch):
+    cache = GenAICache(None)
+    monkeypatch.setattr(predict, "genai_cache", cache)
+    for resume in RESUMES:
+        cache.put(predict._cache_key("assessment", "Software Engineer", resume), "assessment",
+                  "Match: Strong\nConfidence: 0.9\nSummary: solid")
+    input_path = _input_csv(tmp_path)
+    _score(input_path, str(tmp_path / "first.csv"), genai="cache")
+    _score(input_path, str(tmp_path / "second.csv"), genai="cache")
+    first = _read(str(tmp_path / "first.csv"))
+    assert first == _read(str(tmp_path / "second.csv"))
+    assert all(row["gen_ai_assessment"] for row in first)
@@ -0,0 +1,30 @@
+import pytest
+
+from features import (clean_text_aggressively, extract_features, extract_features_batch, has_honors_or_certs,
+                      has_portfolio_link)
+
+TEXTS = [
+    "Won an AWARD in 2020; see https://example.dev",
+    "Awards and awarded do not count, award_2 neither, but (Patent) does",
+    "Portfolio at WWW.example.com",
+    "HTTP://old.example.org and honor-roll",
+    "certificate2 certification-",
+    "Résumé with Fellowship and straße www.example.de",
+    "nothing to flag here",
+    "",
+]
+
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_single_pass_flags_match_the_regex_helpers(text):
+    name_words = {"example"}
+    assert extract_features(text, name_words) == (
+        clean_text_aggressively(text, name_words), has_portfolio_link(text), has_honors_or_certs(text)
+    )
+
+
+def test_batch_matches_single_documents():
+    cleaned, flags = extract_features_batch(TEXTS + [None])
+    for row, text in enumerate(TEXTS + [None]):
+        expected = extract_features(text)
+        assert cleaned[row] == expected[0] and tuple(flags[row]) == expected[1:]
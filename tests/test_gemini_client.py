@@ -0,0 +1,111 @@
+import httpx
+import pytest
+
+from gemini_client import (CircuitBreaker, DeadlineExceeded, ResilientGeminiClient, call_deadline,
+                           is_retryable, _with_http_timeout)
+
+
+class FakeClock:
+    """Manual clock; sleep() advances it and records the delay."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def _client(breaker=None, max_retries=2, clock=None):
+    clock = clock or FakeClock()
+    return ResilientGeminiClient(object(), rate_per_second=1000, burst=1000, max_retries=max_retries,
+                                 backoff_base=1.0, breaker=breaker, clock=clock, sleep=clock.sleep)
+
+
+def _failing(errors, result="ok", timeouts=None):
+    errors = list(errors)
+
+    def attempt(timeout):
+        if timeouts is not None:
+            timeouts.append(timeout)
+        if errors:
+            raise errors.pop(0)
+        return result
+    return attempt
+
+
+@pytest.mark.parametrize("error", [
+    httpx.ReadTimeout("read timed out"),
+    httpx.ConnectError("connection refused"),
+    httpx.RemoteProtocolError("server disconnected"),
+])
+def test_httpx_transport_errors_are_retryable(error):
+    assert is_retryable(error)
+
+
+def test_httpx_timeout_is_retried_through_call():
+    client = _client()
+    assert client._call(_failing([httpx.ReadTimeout("read timed out")])) == "ok"
+    stats = client.stats()
+    assert (stats["calls"], stats["retries"], stats["failures"]) == (2, 1, 1)
+    assert stats["breaker_state"] == "closed"
+
+
+def test_exhausted_httpx_timeouts_open_the_breaker():
+    client = _client(breaker=CircuitBreaker(failure_threshold=1, reset_timeout=60), max_retries=1)
+    with pytest.raises(httpx.ReadTimeout):
+        client._call(_failing([httpx.ReadTimeout("read timed out")] * 2))
+    assert client.stats()["breaker_state"] == "open"
+
+
+def test_non_retryable_error_is_not_a_breaker_failure():
+    client = _client(breaker=CircuitBreaker(failure_threshold=1, reset_timeout=60))
+    with pytest.raises(ValueError):
+        client._call(_failing([ValueError("bad request")]))
+    stats = client.stats()
+    assert (stats["calls"], stats["failures"], stats["breaker_state"]) == (1, 0, "closed")
+
+
+def test_call_past_its_deadline_makes_no_attempt():
+    clock = FakeClock()
+    client = _client(clock=clock)
+    with pytest.raises(DeadlineExceeded):
+        client._call(_failing([]), deadline=clock.now)
+    assert (client.stats()["calls"], client.stats()["expired"]) == (0, 1)
+
+
+def test_each_attempt_gets_the_time_left_before_the_deadline():
+    clock = FakeClock()
+    timeouts = []
+    client = _client(clock=clock)
+    assert client._call(_failing([httpx.ReadTimeout("slow")], timeouts=timeouts), deadline=clock.now + 10) == "ok"
+    assert timeouts[0] == 10 and timeouts[1] == pytest.approx(10 - clock.sleeps[0])
+
+
+def test_no_retry_whose_backoff_would_end_past_the_deadline():
+    clock = FakeClock()
+    client = _client(breaker=CircuitBreaker(failure_threshold=1, reset_timeout=60, clock=clock), clock=clock)
+    with pytest.raises(httpx.ReadTimeout):
+        client._call(_failing([httpx.ReadTimeout("slow")] * 3), deadline=clock.now + 0.2)
+    stats = client.stats()
+    assert (stats["calls"], stats["retries"], clock.sleeps) == (1, 0, [])
+    assert stats["breaker_state"] == "open"
+
+
+def test_call_deadline_applies_to_calls_on_the_same_thread():
+    clock = FakeClock()
+    client = _client(clock=clock)
+    with call_deadline(clock.now - 1):
+        with pytest.raises(DeadlineExceeded):
+            client._call(_failing([]))
+    assert client._call(_failing([])) == "ok"
+
+
+def test_http_timeout_is_added_to_the_request_config():
+    kwargs = _with_http_timeout({"model": "m", "config": {"response_mime_type": "application/json"}}, 2.5)
+    assert kwargs["config"] == {"response_mime_type": "application/json", "http_options": {"timeout": 2500}}
+    assert _with_http_timeout({"model": "m"}, None) == {"model": "m"}
@@ -0,0 +1,78 @@
+import sqlite3
+import threading
+
+from genai_cache import GenAICache, make_cache_key
+from prompt_compaction import PromptCompactor
+
+ARGS = ("assessment", "gemini-2.5-flash-lite", "Software Engineer", "resume text", "job description")
+
+
+def test_key_is_stable_and_case_insensitive_in_role():
+    assert make_cache_key(*ARGS) == make_cache_key(*ARGS)
+    assert make_cache_key("assessment", "gemini-2.5-flash-lite", "SOFTWARE ENGINEER", "resume text",
+                          "job description") == make_cache_key(*ARGS)
+
+
+def test_key_parts_do_not_run_together():
+    assert make_cache_key("a", "m", "r", "x", "bc") != make_cache_key("a", "m", "r", "x", "b", compaction="c")
+
+
+def test_compaction_settings_are_part_of_the_key():
+    fingerprints = {
+        PromptCompactor().fingerprint(),
+        PromptCompactor(resume_budget=400).fingerprint(),
+        PromptCompactor(job_description_budget=100).fingerprint(),
+        PromptCompactor(enabled=False).fingerprint(),
+    }
+    assert len(fingerprints) == 4
+    assert len({make_cache_key(*ARGS, compaction=fingerprint) for fingerprint in fingerprints}) == 4
+
+
+def _accessed_at(db_path, key):
+    with sqlite3.connect(db_path) as conn:
+        return conn.execute("SELECT accessed_at FROM genai_cache WHERE key = ?", (key,)).fetchone()[0]
+
+
+def test_disk_hits_write_access_times_in_batches(tmp_path):
+    db_path = str(tmp_path / "cache.sqlite3")
+    GenAICache(db_path).put("k", "assessment", "reply")
+    written = _accessed_at(db_path, "k")
+
+    cache = GenAICache(db_path, max_memory_entries=0, access_flush_every=3)
+    assert cache.get("k") == "reply" and cache.get("k") == "reply"
+    assert _accessed_at(db_path, "k") == written
+    assert cache.get("k") == "reply"
+    assert _accessed_at(db_path, "k") > written
+    assert cache.stats()["disk_hits"] == 3
+
+
+def test_trim_keeps_entries_whose_hits_are_still_pending(tmp_path):
+    cache = GenAICache(str(tmp_path / "cache.sqlite3"), max_memory_entries=0, max_rows=2, evict_every=1,
+                       access_flush_every=100)
+    cache.put("old", "assessment", "kept")
+    cache.put("newer", "assessment", "dropped")
+    assert cache.get("old") == "kept"
+    cache.put("newest", "assessment", "kept too")
+    assert cache.get("old") == "kept"
+    assert cache.get("newer") is None
+
+
+def test_threads_share_the_cache(tmp_path):
+    cache = GenAICache(str(tmp_path / "cache.sqlite3"), max_memory_entries=4, access_flush_every=5)
+    errors = []
+
+    def worker(worker_id):
+        try:
+            for i in range(50):
+                cache.put(f"{worker_id}-{i}", "assessment", str(i))
+                assert cache.get(f"{worker_id}-{i}") == str(i)
+        except Exception as e:  # surfaced below; an assert in a thread would be lost
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert cache.stats()["disk_entries"] == 200
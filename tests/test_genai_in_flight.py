@@ -0,0 +1,70 @@
+import threading
+import time
+
+import pytest
+
+import predict
+from gemini_client import DeadlineExceeded, current_deadline
+
+
+def test_submissions_past_the_in_flight_cap_fail_fast(monkeypatch):
+    monkeypatch.setattr(predict, "GENAI_MAX_IN_FLIGHT", 2)
+    release = threading.Event()
+    running = [predict.submit_genai(release.wait, 10) for _ in range(2)]
+    try:
+        refused = predict.submit_genai(lambda: "never runs")
+        assert refused.done()
+        with pytest.raises(predict.GenAIBusyError):
+            refused.result()
+        assert predict.genai_in_flight() == 2
+    finally:
+        release.set()
+    for future in running:
+        future.result(timeout=5)
+    assert predict.genai_in_flight() == 0
+
+
+def test_stuck_calls_make_classification_ml_only(monkeypatch):
+    monkeypatch.setattr(predict, "GENAI_MAX_IN_FLIGHT", 1)
+    monkeypatch.setattr(predict, "client", type("Client", (), {"is_open": lambda self: False})())
+    release = threading.Event()
+    stuck = predict.submit_genai(release.wait, 10)
+    try:
+        assert predict._genai_unavailable_reason().startswith("Gen AI busy")
+    finally:
+        release.set()
+    stuck.result(timeout=5)
+    assert predict._genai_unavailable_reason() is None
+
+
+def test_calls_run_under_their_callers_deadline():
+    deadline = time.monotonic() + 30
+    assert predict.submit_genai(current_deadline, deadline=deadline).result(timeout=5) == deadline
+
+
+def test_work_still_queued_at_the_deadline_is_skipped():
+    ran = []
+    future = predict.submit_genai(ran.append, "ran", deadline=time.monotonic() - 1)
+    with pytest.raises(DeadlineExceeded):
+        future.result(timeout=5)
+    assert ran == []
+
+
+def test_closing_the_stream_stops_the_suggestions_producer(monkeypatch):
+    monkeypatch.setattr(predict, "client", type("Client", (), {"is_open": lambda self: False})())
+    monkeypatch.setattr(predict, "get_gen_ai_assessment", lambda *args: {"gen_ai_assessment": "ok"})
+    monkeypatch.setattr(predict, "get_resume_jd_comparison", lambda *args: {"resume_jd_comparison": "ok"})
+    stopped = threading.Event()
+
+    def stream_suggestions(resume_text, job_role, on_text, stop):
+        on_text("first chunk")
+        if stop.wait(10):
+            stopped.set()
+        return {"improvement_suggestions": "first chunk"}
+
+    monkeypatch.setattr(predict, "stream_resume_improvement_suggestions", stream_suggestions)
+    events = predict.classify_resume_stream("Python developer with AWS experience.", "Software Engineer",
+                                            genai_timeout=10)
+    assert next(events)[0] == 'ml'
+    events.close()  # what the server does when the client disconnects
+    assert stopped.wait(5)
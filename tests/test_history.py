@@ -0,0 +1,57 @@
+import pytest
+
+from user_store import UserStore
+
+
+def _entry(i):
+    return {'timestamp': f"2026-01-01 00:00:{i:02d}", 'job_role': f"Role {i}", 'ml_prediction': 'Select',
+            'ml_confidence': '90.00%', 'gen_ai_assessment': f"Assessment {i}"}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = UserStore(str(tmp_path / "users.db"))
+    for email in ("ann@example.com", "bob@example.com"):
+        store.create_user(email, "x", email.split("@")[0])
+    store.add_history_many('1', [_entry(i) for i in range(7)])
+    store.add_history_many('2', [_entry(i) for i in range(3)])
+    return store
+
+
+def test_pages_walk_the_history_newest_first_exactly_once(store):
+    seen, cursor = [], None
+    while True:
+        entries, cursor = store.get_history_page('1', before_id=cursor, limit=3)
+        assert len(entries) <= 3
+        seen.extend(entry['job_role'] for entry in entries)
+        if cursor is None:
+            break
+    assert seen == [f"Role {i}" for i in reversed(range(7))]
+
+
+def test_last_full_page_has_no_cursor(store):
+    entries, cursor = store.get_history_page('2', limit=3)
+    assert len(entries) == 3 and cursor is None
+
+
+def test_pages_carry_summaries_and_entries_stay_private(store):
+    entries, _ = store.get_history_page('1', limit=1)
+    assert 'gen_ai_assessment' not in entries[0]
+    assert store.get_history_entry('1', entries[0]['id'])['gen_ai_assessment'] == "Assessment 6"
+    assert store.get_history_entry('2', entries[0]['id']) is None
+
+
+def test_history_entries_route_follows_next_url(flask_app):
+    user_id = flask_app.user_store.create_user("pages@example.com", "x", "Pages")
+    flask_app.user_store.add_history_many(user_id, [_entry(i) for i in range(5)])
+    client = flask_app.app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = user_id
+
+    roles, url = [], "/history/entries?limit=2"
+    while url:
+        page = client.get(url).get_json()
+        roles.extend(entry['job_role'] for entry in page['entries'])
+        url = page['next_url']
+    assert roles == [f"Role {i}" for i in reversed(range(5))]
+    assert client.get("/history/entries?limit=0").get_json()['entries'][0]['job_role'] == "Role 4"
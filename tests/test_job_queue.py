@@ -0,0 +1,50 @@
+import time
+
+from job_queue import JobQueue, SQLiteJobBackend
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_jobs_interrupted_by_a_restart_are_requeued_and_run(tmp_path):
+    db_path = str(tmp_path / "jobs.sqlite3")
+    crashed = JobQueue(lambda payload: payload, SQLiteJobBackend(db_path))
+    job_id = crashed.submit("1", {"n": 1})
+    crashed.backend.claim(time.time() - 3600)  # claimed long ago by a process that died
+
+    completed = []
+    queue = JobQueue(lambda payload: {"doubled": payload["n"] * 2}, SQLiteJobBackend(db_path, stale_seconds=60),
+                     workers=1, poll_interval=0.01, on_complete=completed.append)
+    queue.start()
+    try:
+        _wait_for(lambda: queue.get(job_id)['status'] == 'done')
+        _wait_for(lambda: completed)
+    finally:
+        queue.stop(timeout=5)
+    assert queue.get(job_id)['result'] == {"doubled": 2}
+    assert [job['id'] for job in completed] == [job_id]
+
+
+def test_recently_claimed_jobs_are_not_requeued(tmp_path):
+    backend = SQLiteJobBackend(str(tmp_path / "jobs.sqlite3"), stale_seconds=60)
+    job_id = JobQueue(lambda payload: payload, backend).submit("1", {})
+    backend.claim(time.time())
+    assert backend.requeue_running() == 0
+    assert backend.get(job_id)['status'] == 'running'
+
+
+def test_completion_hook_runs_after_the_job_is_finished(tmp_path):
+    seen = []
+    queue = JobQueue(lambda payload: "ok", SQLiteJobBackend(str(tmp_path / "jobs.sqlite3")), workers=1,
+                     poll_interval=0.01, on_complete=lambda job: seen.append(queue.get(job['id'])['status']))
+    queue.start()
+    try:
+        queue.submit("1", {})
+        _wait_for(lambda: seen)
+    finally:
+        queue.stop(timeout=5)
+    assert seen == ['done']
@@ -0,0 +1,8 @@
+import predict
+
+
+def test_metrics_scrape_does_not_create_the_gemini_client(flask_app, monkeypatch):
+    monkeypatch.setattr(predict, "client", predict._CLIENT_UNSET)
+    body = flask_app.app.test_client().get("/metrics").get_data(as_text=True)
+    assert predict.client is predict._CLIENT_UNSET
+    assert "resume_genai_client_events_total" not in body
@@ -0,0 +1,78 @@
+import os
+import threading
+
+import model_bundle
+from model_bundle import BundleLoader, export_bundle
+
+
+def _touch(path):
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_bundle_is_opened_once_and_kept_while_the_pointer_is_unchanged(bundle_dir):
+    loader = BundleLoader(bundle_dir)
+    bundle = loader.get()
+    assert bundle is not None and bundle.has_role("Software Engineer")
+    # Retraining a role without re-exporting does not touch the served bundle
+    _touch(os.path.join(bundle_dir, "software_engineer_model.joblib"))
+    assert loader.get() is bundle
+
+
+def test_replaced_pointer_reopens_the_bundle(bundle_dir):
+    loader = BundleLoader(bundle_dir)
+    before = loader.get()
+    export_bundle(bundle_dir)
+    _touch(os.path.join(bundle_dir, "bundle.json"))
+    after = loader.get()
+    assert after is not None and after is not before
+
+
+def test_removed_pointer_drops_the_bundle(bundle_dir):
+    loader = BundleLoader(bundle_dir)
+    assert loader.get() is not None
+    os.remove(os.path.join(bundle_dir, "bundle.json"))
+    assert loader.get() is None
+
+
+def test_concurrent_first_gets_open_the_bundle_once(bundle_dir, monkeypatch):
+    opened = []
+    original = model_bundle.ModelBundle
+
+    def counting_bundle(path):
+        opened.append(path)
+        return original(path)
+
+    monkeypatch.setattr(model_bundle, "ModelBundle", counting_bundle)
+    loader = BundleLoader(bundle_dir)
+    barrier = threading.Barrier(8)
+    results = []
+
+    def worker():
+        barrier.wait()
+        results.append(loader.get())
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(opened) == 1
+    assert all(result is results[0] for result in results)
+
+
+def test_concurrent_scorer_builds_share_one_scorer(bundle_dir):
+    bundle = BundleLoader(bundle_dir).get()
+    barrier = threading.Barrier(8)
+    scorers = []
+
+    def worker():
+        barrier.wait()
+        scorers.append(bundle.role_scorer("Data Scientist"))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert all(scorer is scorers[0] for scorer in scorers)
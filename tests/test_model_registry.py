@@ -0,0 +1,49 @@
+import joblib
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+
+from model_registry import ModelRegistry
+
+DOCS = ["python kubernetes docker", "figma typography sketch", "python golang docker", "sketch wireframes figma"]
+
+
+def _pair(training_id):
+    """A two-term-vocabulary role trained on DOCS, stamped the way main.py stamps its artifacts."""
+    vectorizer = TfidfVectorizer(max_features=2).fit(DOCS)
+    features = vectorizer.transform(DOCS).toarray()
+    model = LogisticRegression().fit([list(row) + [0, 0] for row in features], [1, 0, 1, 0])
+    model.training_id_ = vectorizer.training_id_ = training_id
+    return model, vectorizer
+
+
+def _save(model_dir, model=None, vectorizer=None):
+    if vectorizer is not None:
+        joblib.dump(vectorizer, model_dir / "engineer_vectorizer.joblib")
+    if model is not None:
+        joblib.dump(model, model_dir / "engineer_model.joblib")
+
+
+def test_pair_from_one_training_run_loads(tmp_path):
+    model, vectorizer = _pair("run-1")
+    _save(tmp_path, model, vectorizer)
+    loaded_model, loaded_vectorizer = ModelRegistry(str(tmp_path)).get("Engineer")
+    assert loaded_model.training_id_ == loaded_vectorizer.training_id_ == "run-1"
+
+
+def test_new_vectorizer_beside_old_model_is_rejected_even_with_equal_vocabulary_size(tmp_path):
+    old_model, old_vectorizer = _pair("run-1")
+    _, new_vectorizer = _pair("run-2")
+    _save(tmp_path, old_model, new_vectorizer)
+    with pytest.raises(RuntimeError):
+        ModelRegistry(str(tmp_path)).get("Engineer")
+
+
+def test_registry_keeps_serving_the_previous_pair_mid_update(tmp_path):
+    old_model, old_vectorizer = _pair("run-1")
+    _save(tmp_path, old_model, old_vectorizer)
+    registry = ModelRegistry(str(tmp_path))
+    registry.get("Engineer")
+    _save(tmp_path, vectorizer=_pair("run-2")[1])
+    model, vectorizer = registry.get("Engineer")
+    assert model.training_id_ == vectorizer.training_id_ == "run-1"
@@ -0,0 +1,144 @@
+import contextlib
+import io
+import random
+
+import pytest
+
+import predict
+from features import clean_text_aggressively
+from genai_cache import GenAICache, text_digest
+from near_duplicates import NearDuplicateIndex, minhash, near_duplicate_mode_from_env, scope_hash
+
+ROLE = "Software Engineer"
+RESUME = "Experience\n" + "\n".join(
+    f"- Built service {i} in python with kubernetes, docker and terraform for team {i * 7}" for i in range(30)
+)
+EDITED = RESUME.replace("service 3 ", "service three ")
+MONTHS = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+
+
+class Resumes:
+    """Bulleted resumes over made-up words, and lightly edited copies of them."""
+
+    def __init__(self, seed=3):
+        self.rng = random.Random(seed)
+        self.vocabulary = ["".join(self.rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(self.rng.randint(4, 9)))
+                           for _ in range(3000)]
+
+    def _date(self):
+        return f"{self.rng.choice(MONTHS)} {self.rng.randint(2008, 2024)}"
+
+    def bullets(self):
+        return [" ".join(self.rng.choices(self.vocabulary, k=self.rng.randint(8, 20))) for _ in range(25)]
+
+    def text(self, bullets):
+        return "Experience\n" + "\n".join(f"- {bullet} ({self._date()} - {self._date()})" for bullet in bullets)
+
+    def edited(self, bullets, replaced_words=2):
+        """Bullets reordered, dates changed and a few words replaced."""
+        bullets = list(bullets)
+        self.rng.shuffle(bullets)
+        for _ in range(replaced_words):
+            line = self.rng.randrange(len(bullets))
+            words = bullets[line].split()
+            words[self.rng.randrange(len(words))] = self.rng.choice(self.vocabulary)
+            bullets[line] = " ".join(words)
+        return self.text(bullets)
+
+
+def _signature(text):
+    return minhash(clean_text_aggressively(text))
+
+
+@pytest.fixture
+def pairs():
+    """(original text, edited copy) for 40 resumes."""
+    resumes = Resumes()
+    result = []
+    for _ in range(40):
+        bullets = resumes.bullets()
+        result.append((resumes.text(bullets), resumes.edited(bullets)))
+    return result
+
+
+def _index_of(texts, min_similarity=0.8, job_role=ROLE):
+    index = NearDuplicateIndex(max_entries=1000, min_similarity=min_similarity)
+    for text in texts:
+        index.add(_signature(text), scope_hash(job_role), text_digest(text))
+    return index
+
+
+def test_edited_copies_match_their_original_above_the_threshold(pairs):
+    index = _index_of([original for original, _ in pairs])
+    for original, edited in pairs:
+        match = index.query(_signature(edited), scope_hash(ROLE))
+        assert match is not None and match[0] == text_digest(original)
+        assert match[1] >= 0.8
+
+
+def test_unrelated_resumes_never_match(pairs):
+    index = _index_of([original for original, _ in pairs])
+    resumes = Resumes(seed=11)
+    assert all(index.query(_signature(resumes.text(resumes.bullets())), scope_hash(ROLE)) is None for _ in range(100))
+
+
+def test_match_needs_at_least_min_similarity(pairs):
+    original, edited = pairs[0]
+    similarity = _index_of([original], min_similarity=0.5).query(_signature(edited), scope_hash(ROLE))[1]
+    assert similarity < 1.0
+    assert _index_of([original], min_similarity=similarity).query(_signature(edited), scope_hash(ROLE)) is not None
+    assert _index_of([original], min_similarity=similarity + 1 / 64).query(_signature(edited), scope_hash(ROLE)) is None
+
+
+def test_matches_stay_within_role_and_job_description(pairs):
+    original, edited = pairs[0]
+    index = _index_of([original])
+    assert index.query(_signature(edited), scope_hash("Data Scientist")) is None
+    assert index.query(_signature(edited), scope_hash(ROLE, "Python on AWS")) is None
+
+
+@pytest.mark.parametrize("min_similarity", [0.7, 0.8, 0.9])
+def test_banding_finds_pairs_at_the_threshold_with_95_percent_probability(min_similarity):
+    stats = NearDuplicateIndex(max_entries=10, min_similarity=min_similarity).stats()
+    assert 1 - (1 - min_similarity ** stats["rows_per_band"]) ** stats["bands"] >= 0.95
+
+
+def test_default_mode_only_flags(monkeypatch):
+    monkeypatch.delenv("NEAR_DUP_MODE", raising=False)
+    assert near_duplicate_mode_from_env() == "flag"
+
+
+def test_cache_only_batch_flags_but_never_copies_replies(monkeypatch):
+    cache = GenAICache(None)
+    monkeypatch.setattr(predict, "genai_cache", cache)
+    monkeypatch.setattr(predict, "NEAR_DUP_MODE", "reuse")
+    monkeypatch.setattr(predict, "near_duplicate_index", NearDuplicateIndex(max_entries=100))
+    cache.put(predict._cache_key("assessment", ROLE, RESUME), "assessment",
+              "Match: Strong\nSummary: earlier candidate")
+
+    items = [{"resume_text": RESUME, "job_role": ROLE}, {"resume_text": EDITED, "job_role": ROLE}]
+    with contextlib.redirect_stdout(io.StringIO()):
+        first, second = predict.classify_resumes(items, include_genai=True, genai_cache_only=True)
+
+    assert "gen_ai_assessment" in first
+    assert second["near_duplicate"]["reused"] == []
+    assert "gen_ai_assessment" not in second
+    assert cache.get(predict._cache_key("assessment", ROLE, EDITED)) is None
+
+
+def test_index_grows_with_its_entries_and_then_wraps():
+    index = NearDuplicateIndex(max_entries=300, initial_capacity=64)
+    empty_bytes = index.stats()["memory_bytes"]
+    resumes = Resumes(seed=5)
+    texts = [resumes.text(resumes.bullets()) for _ in range(400)]
+    for count, text in enumerate(texts[:300], start=1):
+        index.add(_signature(text), scope_hash(ROLE), text_digest(text))
+        assert index.stats()["capacity"] >= count
+    assert index.stats()["capacity"] == 300 and index.stats()["memory_bytes"] > empty_bytes
+    assert all(index.query(_signature(text), scope_hash(ROLE))[0] == text_digest(text) for text in texts[:300])
+
+    for text in texts[300:]:
+        index.add(_signature(text), scope_hash(ROLE), text_digest(text))
+    assert index.stats()["capacity"] == 300
+    assert index.query(_signature(texts[0]), scope_hash(ROLE)) is None
+    assert index.query(_signature(texts[-1]), scope_hash(ROLE))[0] == text_digest(texts[-1])
@@ -0,0 +1,47 @@
+import os
+
+import pandas as pd
+
+import predict
+from online_learning import OnlineLearner, bootstrap, bootstrap_role
+
+SKILLS = "python kubernetes golang microservices".split()
+FILLER = "team project delivered worked managed".split()
+
+
+def _resume(i, selected):
+    words = [SKILLS[i % len(SKILLS)] if selected and j % 3 == 0 else FILLER[(i + j) % len(FILLER)] for j in range(40)]
+    return "Experience: " + " ".join(words)
+
+
+def _rows(count):
+    return [(_resume(i, i % 2 == 0), int(i % 2 == 0)) for i in range(count)]
+
+
+def test_bootstrap_groups_roles_case_insensitively(tmp_path):
+    rows = _rows(120)
+    frame = pd.DataFrame({
+        'Name': [f"Candidate {i}" for i in range(len(rows))],
+        'Role': ["Data Scientist" if i % 2 else "data scientist" for i in range(len(rows))],
+        'Resume': [text for text, _ in rows],
+        'decision': ["select" if label else "reject" for _, label in rows],
+    })
+    csv_file = tmp_path / "dataset.csv"
+    frame.to_csv(csv_file, index=False)
+    results = bootstrap(str(csv_file), str(tmp_path / "online"), epochs=2)
+    assert [result['Role'] for result in results] == ["data scientist"]
+    assert os.listdir(tmp_path / "online") == ["data_scientist_online.joblib"]
+
+
+def test_shadow_verdicts_reach_batch_and_stream_results(tmp_path, monkeypatch):
+    rows = _rows(200)
+    learner = OnlineLearner(str(tmp_path), min_examples=1)
+    learner.add_role(bootstrap_role("Software Engineer", [text for text, _ in rows], [label for _, label in rows]))
+    monkeypatch.setattr(predict, "ONLINE_LEARNING", "shadow")
+    monkeypatch.setattr(predict, "online_learner", learner)
+
+    results = predict.classify_resumes([{'resume_text': text, 'job_role': "Software Engineer"} for text, _ in rows[:3]])
+    assert all(result["online_ml"]["ml_prediction"] in ("Select", "Reject") for result in results)
+
+    events = dict(predict.classify_resume_stream(rows[0][0], "Software Engineer"))
+    assert events['done']["online_ml"] == results[0]["online_ml"]
@@ -0,0 +1,33 @@
+from prompt_compaction import compact_text, compactor_from_env, estimate_tokens
+
+RESUME = "\n".join([
+    "Jane   Doe",
+    "Software Engineer, Acme          Jan 2019 - Present",
+    "C / C++ / Go / R",
+    "- Built python services on kubernetes",
+    "Education",
+    "B.Sc., State University, 2015",
+])
+
+
+def test_text_under_budget_only_has_its_whitespace_normalized():
+    compacted = compact_text(RESUME, budget=800)
+    assert compacted.text.splitlines() == [
+        "Jane Doe", "Software Engineer, Acme Jan 2019 - Present", "C / C++ / Go / R",
+        "- Built python services on kubernetes", "Education", "B.Sc., State University, 2015",
+    ]
+    assert compacted.segments_dropped == 0
+
+
+def test_text_over_budget_is_trimmed_to_the_budget():
+    resume = RESUME + "\n" + "\n".join(f"- Delivered project {i} in python and golang for the team" for i in range(200))
+    compacted = compact_text(resume, budget=200)
+    assert compacted.tokens_after <= 200 < estimate_tokens(resume)
+    assert compacted.segments_dropped > 0
+
+
+def test_compaction_is_off_unless_enabled(monkeypatch):
+    monkeypatch.delenv("PROMPT_COMPACTION", raising=False)
+    assert not compactor_from_env().enabled
+    monkeypatch.setenv("PROMPT_COMPACTION", "on")
+    assert compactor_from_env().enabled
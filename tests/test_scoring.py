@@ -0,0 +1,69 @@
+import random
+
+import numpy as np
+import pytest
+from scipy.sparse import hstack
+
+from conftest import BUNDLE_ROLES
+from fast_scorer import RoleScorer
+from features import clean_text_aggressively, has_honors_or_certs, has_portfolio_link
+from model_bundle import BundleLoader
+from model_registry import ModelRegistry
+
+EDGE_CASES = ["", "a b", "Portfolio at www.example.dev", "Patent holder", "Python PYTHON python, python!"]
+
+
+def sklearn_select_probability(model, vectorizer, resume_text):
+    """classify_resume's ML step before the compiled scorers, as the reference."""
+    cleaned_resume = clean_text_aggressively(resume_text, set())
+    engineered_features = np.array([[has_portfolio_link(resume_text), has_honors_or_certs(resume_text)]])
+    features_combined = hstack([vectorizer.transform([cleaned_resume]), engineered_features])
+    return model.predict_proba(features_combined)[0][1]
+
+
+def _resumes(vectorizer, count=60, seed=7):
+    """Resumes mixing the role's own vocabulary (bigrams included) with unknown words."""
+    rng = random.Random(seed)
+    terms = sorted(vectorizer.vocabulary_)
+    resumes = []
+    for _ in range(count):
+        words = [rng.choice(terms) if rng.random() < 0.7 else f"zzq{rng.randrange(1000)}" for _ in range(rng.randint(5, 200))]
+        if rng.random() < 0.3: words.append("https://github.com/someone")
+        if rng.random() < 0.3: words.append("certification")
+        resumes.append(" ".join(words))
+    return resumes + EDGE_CASES
+
+
+@pytest.fixture
+def roles(bundle_dir):
+    registry = ModelRegistry(bundle_dir)
+    return {role: (registry.get(role), _resumes(registry.get(role)[1])) for role in BUNDLE_ROLES}
+
+
+def test_role_scorer_matches_sklearn_exactly(roles):
+    for (model, vectorizer), resumes in roles.values():
+        scorer = RoleScorer.from_sklearn(model, vectorizer)
+        reference = [sklearn_select_probability(model, vectorizer, resume) for resume in resumes]
+        assert [scorer.select_probability(resume) for resume in resumes] == reference
+
+
+def test_bundle_role_scorer_matches_sklearn_exactly(bundle_dir, roles):
+    bundle = BundleLoader(bundle_dir).get()
+    for role, ((model, vectorizer), resumes) in roles.items():
+        reference = [sklearn_select_probability(model, vectorizer, resume) for resume in resumes]
+        assert [bundle.role_scorer(role).select_probability(resume) for resume in resumes] == reference
+
+
+def test_bundle_batch_scores_match_sklearn(bundle_dir, roles):
+    bundle = BundleLoader(bundle_dir).get()
+    for role, ((model, vectorizer), resumes) in roles.items():
+        reference = [sklearn_select_probability(model, vectorizer, resume) for resume in resumes]
+        np.testing.assert_allclose(bundle.predict_proba(role, resumes), reference, rtol=0, atol=1e-12)
+
+
+def test_stacked_ranking_matches_per_role_scores(bundle_dir, roles):
+    bundle = BundleLoader(bundle_dir).get()
+    resumes = [resume for _, role_resumes in roles.values() for resume in role_resumes]
+    per_role = np.column_stack([[bundle.role_scorer(role).select_probability(resume) for resume in resumes]
+                                for role in bundle.roles])
+    np.testing.assert_allclose(bundle.predict_proba_all_roles(resumes), per_role, rtol=0, atol=1e-12)
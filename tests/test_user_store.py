@@ -0,0 +1,85 @@
+import json
+import sqlite3
+import threading
+
+from user_store import UserStore
+
+
+def _legacy_db(db_path):
+    # The layout before lookups went through idx_users_email_key
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("CREATE TABLE users (id TEXT PRIMARY KEY, email TEXT NOT NULL, password TEXT, name TEXT)")
+        conn.execute("CREATE UNIQUE INDEX idx_users_email ON users (email)")
+        conn.execute("INSERT INTO users VALUES ('1', 'Ann@Example.com', 'x', 'Ann')")
+
+
+def _indexes(db_path):
+    with sqlite3.connect(db_path) as conn:
+        return {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+
+
+def test_legacy_email_index_is_dropped_once(tmp_path):
+    db_path = str(tmp_path / "users.db")
+    _legacy_db(db_path)
+    store = UserStore(db_path)
+    assert "idx_users_email" not in _indexes(db_path)
+    assert store.find_user_by_email(" ann@example.com ")[0] == '1'
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == 1
+        # Later connects do not run the migration again
+        conn.execute("CREATE INDEX idx_users_email ON users (email)")
+    UserStore(db_path)
+    assert "idx_users_email" in _indexes(db_path)
+
+
+def test_new_database_starts_at_the_latest_version(tmp_path):
+    db_path = str(tmp_path / "users.db")
+    UserStore(db_path)
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == 1
+
+
+def test_concurrent_signups_never_share_an_email_or_id(tmp_path):
+    db_path = str(tmp_path / "users.db")
+    stores = [UserStore(db_path), UserStore(db_path)]
+    barrier = threading.Barrier(8)
+    created = []
+
+    def signup(n):
+        barrier.wait()
+        created.append((n, stores[n % 2].create_user(" Same@Example.com" if n < 4 else f"user{n}@example.com",
+                                                    "hash", f"User {n}")))
+
+    threads = [threading.Thread(target=signup, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    same_email = [user_id for n, user_id in created if n < 4]
+    assert len([user_id for user_id in same_email if user_id is not None]) == 1
+    user_ids = [user_id for _, user_id in created if user_id is not None]
+    assert len(user_ids) == 5 and len(set(user_ids)) == 5
+    assert stores[0].count_users() == 5
+
+
+def test_legacy_users_json_is_imported_once(tmp_path):
+    legacy_path = tmp_path / "users.json"
+    legacy_path.write_text(json.dumps({
+        "users": {"1": {"email": "ann@example.com", "password_hash": "x", "name": "Ann",
+                        "history": [{"job_role": "Sales", "ml_prediction": "Select"}]}},
+        "next_user_id": 2,
+    }))
+    store = UserStore(str(tmp_path / "users.db"))
+    assert store.seed_if_empty(str(legacy_path)) == ('migrated', 1)
+    assert store.seed_if_empty(str(legacy_path)) == (None, 0)
+    assert store.get_user('1') == {'email': 'ann@example.com', 'password': 'x', 'name': 'Ann'}
+    assert [entry['job_role'] for entry in store.iter_history('1')] == ['Sales']
+    assert store.create_user("bob@example.com", "y", "Bob") == '2'
+
+
+def test_empty_database_is_seeded_with_the_default_account(tmp_path):
+    store = UserStore(str(tmp_path / "users.db"))
+    account = {'email': 'admin@example.com', 'password': 'x', 'name': 'Admin'}
+    assert store.seed_if_empty(str(tmp_path / "missing.json"), account) == ('seeded', 1)
+    assert store.get_user('1') == account
+    assert store.get_next_user_id() == 2
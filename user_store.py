@@ -0,0 +1,328 @@
+import contextlib
+import json
+import os
+import sqlite3
+import threading
+
+from metrics import span
+
+# --- 1. Schema ---
+# Columns of a history row, in the order app.build_history_entry produces them.
+HISTORY_FIELDS = (
+    'timestamp', 'job_role', 'job_description_snippet', 'resume_snippet',
+    'ml_prediction', 'ml_confidence', 'gen_ai_assessment',
+    'resume_jd_comparison', 'improvement_suggestions'
+)
+# What a history list shows; the Gemini texts are fetched per entry on demand.
+HISTORY_SUMMARY_FIELDS = (
+    'timestamp', 'job_role', 'job_description_snippet', 'resume_snippet',
+    'ml_prediction', 'ml_confidence'
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id TEXT PRIMARY KEY,
+    email TEXT NOT NULL,
+    password TEXT,
+    name TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_users_email_key ON users (lower(trim(email)));
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL REFERENCES users(id),
+    timestamp TEXT,
+    job_role TEXT,
+    job_description_snippet TEXT,
+    resume_snippet TEXT,
+    ml_prediction TEXT,
+    ml_confidence TEXT,
+    gen_ai_assessment TEXT,
+    resume_jd_comparison TEXT,
+    improvement_suggestions TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_history_user ON history (user_id, id);
+CREATE TABLE IF NOT EXISTS feedback (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL REFERENCES users(id),
+    history_id INTEGER REFERENCES history(id),
+    timestamp TEXT,
+    job_role TEXT NOT NULL,
+    decision INTEGER NOT NULL,
+    resume_text TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+# One-time schema changes, applied in order to databases whose PRAGMA
+# user_version is below their position (1-based) in this list.
+_MIGRATIONS = (
+    # 1: the unique index on the raw email column rejected legacy data that
+    # differs only in case or whitespace; idx_users_email_key replaces it.
+    "DROP INDEX IF EXISTS idx_users_email",
+)
+
+
+# --- 2. Store ---
+class UserStore:
+    """
+    SQLite (WAL mode) storage for accounts and classification history.
+
+    Users and history entries are separate rows, so recording a
+    classification is one INSERT no matter how large the history grows.
+    Each thread gets its own connection, and a forked worker process opens
+    new ones instead of reusing its parent's, so several processes can
+    share one database file.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+        self._migrate()
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=10.0)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @contextlib.contextmanager
+    def _write_transaction(self):
+        # BEGIN IMMEDIATE takes the database write lock up front, so a
+        # read-then-write (e.g. check the email, then insert) is atomic across processes.
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+
+    def _migrate(self):
+        if self._connect().execute("PRAGMA user_version").fetchone()[0] >= len(_MIGRATIONS):
+            return
+        # Re-read under the write lock: another worker may have migrated in the meantime
+        with self._write_transaction() as conn:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            for statement in _MIGRATIONS[version:]:
+                conn.execute(statement)
+            conn.execute(f"PRAGMA user_version = {max(version, len(_MIGRATIONS))}")
+
+    # --- Accounts ---
+    def is_empty(self):
+        return self._connect().execute("SELECT 1 FROM users LIMIT 1").fetchone() is None
+
+    def count_users(self):
+        return self._connect().execute("SELECT COUNT(*) FROM users").fetchone()[0]
+
+    def get_user(self, user_id):
+        """{'email', 'password', 'name'} for a user id, or None."""
+        row = self._connect().execute("SELECT email, password, name FROM users WHERE id = ?", (user_id,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def find_user_by_email(self, email):
+        """
+        (user_id, account) for an email, compared trimmed and case-insensitively
+        through the idx_users_email_key index, or (None, None). If legacy data
+        has several accounts under one address, the first one imported wins.
+        """
+        row = self._connect().execute(
+            "SELECT id, email, password, name FROM users WHERE lower(trim(email)) = lower(trim(?)) "
+            "ORDER BY rowid LIMIT 1", ((email or '').strip(),)
+        ).fetchone()
+        if row is None:
+            return None, None
+        return row['id'], {'email': row['email'], 'password': row['password'], 'name': row['name']}
+
+    @staticmethod
+    def _next_user_id(conn):
+        row = conn.execute("SELECT value FROM meta WHERE key = 'next_user_id'").fetchone()
+        if row is not None:
+            return int(row['value'])
+        max_row = conn.execute(
+            "SELECT MAX(CAST(id AS INTEGER)) AS max_id FROM users WHERE id GLOB '[0-9]*'"
+        ).fetchone()
+        return (max_row['max_id'] or 0) + 1
+
+    def get_next_user_id(self):
+        return self._next_user_id(self._connect())
+
+    def create_user(self, email, password, name):
+        """
+        Registers an account under the next user id and returns that id, or
+        None when the email is already registered. The email check, the id
+        allocation and the insert are one write transaction, so concurrent
+        signups (from any number of processes) never share an id or an email.
+        """
+        with self._write_transaction() as conn:
+            taken = conn.execute(
+                "SELECT 1 FROM users WHERE lower(trim(email)) = lower(trim(?)) LIMIT 1", ((email or '').strip(),)
+            ).fetchone()
+            if taken is not None:
+                return None
+            user_id = self._next_user_id(conn)
+            conn.execute(
+                "INSERT INTO users (id, email, password, name) VALUES (?, ?, ?, ?)",
+                (str(user_id), (email or '').strip(), password, name)
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('next_user_id', ?)", (str(user_id + 1),)
+            )
+        return str(user_id)
+
+    # --- History ---
+    def add_history(self, user_id, entry):
+        self.add_history_many(user_id, [entry])
+
+    def add_history_many(self, user_id, entries):
+        placeholders = ", ".join("?" for _ in HISTORY_FIELDS)
+        with span("history_write"), self._connect() as conn:
+            conn.executemany(
+                f"INSERT INTO history (user_id, {', '.join(HISTORY_FIELDS)}) VALUES (?, {placeholders})",
+                [(user_id, *(entry.get(field) for field in HISTORY_FIELDS)) for entry in entries]
+            )
+
+    def get_history_page(self, user_id, before_id=None, limit=20):
+        """
+        One page of a user's history, newest first, as (summaries, next_cursor).
+        Each summary carries its row `id`; pass next_cursor back as `before_id`
+        for the following page (None once the oldest entry has been returned).
+        """
+        sql = f"SELECT id, {', '.join(HISTORY_SUMMARY_FIELDS)} FROM history WHERE user_id = ?"
+        params = [user_id]
+        if before_id is not None:
+            sql += " AND id < ?"
+            params.append(before_id)
+        # One extra row tells us whether an older page exists
+        rows = self._connect().execute(sql + " ORDER BY id DESC LIMIT ?", (*params, limit + 1)).fetchall()
+        entries = [dict(row) for row in rows[:limit]]
+        next_cursor = entries[-1]['id'] if len(rows) > limit else None
+        return entries, next_cursor
+
+    def get_history_entry(self, user_id, entry_id):
+        """The full entry (with id) if it belongs to user_id, else None."""
+        row = self._connect().execute(
+            f"SELECT id, {', '.join(HISTORY_FIELDS)} FROM history WHERE user_id = ? AND id = ?",
+            (user_id, entry_id)
+        ).fetchone()
+        return dict(row) if row is not None else None
+
+    def iter_history(self, user_id, batch_size=500):
+        """Yields a user's full entries oldest first, reading `batch_size` rows at a time."""
+        last_id = 0
+        while True:
+            rows = self._connect().execute(
+                f"SELECT id, {', '.join(HISTORY_FIELDS)} FROM history WHERE user_id = ? AND id > ? ORDER BY id LIMIT ?",
+                (user_id, last_id, batch_size)
+            ).fetchall()
+            for row in rows:
+                yield dict(row)
+            if len(rows) < batch_size:
+                return
+            last_id = rows[-1]['id']
+
+    def count_history(self, user_id=None):
+        conn = self._connect()
+        if user_id is None:
+            return conn.execute("SELECT COUNT(*) FROM history").fetchone()[0]
+        return conn.execute("SELECT COUNT(*) FROM history WHERE user_id = ?", (user_id,)).fetchone()[0]
+
+    # --- Recruiter Feedback ---
+    def add_feedback(self, user_id, job_role, resume_text, selected, history_id=None, timestamp=None):
+        """Records a recruiter's Select (selected=True) or Reject decision; returns the feedback id."""
+        with span("feedback_write"), self._connect() as conn:
+            return conn.execute(
+                "INSERT INTO feedback (user_id, history_id, timestamp, job_role, decision, resume_text) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (user_id, history_id, timestamp, job_role, int(bool(selected)), resume_text)
+            ).lastrowid
+
+    def get_feedback_since(self, after_id, limit=500):
+        """Feedback rows with id > after_id, oldest first, for the online learner."""
+        rows = self._connect().execute(
+            "SELECT id, job_role, decision, resume_text FROM feedback WHERE id > ? ORDER BY id LIMIT ?",
+            (after_id, limit)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def count_feedback(self):
+        return self._connect().execute("SELECT COUNT(*) FROM feedback").fetchone()[0]
+
+    # --- Migration ---
+    def import_json(self, json_path):
+        """
+        One-shot import of the legacy users.json layout
+        ({'users': {id: {..., 'history': [...]}}, 'next_user_id': n}).
+        Returns the number of users imported.
+        """
+        with open(json_path, 'r') as f:
+            data = json.load(f)
+        with self._connect() as conn:
+            return self._import_data(conn, data, json_path)
+
+    @staticmethod
+    def _import_data(conn, data, json_path):
+        users_dict = data.get('users', {})
+        placeholders = ", ".join("?" for _ in HISTORY_FIELDS)
+        for user_id, user_data in users_dict.items():
+            # Older records stored the (plain-text) password under 'password_hash'
+            password = user_data.get('password', user_data.get('password_hash'))
+            conn.execute(
+                "INSERT OR REPLACE INTO users (id, email, password, name) VALUES (?, ?, ?, ?)",
+                (user_id, user_data.get('email'), password, user_data.get('name'))
+            )
+            conn.executemany(
+                f"INSERT INTO history (user_id, {', '.join(HISTORY_FIELDS)}) VALUES (?, {placeholders})",
+                [(user_id, *(entry.get(field) for field in HISTORY_FIELDS)) for entry in user_data.get('history', [])]
+            )
+        if 'next_user_id' in data:
+            conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('next_user_id', ?)", (str(data['next_user_id']),)
+            )
+        conn.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES ('migrated_from', ?)", (os.path.abspath(json_path),)
+        )
+        return len(users_dict)
+
+    def seed_if_empty(self, legacy_json_path=None, default_account=None):
+        """
+        Fills an empty database: from the legacy users.json when it exists and
+        parses, otherwise with `default_account` ({'email', 'password', 'name'},
+        stored as user '1'). The emptiness check and the inserts are one write
+        transaction, so when several processes start at once only one seeds.
+        Returns ('migrated', users imported), ('seeded', 1) or (None, 0).
+        """
+        if not self.is_empty():
+            return None, 0
+        data = None
+        if legacy_json_path and os.path.exists(legacy_json_path):
+            try:
+                with open(legacy_json_path, 'r') as f:
+                    data = json.load(f)
+            except (json.JSONDecodeError, IOError) as e:
+                print(f"Error migrating user data: {e}.")
+        with self._write_transaction() as conn:
+            if conn.execute("SELECT 1 FROM users LIMIT 1").fetchone() is not None:
+                return None, 0
+            if data is not None:
+                imported = self._import_data(conn, data, legacy_json_path)
+                if imported:
+                    return 'migrated', imported
+            if default_account is None:
+                return None, 0
+            conn.execute(
+                "INSERT INTO users (id, email, password, name) VALUES ('1', ?, ?, ?)",
+                (default_account['email'], default_account['password'], default_account['name'])
+            )
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('next_user_id', '2')")
+        return 'seeded', 1